@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agregados materializados de contas e entradas
+Os totais do dashboard são mantidos incrementalmente a cada gravação,
+então /api/stats não precisa percorrer todo o histórico
+"""
+
+import re
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+
+DATA_VALIDA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Grupo dos registros sem status (contas) ou sem tipo de pagamento (entradas)
+SEM_STATUS = 'sem status'
+SEM_TIPO = 'sem tipo'
+
+
+def numero(valor):
+    """Converte valores vindos do front-end (número ou texto) em float"""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def data_valida(texto):
+    """Retorna a data 'AAAA-MM-DD' se ela for válida, senão None"""
+    if isinstance(texto, str) and DATA_VALIDA.match(texto):
+        return texto
+    return None
+
+
+def rotulo(valor, padrao):
+    """Chave de agrupamento em texto; valor ausente (None ou '') vira `padrao`"""
+    if valor is None or valor == '':
+        return padrao
+    return str(valor)
+
+
+def arredondar(valor):
+    return round(valor, 2)
+
+
+class Acumulador:
+    """Quantidade e soma de valores de um grupo de registros"""
+
+    __slots__ = ('quantidade', 'valor')
+
+    def __init__(self):
+        self.quantidade = 0
+        self.valor = 0.0
+
+    def somar(self, valor, sinal):
+        self.quantidade += sinal
+        self.valor += sinal * valor
+
+    def juntar(self, quantidade, valor):
+        """Soma o total parcial de outro acumulador"""
+        self.quantidade += quantidade
+        self.valor += valor
+
+    def como_dict(self):
+        return {'quantidade': self.quantidade, 'valor': arredondar(self.valor)}
+
+
+def _exportar(valor):
+    """Acumuladores como (quantidade, valor) e dicionários aninhados como dict comuns"""
+    if isinstance(valor, Acumulador):
+        return (valor.quantidade, valor.valor)
+    if isinstance(valor, dict):
+        return {chave: _exportar(item) for chave, item in valor.items()}
+    return valor
+
+
+def _juntar_grupos(grupos, parcial):
+    for chave, item in parcial.items():
+        if isinstance(item, dict):
+            _juntar_grupos(grupos[chave], item)
+        else:
+            grupos[chave].juntar(*item)
+
+
+class AgregadosBase:
+    """Ouvinte das coleções: reiniciar(indice) e alterar(chave, anterior, novo)
+
+    `parcial()` exporta os totais em tipos simples (podem ir para outro
+    processo) e `mesclar(parcial)` soma totais de outra coleção, como os
+    de outra loja
+    """
+
+    # Atributos com os totais, exportados e somados por parcial()/mesclar()
+    CAMPOS = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limpar()
+
+    def _limpar(self):
+        raise NotImplementedError
+
+    def _aplicar(self, registro, sinal):
+        raise NotImplementedError
+
+    def reiniciar(self, registros):
+        """Recalcula tudo a partir do índice completo (chave -> registro)"""
+        with self._lock:
+            self._limpar()
+            for registro in registros.values():
+                self._aplicar(registro, 1)
+
+    def alterar(self, chave, anterior, novo):
+        """Atualiza os agregados quando um registro é criado, alterado ou excluído"""
+        with self._lock:
+            if anterior is not None:
+                self._aplicar(anterior, -1)
+            if novo is not None:
+                self._aplicar(novo, 1)
+
+    def parcial(self):
+        """Totais atuais em dicts, tuplas e números"""
+        with self._lock:
+            return {campo: _exportar(getattr(self, campo)) for campo in self.CAMPOS}
+
+    def mesclar(self, parcial):
+        """Soma aos totais atuais os totais de parcial()"""
+        with self._lock:
+            for campo in self.CAMPOS:
+                atual = getattr(self, campo)
+                valor = parcial[campo]
+                if isinstance(atual, Acumulador):
+                    atual.juntar(*valor)
+                elif isinstance(atual, dict):
+                    _juntar_grupos(atual, valor)
+                else:
+                    setattr(self, campo, atual + valor)
+
+
+class AgregadosContas(AgregadosBase):
+    """Contas por status, por mês de vencimento e pendentes por data"""
+
+    CAMPOS = ('total', 'por_status', 'por_mes', 'pendentes_por_data')
+
+    def _limpar(self):
+        self.total = 0
+        self.por_status = defaultdict(Acumulador)
+        self.por_mes = defaultdict(lambda: defaultdict(Acumulador))
+        self.pendentes_por_data = defaultdict(Acumulador)
+
+    def _aplicar(self, registro, sinal):
+        status = rotulo(registro.get('status'), SEM_STATUS)
+        valor = numero(registro.get('valor'))
+        vencimento = data_valida(registro.get('dataVencimento'))
+
+        self.total += sinal
+        self.por_status[status].somar(valor, sinal)
+        if vencimento:
+            self.por_mes[vencimento[:7]][status].somar(valor, sinal)
+            if status != 'pago':
+                pendentes = self.pendentes_por_data[vencimento]
+                pendentes.somar(valor, sinal)
+                if pendentes.quantidade == 0:
+                    # Mantém o cálculo de vencidas proporcional às datas em aberto
+                    del self.pendentes_por_data[vencimento]
+
+    def resumo(self, mes, hoje):
+        """Totais gerais e do mês no formato usado pelo dashboard"""
+        with self._lock:
+            a_pagar = self.por_status.get('à pagar', Acumulador())
+            pagas = self.por_status.get('pago', Acumulador())
+            do_mes = self.por_mes.get(mes, {})
+            mes_a_pagar = do_mes.get('à pagar', Acumulador())
+            mes_pagas = do_mes.get('pago', Acumulador())
+
+            return {
+                'total': self.total,
+                'aPagar': a_pagar.quantidade,
+                'pagas': pagas.quantidade,
+                'vencidas': self._contar_vencidas(hoje),
+                'valorAPagar': arredondar(a_pagar.valor),
+                'valorPago': arredondar(pagas.valor),
+                'porStatus': {
+                    status: grupo.como_dict()
+                    for status, grupo in self.por_status.items() if grupo.quantidade
+                },
+                'mes': {
+                    'quantidade': sum(grupo.quantidade for grupo in do_mes.values()),
+                    'valor': arredondar(sum(grupo.valor for grupo in do_mes.values())),
+                    'aPagar': mes_a_pagar.quantidade,
+                    'pagas': mes_pagas.quantidade,
+                    'valorAPagar': arredondar(mes_a_pagar.valor),
+                    'valorPago': arredondar(mes_pagas.valor),
+                    'vencidas': self._contar_vencidas(hoje, mes)
+                },
+                'porMes': {
+                    chave: arredondar(sum(grupo.valor for grupo in grupos.values()))
+                    for chave, grupos in sorted(self.por_mes.items())
+                    if any(grupo.quantidade for grupo in grupos.values())
+                }
+            }
+
+    def _contar_vencidas(self, hoje, mes=None):
+        """Contas não pagas com vencimento anterior a hoje (opcionalmente só de um mês)
+
+        Uma conta que vence hoje ainda não está vencida, como no resumo
+        original do dashboard (contas.js comparava com a data de hoje à
+        meia-noite: dataVenc < dataAtual)
+        """
+        return sum(
+            grupo.quantidade for data_venc, grupo in self.pendentes_por_data.items()
+            if data_venc < hoje and (mes is None or data_venc.startswith(mes))
+        )
+
+
+class AgregadosEntradas(AgregadosBase):
+    """Entradas por mês, por dia e por tipo de pagamento"""
+
+    CAMPOS = ('total', 'por_tipo', 'por_mes', 'por_mes_tipo', 'por_dia')
+
+    def _limpar(self):
+        self.total = Acumulador()
+        self.por_tipo = defaultdict(Acumulador)
+        self.por_mes = defaultdict(Acumulador)
+        self.por_mes_tipo = defaultdict(lambda: defaultdict(Acumulador))
+        self.por_dia = defaultdict(Acumulador)
+
+    def _aplicar(self, registro, sinal):
+        valor = numero(registro.get('valorCalculado') or registro.get('valor'))
+        tipo = rotulo(registro.get('tipoEntrada'), SEM_TIPO)
+        data_entrada = data_valida(registro.get('dataEntrada'))
+
+        self.total.somar(valor, sinal)
+        self.por_tipo[tipo].somar(valor, sinal)
+        if data_entrada:
+            self.por_mes[data_entrada[:7]].somar(valor, sinal)
+            self.por_mes_tipo[data_entrada[:7]][tipo].somar(valor, sinal)
+            self.por_dia[data_entrada].somar(valor, sinal)
+
+    def resumo(self, mes, hoje):
+        """Totais gerais, do mês e dos últimos 7 dias"""
+        with self._lock:
+            do_mes = self.por_mes.get(mes, Acumulador())
+            dia_hoje = date.fromisoformat(hoje)
+            ultimos_dias = []
+            for i in range(6, -1, -1):
+                dia = (dia_hoje - timedelta(days=i)).isoformat()
+                grupo = self.por_dia.get(dia, Acumulador())
+                ultimos_dias.append({'data': dia, 'valor': arredondar(grupo.valor), 'quantidade': grupo.quantidade})
+
+            return {
+                'total': self.total.quantidade,
+                'valorTotal': arredondar(self.total.valor),
+                'totalMes': do_mes.quantidade,
+                'valorMes': arredondar(do_mes.valor),
+                'mediaDiaria': arredondar(do_mes.valor / 30) if do_mes.quantidade else 0,
+                'porTipo': {
+                    tipo: grupo.como_dict()
+                    for tipo, grupo in self.por_tipo.items() if grupo.quantidade
+                },
+                'porTipoMes': {
+                    tipo: grupo.como_dict()
+                    for tipo, grupo in self.por_mes_tipo.get(mes, {}).items() if grupo.quantidade
+                },
+                'porMes': {
+                    chave: arredondar(grupo.valor)
+                    for chave, grupo in sorted(self.por_mes.items()) if grupo.quantidade
+                },
+                'ultimos7Dias': ultimos_dias
+            }
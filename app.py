@@ -1,7 +1,7 @@
-from flask import Flask
-import subprocess
+from flask import Flask, request, jsonify
 import webbrowser
 import threading
+from precificacao import catalogo, precificar_parametros
 
 app = Flask(__name__, static_folder="static", static_url_path="")
 
@@ -9,11 +9,24 @@ app = Flask(__name__, static_folder="static", static_url_path="")
 def index():
     return app.send_static_file("index.html")
 
+@app.route("/api/precificar", methods=["GET", "POST"])
+def precificar():
+    # calcula no próprio processo, sem abrir janela
+    parametros = request.get_json(silent=True) if request.method == "POST" else request.args.to_dict()
+    if not isinstance(parametros, dict):
+        return jsonify({"error": "Corpo da requisição deve ser um objeto JSON"}), 400
+    try:
+        return jsonify(precificar_parametros(parametros))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/api/precificar/tipos")
+def tipos():
+    return jsonify({"tipos": catalogo.tipos()})
+
 @app.route("/calcular")
 def calcular():
-    # abre sua calculadora python
-    subprocess.Popen(["python", "Calcdesossa.py"])
-    return "Calculadora aberta"
+    return precificar()
 
 def abrir_navegador():
     webbrowser.open("http://127.0.0.1:5000")
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Depósito de dados em memória para o servidor JSON
+Mantém contas, entradas e config já processados e só relê um arquivo
+quando sua assinatura (mtime, tamanho, inode) muda no disco
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from diario import (
+    Diario, aplicar_operacao, diferencas, indexar_registros,
+    substituir_arquivo_atomicamente
+)
+from gravacao import FilaGravacao
+from indices import IndiceColecao
+from instantaneo import abrir_instantaneo, gravar_instantaneo
+from json_em_blocos import serializar
+from metricas import (
+    bytes_lidos, contar_blocos, cronometrar, duracao_decodificacao, duracao_serializacao,
+    erros_funcoes
+)
+
+# Acima disso inserir_lote reconstrói os ouvintes em vez de notificar um a um
+LIMITE_NOTIFICACOES_LOTE = 1000
+
+# Leituras de fora do servidor repetidas quando os arquivos mudam no meio
+TENTATIVAS_LEITURA = 3
+
+
+@cronometrar()
+def carregar_dados_arquivo(arquivo, dados_padrao=None):
+    """Carrega dados de um arquivo JSON com fallback para dados padrão"""
+    try:
+        if os.path.exists(arquivo):
+            with open(arquivo, 'rb') as f:
+                conteudo = f.read()
+            bytes_lidos.incrementar(os.path.basename(arquivo), valor=len(conteudo))
+            inicio = time.perf_counter()
+            dados = json.loads(conteudo)
+            duracao_decodificacao.observar(time.perf_counter() - inicio, 'arquivo')
+            return dados
+        else:
+            # Criar arquivo com dados padrão
+            salvar_dados_arquivo(arquivo, dados_padrao or [])
+            return dados_padrao or []
+    except Exception as e:
+        erros_funcoes.incrementar('carregar_dados_arquivo')
+        print(f"Erro ao carregar {arquivo}: {e}")
+        return dados_padrao or []
+
+
+@cronometrar()
+def salvar_dados_arquivo(arquivo, dados, fsync=False):
+    """Salva dados em um arquivo JSON (temporário + renomeação atômica)"""
+    try:
+        blocos = contar_blocos(serializar(dados, indent=2), os.path.basename(arquivo), 'arquivo')
+        substituir_arquivo_atomicamente(arquivo, blocos, fsync=fsync)
+        return True
+    except Exception as e:
+        erros_funcoes.incrementar('salvar_dados_arquivo')
+        print(f"Erro ao salvar {arquivo}: {e}")
+        return False
+
+
+def gerar_id():
+    """Gera um id no mesmo formato do front-end (timestamp + aleatório em base 36)"""
+    def base36(numero):
+        digitos = '0123456789abcdefghijklmnopqrstuvwxyz'
+        texto = ''
+        while numero:
+            numero, resto = divmod(numero, 36)
+            texto = digitos[resto] + texto
+        return texto or '0'
+    return base36(int(time.time() * 1000)) + base36(random.getrandbits(52))
+
+
+def validar_registros(dados):
+    """Levanta ValueError se `dados` não for uma lista de registros com ids únicos
+
+    O id é opcional (registros antigos sem id são aceitos), mas quando
+    existe precisa ser texto ou inteiro
+    """
+    if not isinstance(dados, list):
+        raise ValueError('Os dados devem ser uma lista de registros')
+    ids = set()
+    for posicao, registro in enumerate(dados):
+        if not isinstance(registro, dict):
+            raise ValueError(f'Registro {posicao} deve ser um objeto')
+        id_registro = registro.get('id')
+        if id_registro is None:
+            continue
+        if isinstance(id_registro, bool) or not isinstance(id_registro, (str, int)):
+            raise ValueError(f'Registro {posicao}: id deve ser texto ou número inteiro')
+        chave = str(id_registro)
+        if chave in ids:
+            raise ValueError(f'Registro {posicao}: id {chave} repetido')
+        ids.add(chave)
+
+
+def serializar_json(dados):
+    """Serializa dados no formato compacto usado nas respostas da API"""
+    inicio = time.perf_counter()
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    duracao_serializacao.observar(time.perf_counter() - inicio, 'api')
+    return corpo
+
+
+def assinatura_arquivo(arquivo):
+    """Retorna (mtime, tamanho, inode) do arquivo ou None se não existir"""
+    try:
+        st = os.stat(arquivo)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def ler_colecao_somente_leitura(arquivo, usar_diario=False, usar_instantaneo=False):
+    """Registros atuais de uma coleção sem criar, reparar ou regravar arquivos
+
+    O mesmo estado que a ColecaoEmCache montaria com essas opções (o
+    instantâneo, se foi gerado deste snapshot e diário, ou o snapshot JSON
+    mais o diário), para quem só lê os arquivos de fora do servidor. Se
+    eles mudam durante a leitura, lê de novo
+    """
+    diario = Diario(arquivo + '.diario')
+    for _ in range(TENTATIVAS_LEITURA):
+        antes = (assinatura_arquivo(arquivo), assinatura_arquivo(diario.arquivo))
+        registros = _ler_colecao(arquivo, diario, antes, usar_diario, usar_instantaneo)
+        if (assinatura_arquivo(arquivo), assinatura_arquivo(diario.arquivo)) == antes:
+            return registros
+    raise RuntimeError(f"{arquivo} mudou durante a leitura")
+
+
+def _ler_colecao(arquivo, diario, assinaturas, usar_diario, usar_instantaneo):
+    snapshot = assinaturas[0]
+    if usar_instantaneo and snapshot is not None:
+        instantaneo = abrir_instantaneo(arquivo + '.instantaneo', assinaturas if usar_diario else snapshot)
+        if instantaneo is not None:
+            try:
+                return instantaneo.registros()
+            finally:
+                instantaneo.fechar()
+
+    dados = []
+    if snapshot is not None:
+        with open(arquivo, 'rb') as f:
+            conteudo = f.read()
+        bytes_lidos.incrementar(os.path.basename(arquivo), valor=len(conteudo))
+        dados = json.loads(conteudo)
+        if not isinstance(dados, list):
+            dados = []
+    operacoes = diario.ler(reparar=False)
+    if not operacoes:
+        return dados
+    indice = indexar_registros(dados)
+    for operacao in operacoes:
+        aplicar_operacao(indice, operacao)
+    return list(indice.values())
+
+
+class ArquivoEmCache:
+    """Conteúdo de um arquivo JSON mantido em memória junto da resposta serializada"""
+
+    def __init__(self, arquivo, dados_padrao, fsync=False):
+        self.arquivo = arquivo
+        self.dados_padrao = dados_padrao
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._assinatura = None
+        self._carregado = False
+        self._dados = None
+        self._bytes = None
+        # Incrementada a cada mudança dos dados; base dos ETags da API
+        self.versao = 0
+        self.alterado_em = None
+
+    def _assinatura_disco(self):
+        """Assinatura dos arquivos que compõem o estado em disco"""
+        return assinatura_arquivo(self.arquivo)
+
+    def _ler_disco(self):
+        """Lê e processa o estado atual a partir do disco"""
+        return carregar_dados_arquivo(self.arquivo, json.loads(json.dumps(self.dados_padrao)))
+
+    def _cache_valido(self, assinatura):
+        return self._carregado and assinatura is not None and assinatura == self._assinatura
+
+    def _validar(self):
+        """Recarrega o arquivo se ele mudou desde a última leitura"""
+        if self._cache_valido(self._assinatura_disco()):
+            return
+
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto esperávamos o lock
+            assinatura = self._assinatura_disco()
+            if self._cache_valido(assinatura):
+                return
+
+            # A assinatura é lida antes do arquivo: uma escrita concorrente
+            # gera outra assinatura e força nova leitura na próxima chamada
+            self._carregar(assinatura)
+            self._assinatura = assinatura if assinatura is not None else self._assinatura_disco()
+
+    def _carregar(self, assinatura):
+        """Substitui o estado em memória pelo que está no disco"""
+        self._definir(self._ler_disco())
+
+    def _definir(self, dados):
+        """Substitui o estado em memória"""
+        self._dados = dados
+        self._bytes = None
+        self._carregado = True
+        self._marcar_versao()
+
+    def _marcar_versao(self):
+        self.versao += 1
+        self.alterado_em = datetime.now().isoformat()
+
+    def _dados_atuais(self):
+        return self._dados
+
+    def verificar(self):
+        """Recarrega do disco se os arquivos mudaram"""
+        self._validar()
+
+    def versao_atual(self):
+        """Versão dos dados após verificar o disco"""
+        self._validar()
+        return self.versao
+
+    def obter(self):
+        """Dados processados (não devem ser modificados pelo chamador)"""
+        self._validar()
+        return self._dados_atuais()
+
+    def obter_bytes(self):
+        """Dados já serializados em JSON compacto"""
+        self._validar()
+        corpo = self._bytes
+        if corpo is None:
+            with self._lock:
+                if self._bytes is None:
+                    self._bytes = serializar_json(self._dados_atuais())
+                corpo = self._bytes
+        return corpo
+
+    def validar_dados(self, dados):
+        """Levanta ValueError se os dados não tiverem o formato do arquivo"""
+        if not isinstance(dados, type(self.dados_padrao)):
+            esperado = 'um objeto' if isinstance(self.dados_padrao, dict) else 'uma lista'
+            raise ValueError(f'Os dados devem ser {esperado}')
+
+    def salvar(self, dados):
+        """Grava os dados no arquivo e atualiza o cache sem reler o disco
+
+        Dados em formato inválido levantam ValueError sem alterar nada
+        """
+        self.validar_dados(dados)
+        with self._lock:
+            if not salvar_dados_arquivo(self.arquivo, dados, fsync=self.fsync):
+                return False
+            self._definir(dados)
+            self._assinatura = self._assinatura_disco()
+            return True
+
+
+class ColecaoEmCache(ArquivoEmCache):
+    """Lista de registros (contas ou entradas) com diário de alterações opcional
+
+    Com o diário ativo, cada gravação acrescenta só as operações que mudaram
+    em <arquivo>.diario; o snapshot JSON é reescrito em segundo plano quando
+    o diário passa de `limite_diario` bytes
+
+    As alterações são aplicadas em memória sob o lock da coleção e gravadas
+    pela fila de gravação em grupo: escritores simultâneos compartilham um
+    único acréscimo (ou uma única reescrita do arquivo) e um único fsync.
+    Se a gravação (ou um ouvinte) falhar, o estado em memória volta a ser o
+    do disco mais as operações ainda na fila (_desfazer)
+    """
+
+    def __init__(self, arquivo, usar_diario=False, limite_diario=1024 * 1024, fsync=False,
+                 usar_instantaneo=False):
+        super().__init__(arquivo, [], fsync=fsync)
+        self.diario = Diario(arquivo + '.diario', fsync=fsync) if usar_diario else None
+        self.limite_diario = limite_diario
+        self.fila = FilaGravacao(self._gravar_grupo)
+        self._indice = {}
+        self._compactando = False
+        self._compactacao = None
+        self._fechada = False
+        self.ouvintes = []
+        # Instantâneo binário (instantaneo.py): aberto no lugar do JSON quando
+        # foi gerado dele; os registros só são montados quando alguém precisa
+        self.arquivo_instantaneo = arquivo + '.instantaneo' if usar_instantaneo else None
+        self._pendente = None
+        self._origem_instantaneo = None
+
+    def _assinatura_disco(self):
+        if self.diario is None:
+            return assinatura_arquivo(self.arquivo)
+        snapshot = assinatura_arquivo(self.arquivo)
+        if snapshot is None:
+            return None
+        return (snapshot, assinatura_arquivo(self.diario.arquivo))
+
+    def _cache_valido(self, assinatura):
+        # Com gravações na fila os arquivos ainda vão mudar, e o estado em
+        # memória é o mais recente; reler o disco agora perderia essas alterações
+        if self._carregado and self.fila.ocupada():
+            return True
+        return super()._cache_valido(assinatura)
+
+    def _ler_disco(self):
+        dados = carregar_dados_arquivo(self.arquivo, [])
+        if not isinstance(dados, list):
+            dados = []
+
+        diario = self.diario or Diario(self.arquivo + '.diario')
+        operacoes = diario.ler()
+        if not operacoes:
+            return dados
+
+        indice = indexar_registros(dados)
+        for operacao in operacoes:
+            aplicar_operacao(indice, operacao)
+        dados = list(indice.values())
+
+        if self.diario is None:
+            # Diário deixado por uma execução anterior com o modo ativo
+            if salvar_dados_arquivo(self.arquivo, dados, fsync=self.fsync):
+                os.remove(diario.arquivo)
+        return dados
+
+    def _carregar(self, assinatura):
+        if self._pendente is not None:
+            # Instantâneo anterior nunca montado: o disco mudou desde então
+            self._pendente.fechar()
+            self._pendente = None
+        instantaneo = None
+        if self.arquivo_instantaneo is not None and assinatura is not None:
+            instantaneo = abrir_instantaneo(self.arquivo_instantaneo, assinatura)
+        if instantaneo is None:
+            self._definir(self._ler_disco())
+            if self.arquivo_instantaneo is not None:
+                threading.Thread(target=self.atualizar_instantaneo, daemon=True,
+                                 name=f"instantaneo-{os.path.basename(self.arquivo)}").start()
+            return
+
+        # Só a resposta serializada e a contagem ficam prontas agora
+        self._pendente = instantaneo
+        self._origem_instantaneo = assinatura
+        self._dados = None
+        self._indice = None
+        self._bytes = instantaneo.corpo_json()
+        self._carregado = True
+        self._marcar_versao()
+
+    def _materializar(self):
+        """Monta os registros do instantâneo aberto, o índice e os ouvintes"""
+        if self._pendente is None:
+            return
+        with self._lock:
+            instantaneo = self._pendente
+            if instantaneo is None:
+                return
+            dados = instantaneo.registros()
+            self._dados = dados
+            self._indice = indexar_registros(dados)
+            for ouvinte in self.ouvintes:
+                ouvinte.reiniciar(self._indice)
+            self._pendente = None
+            instantaneo.fechar()
+
+    def _preparar(self):
+        """Valida o cache e garante os registros montados"""
+        self._validar()
+        self._materializar()
+
+    def _definir(self, dados):
+        super()._definir(dados)
+        self._indice = indexar_registros(dados)
+        for ouvinte in self.ouvintes:
+            ouvinte.reiniciar(self._indice)
+
+    def verificar(self):
+        """Recarrega do disco se os arquivos mudaram (índice e ouvintes prontos para consultas)"""
+        self._preparar()
+
+    def contagem(self):
+        """Quantidade de registros, sem montá-los se vieram do instantâneo"""
+        self._validar()
+        with self._lock:
+            if self._pendente is not None:
+                return self._pendente.contagem
+            return len(self._indice)
+
+    def atualizar_instantaneo(self):
+        """Regrava o instantâneo se o estado em memória é o do disco e ele está desatualizado"""
+        if self.arquivo_instantaneo is None:
+            return False
+        with self._lock:
+            assinatura = self._assinatura_disco()
+            if (self._pendente is not None or self.fila.ocupada() or assinatura is None
+                    or assinatura != self._assinatura or assinatura == self._origem_instantaneo):
+                return False
+            dados = self._dados_atuais()
+            corpo = self._bytes
+        try:
+            # A lista não é alterada depois de pronta: cada mudança monta outra
+            gravar_instantaneo(self.arquivo_instantaneo, dados, assinatura, corpo or serializar_json(dados))
+            self._origem_instantaneo = assinatura
+            return True
+        except Exception as e:
+            print(f"Erro ao gravar instantâneo {self.arquivo_instantaneo}: {e}")
+            return False
+
+    def fechar(self):
+        """Espera a compactação em andamento, atualiza o instantâneo e libera
+        o que estiver aberto com mmap (ao descarregar a coleção)
+
+        Depois de fechada nenhuma compactação começa: outra instância pode
+        abrir os mesmos arquivos e acrescentar ao diário
+        """
+        with self._lock:
+            self._fechada = True
+            compactacao = self._compactacao
+        if compactacao is not None:
+            compactacao.join()
+        self.atualizar_instantaneo()
+        with self._lock:
+            if self._pendente is not None:
+                self._pendente.fechar()
+                self._pendente = None
+                # Uma nova leitura volta a abrir o instantâneo
+                self._assinatura = None
+
+    def adicionar_ouvinte(self, ouvinte):
+        """Registra um objeto com reiniciar(indice) e alterar(chave, anterior, novo)"""
+        with self._lock:
+            self.ouvintes.append(ouvinte)
+            if self._carregado:
+                self._materializar()
+                ouvinte.reiniciar(self._indice)
+
+    def criar_indice(self, campo_data, campos_hash, ordem_padrao='asc'):
+        """Índice para consultas filtradas e paginadas, mantido como ouvinte"""
+        indice = IndiceColecao(campo_data, campos_hash, ordem_padrao=ordem_padrao)
+        self.adicionar_ouvinte(indice)
+        return indice
+
+    def versao_consultas(self):
+        """Versão dos dados vistos pelas consultas do índice (base dos ETags)"""
+        return self.versao
+
+    def _notificar(self, chave, anterior, novo):
+        for ouvinte in self.ouvintes:
+            ouvinte.alterar(chave, anterior, novo)
+
+    def _alterado(self):
+        """Invalida a lista e a resposta serializada após uma alteração no índice"""
+        self._dados = None
+        self._bytes = None
+        self._marcar_versao()
+
+    @contextmanager
+    def _alteracao(self):
+        """Trecho que altera o estado em memória; se falhar, o estado é desfeito"""
+        try:
+            yield
+        except Exception:
+            self._desfazer()
+            raise
+
+    def _desfazer(self):
+        """Descarta de memória as alterações que não foram nem serão gravadas
+
+        O estado volta a ser o do disco mais as operações ainda na fila, na
+        ordem em que foram enfileiradas; índices e totais são reconstruídos
+        """
+        with self._lock:
+            if self._pendente is not None:
+                self._pendente.fechar()
+                self._pendente = None
+            try:
+                assinatura = self._assinatura_disco()
+                indice = indexar_registros(self._ler_disco())
+                for operacao in self.fila.pendentes():
+                    aplicar_operacao(indice, operacao)
+                self._definir(list(indice.values()))
+                self._assinatura = assinatura
+            except Exception as e:
+                print(f"Erro ao reler {self.arquivo}: {e}")
+                # Relido do disco no próximo acesso
+                self._carregado = False
+                self._assinatura = None
+
+    def _dados_atuais(self):
+        self._materializar()
+        # A lista é remontada a partir do índice só quando alguém a pede
+        dados = self._dados
+        if dados is None:
+            with self._lock:
+                if self._dados is None:
+                    self._dados = list(self._indice.values())
+                dados = self._dados
+        return dados
+
+    def _gravar_grupo(self, operacoes):
+        """Grava um grupo de operações (chamado por um único escritor por vez)"""
+        try:
+            if self.diario is not None:
+                self.diario.registrar(operacoes)
+            else:
+                # O estado em memória já inclui todo o grupo (e talvez mais)
+                substituir_arquivo_atomicamente(
+                    self.arquivo, serializar(self._dados_atuais(), indent=2), fsync=self.fsync
+                )
+            self._assinatura = self._assinatura_disco()
+        except Exception:
+            # O grupo saiu da fila: o que ficou em memória dele é descartado
+            self._desfazer()
+            raise
+
+    def _gravar(self, pedido):
+        """Espera a gravação do pedido (fora do lock da coleção)"""
+        self.fila.aguardar(pedido)
+        if self.diario is not None and self.diario.tamanho() > self.limite_diario:
+            self.compactar_em_segundo_plano()
+
+    def _operacoes_salvar(self, dados):
+        """Operações gravadas ao substituir a lista inteira
+
+        Sem diário o arquivo todo é reescrito; o 'set' só serve para _desfazer
+        """
+        if self.diario is None:
+            return [{'op': 'set', 'dados': dados}]
+        return diferencas(self._indice, dados)
+
+    def validar_dados(self, dados):
+        validar_registros(dados)
+
+    def salvar(self, dados):
+        self.validar_dados(dados)
+        with self._lock:
+            self._preparar()
+            operacoes = self._operacoes_salvar(dados)
+            with self._alteracao():
+                self._definir(dados)
+            pedido = self.fila.enfileirar(operacoes)
+
+        try:
+            self._gravar(pedido)
+        except Exception as e:
+            print(f"Erro ao salvar {self.arquivo}: {e}")
+            return False
+        return True
+
+    def obter_registro(self, id_registro):
+        """Busca um registro pelo id em O(1)"""
+        self._preparar()
+        return self._indice.get(str(id_registro))
+
+    def inserir(self, registro):
+        """Acrescenta um registro; retorna None se o id já existir"""
+        registro = dict(registro)
+        if registro.get('id') is None:
+            registro['id'] = gerar_id()
+        registro.setdefault('dataCriacao', datetime.now().isoformat())
+        chave = str(registro['id'])
+
+        with self._lock:
+            self._preparar()
+            if chave in self._indice:
+                return None
+            with self._alteracao():
+                self._indice[chave] = registro
+                self._alterado()
+                self._notificar(chave, None, registro)
+            pedido = self.fila.enfileirar([{'op': 'put', 'registro': registro}])
+
+        self._gravar(pedido)
+        return registro
+
+    def inserir_lote(self, registros):
+        """Acrescenta vários registros em uma única gravação
+
+        Registros cujo id já existe (ou se repete no próprio lote) são
+        ignorados; retorna a lista dos inseridos
+        """
+        agora = datetime.now().isoformat()
+        novos = {}
+        with self._lock:
+            self._preparar()
+            for registro in registros:
+                registro = dict(registro)
+                if registro.get('id') is None:
+                    registro['id'] = gerar_id()
+                registro.setdefault('dataCriacao', agora)
+                chave = str(registro['id'])
+                if chave in self._indice or chave in novos:
+                    continue
+                novos[chave] = registro
+            if not novos:
+                return []
+
+            with self._alteracao():
+                self._indice.update(novos)
+                self._alterado()
+                if len(novos) > LIMITE_NOTIFICACOES_LOTE:
+                    # Mais barato reconstruir índices e totais de uma vez
+                    for ouvinte in self.ouvintes:
+                        ouvinte.reiniciar(self._indice)
+                else:
+                    for chave, registro in novos.items():
+                        self._notificar(chave, None, registro)
+            pedido = self.fila.enfileirar([{'op': 'put', 'registro': registro} for registro in novos.values()])
+
+        self._gravar(pedido)
+        return list(novos.values())
+
+    def atualizar(self, id_registro, campos):
+        """Mescla campos em um registro existente; retorna None se não existir"""
+        chave = str(id_registro)
+        with self._lock:
+            self._preparar()
+            anterior = self._indice.get(chave)
+            if anterior is None:
+                return None
+            registro = {**anterior, **campos, 'id': anterior['id']}
+            with self._alteracao():
+                self._indice[chave] = registro
+                self._alterado()
+                self._notificar(chave, anterior, registro)
+            pedido = self.fila.enfileirar([{'op': 'put', 'registro': registro}])
+
+        self._gravar(pedido)
+        return registro
+
+    def remover(self, id_registro):
+        """Exclui um registro pelo id; retorna False se não existir"""
+        chave = str(id_registro)
+        with self._lock:
+            self._preparar()
+            if chave not in self._indice:
+                return False
+            with self._alteracao():
+                anterior = self._indice.pop(chave)
+                self._alterado()
+                self._notificar(chave, anterior, None)
+            pedido = self.fila.enfileirar([{'op': 'del', 'id': chave}])
+
+        self._gravar(pedido)
+        return True
+
+    def compactar(self):
+        """Incorpora o diário ao snapshot JSON e descarta o trecho já aplicado"""
+        if self.diario is None:
+            return True
+        # A posição vem antes do snapshot: tudo o que já está no diário até
+        # ela foi aplicado em memória antes de ser enfileirado
+        posicao = self.diario.tamanho()
+        if posicao == 0:
+            return True
+        while True:
+            # Só com a fila vazia a memória é igual ao que já foi gravado: uma
+            # operação ainda na fila pode falhar e não deve entrar no snapshot
+            self.fila.aguardar_livre()
+            with self._lock:
+                if self.fila.ocupada():
+                    continue
+                self._preparar()
+                dados = self._dados_atuais()
+                break
+
+        try:
+            substituir_arquivo_atomicamente(self.arquivo, serializar(dados, indent=2), fsync=self.fsync)
+            with self._lock:
+                # Operações acrescentadas durante a escrita ficam no diário
+                self.diario.descartar_ate(posicao)
+                self._assinatura = self._assinatura_disco()
+            self.atualizar_instantaneo()
+            return True
+        except Exception as e:
+            print(f"Erro ao compactar {self.arquivo}: {e}")
+            return False
+
+    def compactar_em_segundo_plano(self):
+        """Dispara a compactação em uma thread se nenhuma estiver em andamento"""
+        def executar():
+            try:
+                self.compactar()
+            finally:
+                self._compactando = False
+
+        with self._lock:
+            if self._compactando or self._fechada:
+                return
+            self._compactando = True
+            self._compactacao = threading.Thread(
+                target=executar, name=f"compactar-{os.path.basename(self.arquivo)}", daemon=True)
+            self._compactacao.start()
+
+
+class DepositoDados:
+    """Conjunto de arquivos de dados do sistema mantidos em memória"""
+
+    def __init__(self, contas_file, entradas_file, config_file,
+                 usar_diario=False, limite_diario=1024 * 1024, fsync=False, usar_instantaneo=False):
+        opcoes = dict(usar_diario=usar_diario, limite_diario=limite_diario, fsync=fsync,
+                      usar_instantaneo=usar_instantaneo)
+        self.contas = ColecaoEmCache(contas_file, **opcoes)
+        self.entradas = ColecaoEmCache(entradas_file, **opcoes)
+        self.config = ArquivoEmCache(config_file, {}, fsync=fsync)
+
+    def compactar(self):
+        """Incorpora os diários pendentes aos arquivos JSON"""
+        return self.contas.compactar() and self.entradas.compactar()
+
+    def versoes(self):
+        """Versões atuais de contas, entradas e config (após verificar o disco)"""
+        return tuple(arquivo.versao_atual() for arquivo in (self.contas, self.entradas, self.config))
+
+    def preparar(self):
+        """Monta registros, índices e ouvintes das coleções (para chamar em segundo plano)"""
+        self.contas.verificar()
+        self.entradas.verificar()
+
+    def atualizar_instantaneos(self):
+        """Regrava os instantâneos desatualizados (ex.: ao encerrar o servidor)"""
+        self.contas.atualizar_instantaneo()
+        self.entradas.atualizar_instantaneo()
+
+    def fechar(self):
+        """Deixa os arquivos prontos para o próximo início e libera os instantâneos abertos"""
+        self.contas.fechar()
+        self.entradas.fechar()
+
+    def ultima_alteracao(self):
+        """Momento da alteração mais recente entre os arquivos de dados"""
+        return max(a.alterado_em or '' for a in (self.contas, self.entradas, self.config)) or None
+
+    def dados_completos_partes(self, ultima_atualizacao, fonte):
+        """Partes do corpo de /api/dados, já serializadas, na ordem de envio"""
+        return [
+            b'{"contas":', self.contas.obter_bytes(),
+            b',"entradas":', self.entradas.obter_bytes(),
+            b',"config":', self.config.obter_bytes(),
+            b',"ultimaAtualizacao":', serializar_json(ultima_atualizacao),
+            b',"fonte":', serializar_json(fonte),
+            b'}'
+        ]
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Armazenamento em banco SQLite (modo WAL) com a mesma interface do DepositoDados
+
+Os dados continuam em memória para as leituras completas e para os
+agregados, mas cada grupo da fila de gravação vira uma transação no banco.
+Uma revisão por tabela, incrementada a cada transação, mostra quando outro
+processo alterou o banco, então vários processos do servidor podem
+compartilhar o mesmo arquivo. Consultas filtradas usam os índices do banco
+
+Uso pela linha de comando:
+    python armazenamento_sqlite.py migrar [--substituir]
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from agregados import data_valida
+from armazenamento import ArquivoEmCache, ColecaoEmCache, DepositoDados
+from diario import chave_registro, diferencas
+from indices import CHAVE_MAXIMA, codificar_cursor, decodificar_cursor
+
+# Colunas extraídas dos registros de cada tabela: o campo de data (ordem
+# das consultas) e os campos usados como filtro, cada um com seu índice
+TABELAS = {
+    'contas': {'data': 'dataVencimento', 'campos': ('status', 'empresa')},
+    'entradas': {'data': 'dataEntrada', 'campos': ('tipoEntrada',)},
+}
+
+# Quanto uma conexão espera por outro processo gravando antes de desistir
+ESPERA_BLOQUEIO_SEGUNDOS = 5
+
+
+def _coluna(nome):
+    return f'"{nome}"'
+
+
+def criar_esquema(conexao):
+    """Cria tabelas e índices que ainda não existem"""
+    for tabela, definicao in TABELAS.items():
+        data = _coluna(definicao['data'])
+        campos = ''.join(f', {_coluna(campo)} TEXT' for campo in definicao['campos'])
+        conexao.execute(
+            f'CREATE TABLE IF NOT EXISTS {tabela} ('
+            f'ordem INTEGER PRIMARY KEY, chave TEXT NOT NULL UNIQUE, dados TEXT NOT NULL, '
+            f"{data} TEXT NOT NULL DEFAULT ''{campos})"
+        )
+        conexao.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_data ON {tabela} ({data}, chave)')
+        for campo in definicao['campos']:
+            conexao.execute(
+                f'CREATE INDEX IF NOT EXISTS idx_{tabela}_{campo} ON {tabela} ({_coluna(campo)}, {data}, chave)'
+            )
+    conexao.execute('CREATE TABLE IF NOT EXISTS config (id INTEGER PRIMARY KEY CHECK (id = 1), dados TEXT NOT NULL)')
+    conexao.execute('CREATE TABLE IF NOT EXISTS revisoes (nome TEXT PRIMARY KEY, revisao INTEGER NOT NULL)')
+
+
+def ler_revisao(conexao, nome):
+    """Revisão atual de uma tabela (0 se nunca foi gravada)"""
+    linha = conexao.execute('SELECT revisao FROM revisoes WHERE nome = ?', (nome,)).fetchone()
+    return linha[0] if linha else 0
+
+
+def incrementar_revisao(conexao, nome):
+    """Incrementa a revisão dentro da transação atual e retorna o novo valor"""
+    conexao.execute(
+        'INSERT INTO revisoes (nome, revisao) VALUES (?, 1) '
+        'ON CONFLICT(nome) DO UPDATE SET revisao = revisao + 1', (nome,)
+    )
+    return ler_revisao(conexao, nome)
+
+
+def ler_tabelas_somente_leitura(arquivo, tabelas):
+    """{tabela: registros} lidos em uma única transação com o banco aberto
+    só para leitura: sem criar o arquivo, o esquema ou um checkpoint"""
+    if not os.path.exists(arquivo):
+        return {tabela: [] for tabela in tabelas}
+    conexao = sqlite3.connect(f'file:{quote(os.path.abspath(arquivo))}?mode=ro', uri=True,
+                              timeout=ESPERA_BLOQUEIO_SEGUNDOS, isolation_level=None)
+    try:
+        conexao.execute('BEGIN')
+        existentes = {nome for nome, in conexao.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        registros = {}
+        for tabela in tabelas:
+            linhas = []
+            if tabela in existentes:
+                linhas = conexao.execute(f'SELECT dados FROM {tabela} ORDER BY ordem').fetchall()
+            registros[tabela] = json.loads('[' + ','.join(dados for dados, in linhas) + ']')
+        conexao.execute('COMMIT')
+        return registros
+    finally:
+        conexao.close()
+
+
+class BancoSQLite:
+    """Arquivo do banco: uma conexão de escrita e conexões de leitura reaproveitadas
+
+    Com `fsync` cada transação só termina depois de chegar ao disco
+    (synchronous=FULL); sem ele o WAL é sincronizado só nos checkpoints
+    """
+
+    def __init__(self, arquivo, fsync=False):
+        self.arquivo = arquivo
+        self.fsync = fsync
+        self._lock_escrita = threading.Lock()
+        self._leitura = queue.LifoQueue()
+        self._escrita = self._conectar()
+        self._escrita.execute('PRAGMA journal_mode=WAL')
+        with self.transacao() as conexao:
+            criar_esquema(conexao)
+
+    def _conectar(self):
+        conexao = sqlite3.connect(
+            self.arquivo, timeout=ESPERA_BLOQUEIO_SEGUNDOS,
+            isolation_level=None, check_same_thread=False
+        )
+        conexao.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'NORMAL'}")
+        return conexao
+
+    @contextmanager
+    def transacao(self):
+        """Transação de escrita (BEGIN IMMEDIATE), desfeita se houver exceção"""
+        with self._lock_escrita:
+            conexao = self._escrita
+            conexao.execute('BEGIN IMMEDIATE')
+            try:
+                yield conexao
+                conexao.execute('COMMIT')
+            except BaseException:
+                if conexao.in_transaction:
+                    conexao.execute('ROLLBACK')
+                raise
+
+    @contextmanager
+    def leitura(self):
+        """Conexão de leitura emprestada do conjunto compartilhado entre as threads"""
+        try:
+            conexao = self._leitura.get_nowait()
+        except queue.Empty:
+            conexao = self._conectar()
+        try:
+            yield conexao
+        finally:
+            self._leitura.put(conexao)
+
+    def revisao(self, nome):
+        """Revisão já gravada no banco de uma tabela"""
+        with self.leitura() as conexao:
+            return ler_revisao(conexao, nome)
+
+    def checkpoint(self):
+        """Incorpora o WAL ao arquivo principal do banco"""
+        try:
+            with self._lock_escrita:
+                self._escrita.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            return True
+        except Exception as e:
+            print(f"Erro no checkpoint de {self.arquivo}: {e}")
+            return False
+
+    def fechar(self):
+        """Checkpoint e fechamento das conexões (ao descarregar o banco)"""
+        self.checkpoint()
+        with self._lock_escrita:
+            self._escrita.close()
+        while True:
+            try:
+                self._leitura.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class ConsultaSQLite:
+    """Consultas filtradas e paginadas direto nos índices do banco
+
+    Mesmos parâmetros e resultado de IndiceColecao.consultar
+    """
+
+    def __init__(self, colecao, campos_hash, ordem_padrao='asc'):
+        self.colecao = colecao
+        self.campos_hash = tuple(campos_hash)
+        self.ordem_padrao = ordem_padrao
+
+    def consultar(self, filtros=None, de=None, ate=None, ordem=None, limite=50, cursor=None):
+        """Consulta uma página de registros (ver IndiceColecao.consultar)"""
+        filtros = filtros or {}
+        for campo in filtros:
+            if campo not in self.campos_hash:
+                raise ValueError(f'Filtro não suportado: {campo}')
+        decrescente = (ordem or self.ordem_padrao) == 'desc'
+        apos = decodificar_cursor(cursor) if cursor else None
+        data = _coluna(self.colecao.campo_data)
+
+        condicoes, parametros = [], []
+        for campo, valor in filtros.items():
+            condicoes.append(f'{_coluna(campo)} = ?')
+            parametros.append(valor)
+        if de:
+            condicoes.append(f'{data} >= ?')
+            parametros.append(de)
+        if ate:
+            condicoes.append(f'({data}, chave) <= (?, ?)')
+            parametros.extend((ate, CHAVE_MAXIMA))
+        if apos is not None:
+            condicoes.append(f"({data}, chave) {'<' if decrescente else '>'} (?, ?)")
+            parametros.extend(apos)
+
+        direcao = 'DESC' if decrescente else 'ASC'
+        sql = f'SELECT {data}, chave, dados FROM {self.colecao.tabela}'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += f' ORDER BY {data} {direcao}, chave {direcao} LIMIT ?'
+        parametros.append(limite + 1)
+
+        with self.colecao.banco.leitura() as conexao:
+            linhas = conexao.execute(sql, parametros).fetchall()
+
+        itens = [json.loads(dados) for _, _, dados in linhas[:limite]]
+        proximo = codificar_cursor(linhas[limite - 1][:2]) if len(linhas) > limite else None
+        return {'itens': itens, 'proximoCursor': proximo, 'limite': limite}
+
+
+class ColecaoSQLite(ColecaoEmCache):
+    """Coleção gravada em uma tabela do banco
+
+    Mesma interface da ColecaoEmCache; a assinatura do "disco" é a revisão
+    da tabela e cada grupo da fila de gravação é uma única transação
+    """
+
+    def __init__(self, banco, tabela):
+        super().__init__(f'{banco.arquivo}:{tabela}', fsync=banco.fsync)
+        self.banco = banco
+        self.tabela = tabela
+        self.campo_data = TABELAS[tabela]['data']
+        self.campos = TABELAS[tabela]['campos']
+
+        colunas = [_coluna(nome) for nome in ('chave', 'dados', self.campo_data) + self.campos]
+        self._sql_gravar = (
+            f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+            f"ON CONFLICT(chave) DO UPDATE SET "
+            + ', '.join(f'{coluna} = excluded.{coluna}' for coluna in colunas[1:])
+        )
+
+    def _linha(self, chave, registro):
+        """Valores da linha de um registro; filtros só casam com campos de texto"""
+        valores = [
+            chave,
+            json.dumps(registro, ensure_ascii=False, separators=(',', ':')),
+            data_valida(registro.get(self.campo_data)) or '',
+        ]
+        for campo in self.campos:
+            valor = registro.get(campo)
+            valores.append(valor if isinstance(valor, str) else None)
+        return valores
+
+    def _assinatura_disco(self):
+        return self.banco.revisao(self.tabela)
+
+    def _ler_disco(self):
+        with self.banco.leitura() as conexao:
+            linhas = conexao.execute(f'SELECT dados FROM {self.tabela} ORDER BY ordem').fetchall()
+        return json.loads('[' + ','.join(dados for dados, in linhas) + ']')
+
+    def _operacoes_salvar(self, dados):
+        return diferencas(self._indice, dados)
+
+    def _aplicar(self, conexao, operacao):
+        """Executa uma operação do diário na tabela (mesma semântica de aplicar_operacao)"""
+        tipo = operacao.get('op')
+        if tipo == 'put':
+            registro = operacao['registro']
+            conexao.execute(self._sql_gravar, self._linha(str(registro['id']), registro))
+        elif tipo == 'del':
+            conexao.execute(f'DELETE FROM {self.tabela} WHERE chave = ?', (str(operacao['id']),))
+        elif tipo == 'set':
+            conexao.execute(f'DELETE FROM {self.tabela}')
+            conexao.executemany(self._sql_gravar, (
+                self._linha(chave_registro(registro, i), registro)
+                for i, registro in enumerate(operacao['dados'])
+            ))
+
+    def _gravar_grupo(self, operacoes):
+        if not operacoes:
+            return
+        try:
+            with self.banco.transacao() as conexao:
+                anterior = ler_revisao(conexao, self.tabela)
+                for operacao in operacoes:
+                    self._aplicar(conexao, operacao)
+                revisao = incrementar_revisao(conexao, self.tabela)
+            # Se outro processo gravou desde a última leitura, o estado em
+            # memória não tem as alterações dele: relê quando a fila esvaziar
+            self._assinatura = revisao if anterior == self._assinatura else None
+        except Exception:
+            # A transação foi desfeita; a memória volta a ser a do banco
+            self._desfazer()
+            raise
+
+    def criar_indice(self, campo_data, campos_hash, ordem_padrao='asc'):
+        if campo_data != self.campo_data or not set(campos_hash) <= set(self.campos):
+            raise ValueError(f'Tabela {self.tabela} não tem índice para {campo_data}/{campos_hash}')
+        return ConsultaSQLite(self, campos_hash, ordem_padrao=ordem_padrao)
+
+    def versao_consultas(self):
+        # As consultas leem o banco, que só muda quando uma transação termina;
+        # a versão em memória já avança antes disso
+        return ('sqlite', self.banco.revisao(self.tabela))
+
+    def compactar(self):
+        return self.banco.checkpoint()
+
+
+class ConfigSQLite(ArquivoEmCache):
+    """Objeto de configuração guardado em uma única linha do banco"""
+
+    def __init__(self, banco):
+        super().__init__(f'{banco.arquivo}:config', {}, fsync=banco.fsync)
+        self.banco = banco
+
+    def _assinatura_disco(self):
+        return self.banco.revisao('config')
+
+    def _ler_disco(self):
+        with self.banco.leitura() as conexao:
+            linha = conexao.execute('SELECT dados FROM config WHERE id = 1').fetchone()
+        return json.loads(linha[0]) if linha else {}
+
+    def salvar(self, dados):
+        self.validar_dados(dados)
+        with self._lock:
+            try:
+                with self.banco.transacao() as conexao:
+                    conexao.execute(
+                        'INSERT INTO config (id, dados) VALUES (1, ?) '
+                        'ON CONFLICT(id) DO UPDATE SET dados = excluded.dados',
+                        (json.dumps(dados, ensure_ascii=False, separators=(',', ':')),)
+                    )
+                    revisao = incrementar_revisao(conexao, 'config')
+            except Exception as e:
+                print(f"Erro ao salvar {self.arquivo}: {e}")
+                return False
+            self._definir(dados)
+            self._assinatura = revisao
+            return True
+
+
+class DepositoSQLite(DepositoDados):
+    """Contas, entradas e config em um único banco SQLite"""
+
+    def __init__(self, arquivo, fsync=False):
+        self.banco = BancoSQLite(arquivo, fsync=fsync)
+        self.contas = ColecaoSQLite(self.banco, 'contas')
+        self.entradas = ColecaoSQLite(self.banco, 'entradas')
+        self.config = ConfigSQLite(self.banco)
+
+    def compactar(self):
+        return self.banco.checkpoint()
+
+    def fechar(self):
+        self.banco.fechar()
+
+
+def migrar(data_dir, arquivo_banco, substituir=False):
+    """Copia os arquivos JSON de data_dir (com diários pendentes) para o banco"""
+    origem = DepositoDados(
+        os.path.join(data_dir, 'contas.json'),
+        os.path.join(data_dir, 'entradas.json'),
+        os.path.join(data_dir, 'config.json'),
+        usar_diario=True
+    )
+    destino = DepositoSQLite(arquivo_banco, fsync=True)
+    if not substituir and (destino.contas.obter() or destino.entradas.obter()):
+        raise ValueError(f'{arquivo_banco} já tem dados; use --substituir para sobrescrever')
+
+    totais = {}
+    for nome in ('contas', 'entradas', 'config'):
+        dados = getattr(origem, nome).obter()
+        if not getattr(destino, nome).salvar(dados):
+            raise RuntimeError(f'Falha ao gravar {nome} em {arquivo_banco}')
+        totais[nome] = len(dados)
+    destino.compactar()
+    return totais
+
+
+def main(argv):
+    """Linha de comando: migrar os arquivos JSON de data/ para o banco"""
+    data_dir = os.environ.get('DATA_DIR', 'data')
+    arquivo_banco = os.environ.get('BANCO_SQLITE', os.path.join(data_dir, 'dados.db'))
+    comando = argv[1] if len(argv) > 1 else None
+
+    if comando == 'migrar':
+        try:
+            totais = migrar(data_dir, arquivo_banco, substituir='--substituir' in argv)
+        except (ValueError, RuntimeError) as e:
+            print(f"Erro: {e}")
+            return 1
+        print(f"Migrado para {arquivo_banco}: {totais['contas']} contas, "
+              f"{totais['entradas']} entradas, {totais['config']} chaves de config")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Arquivos estáticos da interface servidos da memória
+Na inicialização cada arquivo de static/ é lido, ganha um endereço com o
+hash do conteúdo (js/app.<hash>.js) e versões gzip/brotli já comprimidas;
+o index.html é reescrito para apontar para esses endereços, que podem
+ficar no cache do navegador para sempre, enquanto ele mesmo é revalidado
+a cada carregamento
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from compressao import TAMANHO_MINIMO, codificacoes_suportadas, comprimir_estatico
+
+PAGINA_PRINCIPAL = 'index.html'
+TAMANHO_HASH = 10
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# Endereços sem hash e o index.html: o navegador confirma pelo ETag a cada uso
+CACHE_REVALIDAR = 'no-cache'
+
+# Intervalo mínimo entre as verificações de static/ no disco
+INTERVALO_VERIFICACAO = 5.0
+
+# Tipos que compensam comprimir (imagens e ícones já são comprimidos ou pequenos)
+TIPOS_COMPRIMIVEIS = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# src="..." e href="..." locais do index.html
+REFERENCIA = re.compile(r'''\b(src|href)=(["'])([^"'#?:]+)\2''')
+
+
+class Ativo:
+    """Conteúdo de um arquivo estático com as versões comprimidas"""
+
+    def __init__(self, conteudo, tipo):
+        self.conteudo = conteudo
+        self.tipo = tipo
+        self.etag = hashlib.sha256(conteudo).hexdigest()[:20]
+        self.comprimidos = {}
+        if len(conteudo) >= TAMANHO_MINIMO and tipo.startswith(TIPOS_COMPRIMIVEIS):
+            for codificacao in codificacoes_suportadas():
+                comprimido = comprimir_estatico(conteudo, codificacao)
+                if len(comprimido) < len(conteudo):
+                    self.comprimidos[codificacao] = comprimido
+
+
+def endereco_com_hash(caminho, conteudo):
+    """js/app.js -> js/app.<hash do conteúdo>.js"""
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}.{hashlib.sha256(conteudo).hexdigest()[:TAMANHO_HASH]}{extensao}"
+
+
+def tipo_arquivo(caminho):
+    tipo, _ = mimetypes.guess_type(caminho)
+    if caminho.endswith('.js'):
+        # Alguns sistemas (Windows) registram .js com outros tipos
+        tipo = 'application/javascript'
+    return tipo or 'application/octet-stream'
+
+
+class AtivosEstaticos:
+    """Arquivos de um diretório mantidos em memória, relidos só quando mudam no disco
+
+    O disco é verificado no máximo a cada `intervalo` segundos (0: a cada
+    pedido da página, para desenvolvimento; None: só na inicialização)
+    """
+
+    def __init__(self, diretorio, intervalo=INTERVALO_VERIFICACAO):
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._verificado_em = None
+        # caminho -> (Ativo, Cache-Control); o mesmo Ativo com e sem hash
+        self._ativos = {}
+        self.enderecos = {}
+        self.atualizar()
+
+    def _listar(self):
+        """Caminhos relativos (com /) e (mtime, tamanho) de todos os arquivos"""
+        arquivos = {}
+        for raiz, pastas, nomes in os.walk(self.diretorio):
+            pastas[:] = [pasta for pasta in pastas if not pasta.startswith('.') and pasta != 'node_modules']
+            for nome in nomes:
+                if nome.startswith('.'):
+                    continue
+                caminho = os.path.join(raiz, nome)
+                try:
+                    st = os.stat(caminho)
+                except OSError:
+                    continue
+                relativo = os.path.relpath(caminho, self.diretorio).replace(os.sep, '/')
+                arquivos[relativo] = (st.st_mtime_ns, st.st_size)
+        return arquivos
+
+    def atualizar(self):
+        """Relê os arquivos se algum foi criado, alterado ou removido"""
+        self._verificado_em = time.monotonic()
+        arquivos = self._listar()
+        assinatura = tuple(sorted(arquivos.items()))
+        if assinatura == self._assinatura:
+            return False
+
+        with self._lock:
+            if assinatura == self._assinatura:
+                return False
+            ativos = {}
+            enderecos = {}
+            for caminho in arquivos:
+                if caminho == PAGINA_PRINCIPAL:
+                    continue
+                try:
+                    with open(os.path.join(self.diretorio, caminho), 'rb') as f:
+                        conteudo = f.read()
+                except OSError as e:
+                    print(f"Erro ao ler arquivo estático {caminho}: {e}")
+                    continue
+                ativo = Ativo(conteudo, tipo_arquivo(caminho))
+                endereco = endereco_com_hash(caminho, conteudo)
+                enderecos[caminho] = endereco
+                ativos[caminho] = (ativo, CACHE_REVALIDAR)
+                ativos[endereco] = (ativo, CACHE_IMUTAVEL)
+
+            if PAGINA_PRINCIPAL in arquivos:
+                with open(os.path.join(self.diretorio, PAGINA_PRINCIPAL), 'rb') as f:
+                    pagina = f.read().decode('utf-8')
+                pagina = self._reescrever(pagina, enderecos)
+                ativos[PAGINA_PRINCIPAL] = (Ativo(pagina.encode('utf-8'), 'text/html'), CACHE_REVALIDAR)
+
+            self._ativos = ativos
+            self.enderecos = enderecos
+            self._assinatura = assinatura
+            print(f"📦 {len(enderecos) + (PAGINA_PRINCIPAL in ativos)} arquivos estáticos carregados em memória")
+            return True
+
+    @staticmethod
+    def _reescrever(pagina, enderecos):
+        """Troca as referências locais do HTML pelos endereços com hash"""
+        def trocar(correspondencia):
+            atributo, aspas, caminho = correspondencia.groups()
+            relativo = caminho[2:] if caminho.startswith('./') else caminho.lstrip('/')
+            endereco = enderecos.get(relativo)
+            if endereco is None:
+                return correspondencia.group(0)
+            prefixo = caminho[:len(caminho) - len(relativo)]
+            return f'{atributo}={aspas}{prefixo}{endereco}{aspas}'
+        return REFERENCIA.sub(trocar, pagina)
+
+    def obter(self, caminho):
+        """(Ativo, Cache-Control) de um caminho relativo com ou sem hash, ou None"""
+        if caminho == PAGINA_PRINCIPAL and self.intervalo is not None:
+            # A página é pedida a cada carregamento: é a hora de notar arquivos
+            # alterados no disco, sem custo nos demais pedidos
+            if time.monotonic() - self._verificado_em >= self.intervalo:
+                self.atualizar()
+        return self._ativos.get(caminho)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backups deduplicados e comprimidos dos dados do sistema
+
+Os registros de cada coleção são agrupados em blocos com fronteiras
+definidas pelo id dos registros, então inserir ou excluir um registro só
+altera o bloco em que ele está. Cada bloco é comprimido e gravado uma única
+vez em data/backups/blocos/, endereçado pelo SHA-256 do conteúdo; cada
+backup é só um manifesto com a lista de blocos
+
+Uso pela linha de comando:
+    python backup.py criar
+    python backup.py listar
+    python backup.py restaurar <id_backup>
+(com ARMAZENAMENTO=sqlite os dados vêm do banco data/dados.db e voltam para ele)
+"""
+
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+from diario import substituir_arquivo_atomicamente
+from metricas import bytes_gravados, cronometrar
+
+# Em média um bloco a cada 64 registros
+DIVISOR_BLOCO = 64
+
+# Quantos backups manter em cada faixa da política de retenção; as faixas
+# só raleiam os backups agendados: os manuais (pedidos pela API ou pela
+# linha de comando) ficam pelos `manual` mais recentes e os `recentes`
+# últimos de qualquer origem nunca são apagados
+RETENCAO_PADRAO = {'horario': 24, 'diario': 7, 'semanal': 4, 'manual': 10, 'recentes': 3}
+
+ORIGEM_MANUAL = 'manual'
+ORIGEM_AGENDADO = 'agendado'
+
+# Tarefas concluídas lembradas para GET /api/backup/tarefas/<id>
+LIMITE_TAREFAS = 100
+
+FORMATO_ID = "%Y%m%d_%H%M%S"
+
+
+def _hash(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def _fim_de_bloco(registro):
+    """Fronteira de bloco definida pelo conteúdo (id) do registro"""
+    chave = registro.get('id') if isinstance(registro, dict) else None
+    if chave is None:
+        return False
+    return int(_hash(str(chave).encode('utf-8'))[:8], 16) % DIVISOR_BLOCO == 0
+
+
+def dividir_em_blocos(dados):
+    """Divide uma coleção em blocos JSON; outros tipos viram um bloco único"""
+    if not isinstance(dados, list):
+        return [json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')]
+
+    blocos = []
+    atual = []
+    for registro in dados:
+        atual.append(registro)
+        if _fim_de_bloco(registro):
+            blocos.append(atual)
+            atual = []
+    if atual:
+        blocos.append(atual)
+    return [json.dumps(bloco, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for bloco in blocos]
+
+
+class RepositorioBackup:
+    """Blocos e manifestos de backup em um diretório"""
+
+    def __init__(self, diretorio, retencao=None):
+        self.diretorio = diretorio
+        self.dir_blocos = os.path.join(diretorio, 'blocos')
+        self.dir_manifestos = os.path.join(diretorio, 'manifestos')
+        self.retencao = dict(RETENCAO_PADRAO, **(retencao or {}))
+        self._lock = threading.Lock()
+        os.makedirs(self.dir_blocos, exist_ok=True)
+        os.makedirs(self.dir_manifestos, exist_ok=True)
+
+    def _caminho_bloco(self, chave):
+        return os.path.join(self.dir_blocos, chave[:2], chave + '.zz')
+
+    def _caminho_manifesto(self, id_backup):
+        return os.path.join(self.dir_manifestos, id_backup + '.json')
+
+    def _gravar_bloco(self, conteudo):
+        """Grava o bloco se ainda não existir; retorna (hash, bytes gravados)"""
+        chave = _hash(conteudo)
+        caminho = self._caminho_bloco(chave)
+        if os.path.exists(caminho):
+            return chave, 0
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        comprimido = zlib.compress(conteudo, 6)
+        substituir_arquivo_atomicamente(caminho, comprimido, fsync=False)
+        return chave, len(comprimido)
+
+    def _ler_bloco(self, chave):
+        with open(self._caminho_bloco(chave), 'rb') as f:
+            conteudo = zlib.decompress(f.read())
+        if _hash(conteudo) != chave:
+            raise ValueError(f"Bloco corrompido: {chave}")
+        return conteudo
+
+    @cronometrar('criar_backup')
+    def criar(self, arquivos, origem=ORIGEM_MANUAL):
+        """Cria um backup de {nome_arquivo: dados}; retorna o manifesto"""
+        inicio = time.perf_counter()
+        agora = datetime.now()
+
+        with self._lock:
+            id_backup = agora.strftime(FORMATO_ID)
+            sufixo = 1
+            while os.path.exists(self._caminho_manifesto(id_backup)):
+                id_backup = f"{agora.strftime(FORMATO_ID)}_{sufixo}"
+                sufixo += 1
+
+            manifesto = {
+                'id': id_backup,
+                'criadoEm': agora.isoformat(),
+                'origem': origem,
+                'arquivos': {},
+                'tamanhoOriginal': 0,
+                'tamanhoGravado': 0,
+                'blocosNovos': 0,
+                'blocosReutilizados': 0
+            }
+            for nome, dados in arquivos.items():
+                chaves = []
+                for conteudo in dividir_em_blocos(dados):
+                    chave, gravado = self._gravar_bloco(conteudo)
+                    chaves.append(chave)
+                    manifesto['tamanhoOriginal'] += len(conteudo)
+                    manifesto['tamanhoGravado'] += gravado
+                    if gravado:
+                        manifesto['blocosNovos'] += 1
+                    else:
+                        manifesto['blocosReutilizados'] += 1
+                manifesto['arquivos'][nome] = {
+                    'tipo': 'lista' if isinstance(dados, list) else 'objeto',
+                    'registros': len(dados) if isinstance(dados, list) else None,
+                    'blocos': chaves
+                }
+
+            manifesto['duracao'] = round(time.perf_counter() - inicio, 4)
+            conteudo = json.dumps(manifesto, ensure_ascii=False, indent=2).encode('utf-8')
+            substituir_arquivo_atomicamente(self._caminho_manifesto(id_backup), conteudo)
+            bytes_gravados.incrementar('backups', valor=manifesto['tamanhoGravado'] + len(conteudo))
+
+        self.aplicar_retencao()
+        return manifesto
+
+    def listar(self):
+        """Manifestos existentes, do mais recente para o mais antigo"""
+        manifestos = []
+        for nome in os.listdir(self.dir_manifestos):
+            if not nome.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.dir_manifestos, nome), 'r', encoding='utf-8') as f:
+                    manifestos.append(json.load(f))
+            except Exception as e:
+                print(f"Manifesto inválido {nome}: {e}")
+        manifestos.sort(key=lambda m: m['criadoEm'], reverse=True)
+        return manifestos
+
+    def carregar(self, id_backup):
+        """Reconstrói {nome_arquivo: dados} de um backup"""
+        if not id_backup.replace('_', '').isdigit():
+            raise FileNotFoundError(id_backup)
+        with open(self._caminho_manifesto(id_backup), 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+
+        arquivos = {}
+        for nome, info in manifesto['arquivos'].items():
+            partes = [json.loads(self._ler_bloco(chave)) for chave in info['blocos']]
+            if info['tipo'] == 'lista':
+                arquivos[nome] = [registro for parte in partes for registro in parte]
+            else:
+                arquivos[nome] = partes[0] if partes else {}
+        return arquivos
+
+    def aplicar_retencao(self):
+        """Mantém os backups agendados mais recentes de cada hora/dia/semana,
+        os últimos manuais e os últimos de qualquer origem, e apaga o resto"""
+        faixas = [
+            ('horario', self.retencao['horario'], lambda d: d.strftime('%Y%m%d%H')),
+            ('diario', self.retencao['diario'], lambda d: d.strftime('%Y%m%d')),
+            ('semanal', self.retencao['semanal'], lambda d: d.strftime('%G%V')),
+        ]
+
+        with self._lock:
+            manifestos = self.listar()
+            manter = {m['id'] for m in manifestos[:self.retencao['recentes']]}
+            manuais = [m for m in manifestos if m.get('origem') == ORIGEM_MANUAL]
+            manter.update(m['id'] for m in manuais[:self.retencao['manual']])
+            # Manifestos antigos, sem origem, contam como agendados
+            agendados = [m for m in manifestos if m.get('origem') != ORIGEM_MANUAL]
+            for _, limite, periodo in faixas:
+                vistos = set()
+                for manifesto in agendados:
+                    chave = periodo(datetime.fromisoformat(manifesto['criadoEm']))
+                    if chave in vistos:
+                        continue
+                    if len(vistos) >= limite:
+                        break
+                    vistos.add(chave)
+                    manter.add(manifesto['id'])
+
+            removidos = [m for m in manifestos if m['id'] not in manter]
+            for manifesto in removidos:
+                os.remove(self._caminho_manifesto(manifesto['id']))
+            if removidos:
+                self._coletar_blocos([m for m in manifestos if m['id'] in manter])
+        return [m['id'] for m in removidos]
+
+    def _coletar_blocos(self, manifestos):
+        """Apaga blocos que não são referenciados por nenhum backup mantido"""
+        em_uso = {
+            chave
+            for manifesto in manifestos
+            for info in manifesto['arquivos'].values()
+            for chave in info['blocos']
+        }
+        for raiz, _, nomes in os.walk(self.dir_blocos):
+            for nome in nomes:
+                if nome.endswith('.zz') and nome[:-3] not in em_uso:
+                    os.remove(os.path.join(raiz, nome))
+
+
+class TrabalhadorBackup:
+    """Executa backups em uma thread de fundo, um de cada vez"""
+
+    def __init__(self, repositorio, obter_arquivos):
+        self.repositorio = repositorio
+        self.obter_arquivos = obter_arquivos
+        # Ordem de agendamento: as concluídas mais antigas saem primeiro
+        self.tarefas = OrderedDict()
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._sequencia = 0
+        self._thread = None
+
+    def _iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._executar, name='backup', daemon=True)
+            self._thread.start()
+
+    def agendar(self, repositorio=None, obter_arquivos=None, origem=ORIGEM_MANUAL):
+        """Coloca um backup na fila e retorna o id da tarefa
+
+        Sem argumentos usa o repositório e os arquivos do trabalhador; outros
+        (ex.: os de outra loja) são executados na mesma fila
+        """
+        with self._lock:
+            self._sequencia += 1
+            id_tarefa = str(self._sequencia)
+            self.tarefas[id_tarefa] = {'id': id_tarefa, 'status': 'pendente', 'agendadoEm': datetime.now().isoformat()}
+            self._esquecer_concluidas()
+            self._iniciar()
+        self._fila.put((id_tarefa, repositorio or self.repositorio, obter_arquivos or self.obter_arquivos, origem))
+        return id_tarefa
+
+    def _esquecer_concluidas(self):
+        """Remove as tarefas concluídas mais antigas além de LIMITE_TAREFAS"""
+        excesso = len(self.tarefas) - LIMITE_TAREFAS
+        for id_tarefa, tarefa in list(self.tarefas.items()):
+            if excesso <= 0:
+                break
+            if tarefa['status'] in ('concluido', 'erro'):
+                del self.tarefas[id_tarefa]
+                excesso -= 1
+
+    def agendar_periodico(self, intervalo_segundos):
+        """Agenda um backup a cada `intervalo_segundos`"""
+        def repetir():
+            while True:
+                time.sleep(intervalo_segundos)
+                self.agendar(origem=ORIGEM_AGENDADO)
+        threading.Thread(target=repetir, name='backup-agendado', daemon=True).start()
+
+    def _executar(self):
+        while True:
+            id_tarefa, repositorio, obter_arquivos, origem = self._fila.get()
+            tarefa = self.tarefas[id_tarefa]
+            tarefa['status'] = 'executando'
+            try:
+                manifesto = repositorio.criar(obter_arquivos(), origem)
+                tarefa.update({
+                    'status': 'concluido',
+                    'backupId': manifesto['id'],
+                    'tamanhoOriginal': manifesto['tamanhoOriginal'],
+                    'tamanhoGravado': manifesto['tamanhoGravado'],
+                    'duracao': manifesto['duracao']
+                })
+            except Exception as e:
+                print(f"Erro ao criar backup: {e}")
+                tarefa.update({'status': 'erro', 'erro': str(e)})
+            finally:
+                self._fila.task_done()
+
+
+def resumo_manifesto(manifesto):
+    """Tamanho e duração de um backup, sem a lista de blocos"""
+    return {
+        'id': manifesto['id'],
+        'criadoEm': manifesto['criadoEm'],
+        'origem': manifesto.get('origem', ORIGEM_AGENDADO),
+        'duracao': manifesto.get('duracao'),
+        'tamanhoOriginal': manifesto['tamanhoOriginal'],
+        'tamanhoGravado': manifesto['tamanhoGravado'],
+        'blocosNovos': manifesto['blocosNovos'],
+        'blocosReutilizados': manifesto['blocosReutilizados'],
+        'registros': {nome: info['registros'] for nome, info in manifesto['arquivos'].items()}
+    }
+
+
+def abrir_banco(data_dir):
+    """Depósito SQLite quando o servidor usa ARMAZENAMENTO=sqlite, senão None"""
+    if os.environ.get('ARMAZENAMENTO', 'json').lower() != 'sqlite':
+        return None
+    from armazenamento_sqlite import DepositoSQLite
+    return DepositoSQLite(os.environ.get('BANCO_SQLITE', os.path.join(data_dir, 'dados.db')), fsync=True)
+
+
+def main(argv):
+    """Linha de comando: criar, listar e restaurar backups de data/"""
+    data_dir = os.environ.get('DATA_DIR', 'data')
+    repositorio = RepositorioBackup(os.path.join(data_dir, 'backups'))
+    comando = argv[1] if len(argv) > 1 else 'listar'
+    banco = abrir_banco(data_dir) if comando in ('criar', 'restaurar') else None
+
+    if comando == 'listar':
+        for manifesto in repositorio.listar():
+            info = resumo_manifesto(manifesto)
+            print(f"{info['id']}  {info['tamanhoOriginal']:>10} bytes  "
+                  f"+{info['tamanhoGravado']:>8} gravados  {info['duracao']}s")
+    elif comando == 'criar':
+        from armazenamento import DepositoDados
+        deposito = banco or DepositoDados(
+            os.path.join(data_dir, 'contas.json'),
+            os.path.join(data_dir, 'entradas.json'),
+            os.path.join(data_dir, 'config.json'),
+            usar_diario=True
+        )
+        arquivos = {
+            'contas.json': deposito.contas.obter(),
+            'entradas.json': deposito.entradas.obter(),
+            'config.json': deposito.config.obter(),
+        }
+        print(json.dumps(resumo_manifesto(repositorio.criar(arquivos)), indent=2))
+    elif comando == 'restaurar' and len(argv) > 2 and banco is not None:
+        arquivos = repositorio.carregar(argv[2])
+        for nome in ('contas', 'entradas', 'config'):
+            getattr(banco, nome).salvar(arquivos.get(nome + '.json', {} if nome == 'config' else []))
+            print(f"Restaurado: {nome} em {banco.banco.arquivo}")
+    elif comando == 'restaurar' and len(argv) > 2:
+        # Com o servidor parado: grava os arquivos e descarta diários pendentes
+        for nome, dados in repositorio.carregar(argv[2]).items():
+            destino = os.path.join(data_dir, nome)
+            conteudo = json.dumps(dados, ensure_ascii=False, indent=2).encode('utf-8')
+            substituir_arquivo_atomicamente(destino, conteudo)
+            if os.path.exists(destino + '.diario'):
+                os.remove(destino + '.diario')
+            print(f"Restaurado: {destino}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks da API de persistência e da precificação
+
+Gera contas/entradas sintéticas, mede os endpoints do servidor_json.py pelo
+test client do Flask (percentis de latência e vazão), a leitura/gravação dos
+arquivos e as funções de precificação. O resultado é gravado em JSON e, com
+--base, comparado a uma execução anterior: se algum tempo piorar além da
+tolerância o comando termina com código 1.
+
+Uso:
+    python benchmark.py [--tamanhos 1000,100000,1000000] [--saida resultado.json]
+                        [--base resultado_anterior.json] [--tolerancia 0.5]
+    python benchmark.py gerar --tamanho 100000 [--destino data]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from armazenamento import carregar_dados_arquivo, salvar_dados_arquivo
+
+TAMANHOS_PADRAO = (1000, 100000)
+REPETICOES_PADRAO = 200
+TOLERANCIA_PADRAO = 0.5
+# Diferenças abaixo disso (em ms) são ruído de medição, não regressão
+DIFERENCA_MINIMA_MS = 0.1
+METRICAS_COMPARADAS = ('p50_ms',)
+
+EMPRESAS = ['Frigorífico Boi Gordo', 'Distribuidora Central', 'Embalagens Sul',
+            'Energia Elétrica', 'Água e Esgoto', 'Aluguel', 'Contabilidade Silva',
+            'Transportadora Rápida', 'Laticínios Serra', 'Gás Bom']
+TAXAS_ENTRADA = {'Voucher': 0.88, 'Débito': 0.98, 'Crédito': 0.965, 'Pix': 0.98, 'Dinheiro': 0.99}
+DATA_INICIAL = date(2023, 1, 1)
+DIAS_PERIODO = 3 * 365
+
+
+def _data(rnd):
+    return (DATA_INICIAL + timedelta(days=rnd.randrange(DIAS_PERIODO))).isoformat()
+
+
+def gerar_contas(quantidade, semente=1):
+    """Contas à pagar sintéticas no formato gravado pelo front-end"""
+    rnd = random.Random(semente)
+    contas = []
+    for i in range(quantidade):
+        contas.append({
+            'empresa': rnd.choice(EMPRESAS),
+            'valor': round(rnd.uniform(50, 15000), 2),
+            'dataVencimento': _data(rnd),
+            'especificacao': f'Nota {rnd.randrange(100000)}',
+            'status': 'pago' if rnd.random() < 0.7 else 'à pagar',
+            'id': f'{rnd.getrandbits(40):010x}{i:x}',
+            'dataCriacao': datetime(2023, 1, 1).isoformat(),
+        })
+    return contas
+
+
+def gerar_entradas(quantidade, semente=2):
+    """Entradas sintéticas com o valor calculado pela tabela de taxas"""
+    rnd = random.Random(semente)
+    tipos = list(TAXAS_ENTRADA)
+    entradas = []
+    for i in range(quantidade):
+        tipo = rnd.choice(tipos)
+        valor = round(rnd.uniform(5, 3000), 2)
+        entradas.append({
+            'dataEntrada': _data(rnd),
+            'valorBruto': valor,
+            'valorCalculado': valor * TAXAS_ENTRADA[tipo],
+            'tipoEntrada': tipo,
+            'id': f'{rnd.getrandbits(40):010x}{i:x}',
+            'dataCriacao': datetime(2023, 1, 1).isoformat(),
+        })
+    return entradas
+
+
+def estatisticas(tempos):
+    """Percentis (ms) e vazão de uma lista de durações em segundos"""
+    ordenados = sorted(tempos)
+    total = sum(ordenados)
+
+    def percentil(p):
+        return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))] * 1000
+
+    return {
+        'repeticoes': len(ordenados),
+        'media_ms': round(total / len(ordenados) * 1000, 4),
+        'p50_ms': round(percentil(50), 4),
+        'p90_ms': round(percentil(90), 4),
+        'p99_ms': round(percentil(99), 4),
+        'max_ms': round(ordenados[-1] * 1000, 4),
+        'vazao_por_s': round(len(ordenados) / total, 2) if total else None,
+    }
+
+
+def medir(funcao, repeticoes):
+    """Executa funcao() repetidas vezes e retorna as estatísticas"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return estatisticas(tempos)
+
+
+def _requisicao(cliente, metodo, url, status=200, **kwargs):
+    def executar():
+        resposta = cliente.open(url, method=metodo, **kwargs)
+        if resposta.status_code != status:
+            raise RuntimeError(f"{metodo} {url}: HTTP {resposta.status_code} (esperado {status})")
+        return resposta
+    return executar
+
+
+def medir_endpoints(cliente, contas, repeticoes):
+    """Latência dos endpoints principais com os dados já carregados"""
+    tamanho = len(contas)
+    # Respostas com a coleção inteira crescem com o tamanho: menos repetições
+    pesadas = max(3, min(repeticoes, repeticoes * 1000 // max(tamanho, 1)))
+    conta = contas[len(contas) // 2]
+    etag = _requisicao(cliente, 'GET', '/api/contas')().headers['ETag']
+    mes = conta['dataVencimento'][:7]
+    hoje = (DATA_INICIAL + timedelta(days=DIAS_PERIODO // 2)).isoformat()
+    status_alternados = iter(['pago', 'à pagar'] * repeticoes)
+    lote = {'itens': [{'tipo': tipo, 'peso': 50 + i, 'preco': 18 + i % 10}
+                      for i, tipo in enumerate(['Coxão Bola', 'Dianteiro', 'Traseiro'] * 34)][:100]}
+
+    casos = [
+        ('GET /api/contas', pesadas, _requisicao(cliente, 'GET', '/api/contas')),
+        ('GET /api/entradas', pesadas, _requisicao(cliente, 'GET', '/api/entradas')),
+        ('GET /api/dados', pesadas, _requisicao(cliente, 'GET', '/api/dados')),
+        ('GET /api/contas (304)', repeticoes,
+         _requisicao(cliente, 'GET', '/api/contas', 304, headers={'If-None-Match': etag})),
+        ('GET /api/contas?status&limite=50', repeticoes,
+         _requisicao(cliente, 'GET', '/api/contas', query_string={'status': 'à pagar', 'limite': 50})),
+        ('GET /api/entradas?mes&limite=50', repeticoes,
+         _requisicao(cliente, 'GET', '/api/entradas', query_string={'mes': mes, 'limite': 50})),
+        ('GET /api/stats', repeticoes,
+         _requisicao(cliente, 'GET', '/api/stats', query_string={'mes': mes, 'hoje': hoje})),
+        ('GET /api/contas/<id>', repeticoes, _requisicao(cliente, 'GET', f"/api/contas/{conta['id']}")),
+        ('PATCH /api/contas/<id>', repeticoes,
+         lambda: _requisicao(cliente, 'PATCH', f"/api/contas/{conta['id']}",
+                             json={'status': next(status_alternados)})()),
+        ('POST /api/entradas (registro)', repeticoes,
+         _requisicao(cliente, 'POST', '/api/entradas', 201, json={
+             'dataEntrada': hoje, 'valorBruto': 100, 'valorCalculado': 98, 'tipoEntrada': 'Pix'})),
+        ('GET /api/precificar', repeticoes,
+         _requisicao(cliente, 'GET', '/api/precificar',
+                     query_string={'tipo': 'Traseiro', 'peso': 100, 'preco': 25})),
+        ('POST /api/precificar/lote (100 peças)', repeticoes,
+         _requisicao(cliente, 'POST', '/api/precificar/lote', json=lote)),
+    ]
+    resultados = {}
+    for nome, vezes, funcao in casos:
+        resultados[nome] = medir(funcao, vezes)
+    return resultados
+
+
+def medir_arquivos(diretorio, contas, entradas, repeticoes):
+    """carregar_dados_arquivo / salvar_dados_arquivo com os dados sintéticos"""
+    vezes = max(3, min(repeticoes, repeticoes * 1000 // max(len(contas), 1)))
+    resultados = {}
+    for nome, dados in (('contas', contas), ('entradas', entradas)):
+        arquivo = os.path.join(diretorio, f'benchmark_{nome}.json')
+        resultados[f'salvar_dados_arquivo ({nome})'] = medir(
+            lambda: salvar_dados_arquivo(arquivo, dados), vezes)
+        resultados[f'carregar_dados_arquivo ({nome})'] = medir(
+            lambda: carregar_dados_arquivo(arquivo), vezes)
+        resultados[f'tamanho_arquivo_bytes ({nome})'] = os.path.getsize(arquivo)
+    return resultados
+
+
+def medir_precificacao(repeticoes):
+    """Uma peça (com e sem cache), lotes e simulações em grade por primal"""
+    from precificacao import catalogo, lucro_minimo, precificar, precificar_lote, simular_grade
+
+    rnd = random.Random(3)
+    resultados = {}
+    for tipo in catalogo.tipos():
+        pecas = [(rnd.uniform(20, 300), rnd.uniform(8, 45)) for _ in range(repeticoes)]
+        sem_cache = iter(pecas)
+        resultados[f'precificar {tipo} (sem cache)'] = medir(
+            lambda: precificar(tipo, *next(sem_cache)), repeticoes)
+        resultados[f'precificar {tipo} (cache)'] = medir(
+            lambda: precificar(tipo, 100, 25), repeticoes)
+
+        pesos = [rnd.uniform(20, 300) for _ in range(10000)]
+        precos = [rnd.uniform(8, 45) for _ in range(10000)]
+        resultados[f'precificar_lote {tipo} (10000 peças)'] = medir(
+            lambda: precificar_lote(tipo, pesos, precos), max(3, repeticoes // 20))
+
+        # 100 preços x 100 perdas x 100 lucros
+        eixo = {'de': 0, 'ate': 99, 'passo': 1}
+        eixo_precos = {'de': 10, 'ate': 59.5, 'passo': 0.5}
+        resultados[f'simular_grade {tipo} (1000000 pontos)'] = medir(
+            lambda: simular_grade(tipo, 100, eixo_precos, eixo, eixo), 3)
+        resultados[f'lucro_minimo {tipo} (10000 pontos)'] = medir(
+            lambda: lucro_minimo(tipo, 100, eixo_precos, eixo, 500), 3)
+    return resultados
+
+
+def executar_tamanho(tamanho, repeticoes):
+    """Mede endpoints e arquivos com um servidor novo sobre dados sintéticos"""
+    contas = gerar_contas(tamanho)
+    entradas = gerar_entradas(tamanho)
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='benchmark_') as diretorio:
+        os.chdir(diretorio)
+        try:
+            os.makedirs('data')
+            salvar_dados_arquivo(os.path.join('data', 'contas.json'), contas)
+            salvar_dados_arquivo(os.path.join('data', 'entradas.json'), entradas)
+
+            # Servidor novo a cada tamanho: DATA_DIR é relativo ao diretório atual
+            inicio = time.perf_counter()
+            if 'servidor_json' in sys.modules:
+                servidor = importlib.reload(sys.modules['servidor_json'])
+            else:
+                servidor = importlib.import_module('servidor_json')
+            cliente = servidor.app.test_client()
+            _requisicao(cliente, 'GET', '/api/dados')()
+            carga_inicial = time.perf_counter() - inicio
+
+            return {
+                'carga_inicial_ms': round(carga_inicial * 1000, 2),
+                'endpoints': medir_endpoints(cliente, contas, repeticoes),
+                'arquivos': medir_arquivos(diretorio, contas, entradas, repeticoes),
+            }
+        finally:
+            os.chdir(diretorio_original)
+
+
+def achatar(resultado):
+    """{'tamanho/grupo/nome': estatísticas} para comparar execuções"""
+    itens = {}
+    for tamanho, grupos in resultado.get('tamanhos', {}).items():
+        for grupo in ('endpoints', 'arquivos'):
+            for nome, metricas in grupos.get(grupo, {}).items():
+                if isinstance(metricas, dict):
+                    itens[f'{tamanho}/{grupo}/{nome}'] = metricas
+    for nome, metricas in resultado.get('precificacao', {}).items():
+        itens[f'precificacao/{nome}'] = metricas
+    return itens
+
+
+def comparar(atual, base, tolerancia):
+    """Medições que pioraram mais que a tolerância em relação à base"""
+    anteriores = achatar(base)
+    regressoes = []
+    for chave, metricas in achatar(atual).items():
+        anterior = anteriores.get(chave)
+        if not anterior:
+            continue
+        for campo in METRICAS_COMPARADAS:
+            novo, antigo = metricas.get(campo), anterior.get(campo)
+            if novo is None or antigo is None:
+                continue
+            if novo > antigo * (1 + tolerancia) and novo - antigo > DIFERENCA_MINIMA_MS:
+                regressoes.append({
+                    'medicao': chave,
+                    'metrica': campo,
+                    'base': antigo,
+                    'atual': novo,
+                    'variacao': round(novo / antigo - 1, 4) if antigo else None,
+                })
+    return regressoes
+
+
+def imprimir_resumo(resultado):
+    for chave, metricas in achatar(resultado).items():
+        print(f"{chave:<70} p50 {metricas['p50_ms']:>10.3f} ms  "
+              f"p90 {metricas['p90_ms']:>10.3f} ms  {metricas['vazao_por_s'] or 0:>10.1f}/s")
+    for regressao in resultado.get('regressoes', []):
+        print(f"REGRESSÃO {regressao['medicao']} {regressao['metrica']}: "
+              f"{regressao['base']} -> {regressao['atual']} ms")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmarks da API e da precificação')
+    parser.add_argument('comando', nargs='?', default='executar', choices=('executar', 'gerar'))
+    parser.add_argument('--tamanhos', default=','.join(str(t) for t in TAMANHOS_PADRAO),
+                        help='quantidades de contas/entradas, separadas por vírgula')
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO)
+    parser.add_argument('--saida', default=None, help='arquivo JSON do resultado')
+    parser.add_argument('--base', default=None, help='resultado anterior para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help='piora relativa aceita antes de falhar (0.5 = 50%%)')
+    parser.add_argument('--tamanho', type=int, default=1000, help='registros gerados (comando gerar)')
+    parser.add_argument('--destino', default='data', help='diretório dos arquivos gerados (comando gerar)')
+    args = parser.parse_args(argv[1:])
+
+    if args.comando == 'gerar':
+        os.makedirs(args.destino, exist_ok=True)
+        salvar_dados_arquivo(os.path.join(args.destino, 'contas.json'), gerar_contas(args.tamanho))
+        salvar_dados_arquivo(os.path.join(args.destino, 'entradas.json'), gerar_entradas(args.tamanho))
+        print(f"Gerados {args.tamanho} contas e {args.tamanho} entradas em {args.destino}/")
+        return 0
+
+    tamanhos = [int(t) for t in args.tamanhos.split(',') if t.strip()]
+    resultado = {
+        'criadoEm': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'repeticoes': args.repeticoes,
+        'tamanhos': {},
+        'precificacao': medir_precificacao(args.repeticoes),
+    }
+    for tamanho in tamanhos:
+        print(f"⏱️  {tamanho} registros...")
+        resultado['tamanhos'][str(tamanho)] = executar_tamanho(tamanho, args.repeticoes)
+
+    if args.base:
+        with open(args.base, 'r', encoding='utf-8') as f:
+            resultado['base'] = args.base
+            resultado['regressoes'] = comparar(resultado, json.load(f), args.tolerancia)
+
+    saida = args.saida or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    imprimir_resumo(resultado)
+    print(f"Resultado gravado em {saida}")
+    return 1 if resultado.get('regressoes') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
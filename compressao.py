@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compressão de respostas HTTP negociada pelo cabeçalho Accept-Encoding
+Usa brotli quando o pacote estiver instalado e gzip (biblioteca padrão) nos demais casos
+"""
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+# Respostas menores que isso não compensam o custo de comprimir
+TAMANHO_MINIMO = 1024
+
+# Respostas em partes maiores que isso são comprimidas enquanto são
+# enviadas, em fatias, sem guardar o corpo comprimido inteiro
+TAMANHO_MAXIMO_CACHE = 1024 * 1024
+TAMANHO_FATIA = 64 * 1024
+
+
+def codificacoes_suportadas():
+    """Codificações disponíveis, da preferida para a menos preferida"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def escolher_codificacao(accept_encoding):
+    """Escolhe a melhor codificação aceita pelo cliente (ou None)"""
+    aceitas = {}
+    for parte in (accept_encoding or '').split(','):
+        nome, _, parametros = parte.strip().partition(';')
+        qualidade = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                qualidade = float(parametros[2:])
+            except ValueError:
+                qualidade = 0.0
+        if nome:
+            aceitas[nome.strip().lower()] = qualidade
+
+    for codificacao in codificacoes_suportadas():
+        if aceitas.get(codificacao, aceitas.get('*', 0)) > 0:
+            return codificacao
+    return None
+
+
+def comprimir(corpo, codificacao):
+    """Comprime bytes (ou uma lista de partes em bytes) com a codificação escolhida"""
+    if not isinstance(corpo, bytes):
+        return comprimir_partes(corpo, codificacao)
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=5)
+    if codificacao == 'gzip':
+        return gzip.compress(corpo, compresslevel=6, mtime=0)
+    return corpo
+
+
+def comprimir_estatico(corpo, codificacao):
+    """Compressão máxima, para conteúdo comprimido uma única vez e servido muitas"""
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=11)
+    if codificacao == 'gzip':
+        return gzip.compress(corpo, compresslevel=9, mtime=0)
+    return corpo
+
+
+def comprimir_em_fluxo(partes, codificacao, tamanho_fatia=TAMANHO_FATIA):
+    """Gera o corpo comprimido aos poucos, fatia a fatia de cada parte"""
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=5)
+        comprimir_fatia, finalizar = compressor.process, compressor.finish
+    elif codificacao == 'gzip':
+        # wbits=31: formato gzip, o mesmo de gzip.compress
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        comprimir_fatia, finalizar = compressor.compress, compressor.flush
+    else:
+        yield from partes
+        return
+    for parte in partes:
+        for inicio in range(0, len(parte), tamanho_fatia):
+            saida = comprimir_fatia(parte[inicio:inicio + tamanho_fatia])
+            if saida:
+                yield saida
+    yield finalizar()
+
+
+def comprimir_partes(partes, codificacao):
+    """Comprime as partes em sequência, sem juntá-las em um único corpo antes"""
+    return b''.join(comprimir_em_fluxo(partes, codificacao))
+
+
+class CacheCompressao:
+    """Corpos comprimidos recentes indexados por (ETag, codificação)"""
+
+    def __init__(self, capacidade=64):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, etag, codificacao, corpo):
+        """Corpo comprimido, reaproveitado enquanto o ETag não mudar"""
+        if not etag:
+            return comprimir(corpo, codificacao)
+
+        chave = (etag, codificacao)
+        with self._lock:
+            comprimido = self._itens.get(chave)
+            if comprimido is not None:
+                self._itens.move_to_end(chave)
+                return comprimido
+
+        comprimido = comprimir(corpo, codificacao)
+        with self._lock:
+            self._itens[chave] = comprimido
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+        return comprimido
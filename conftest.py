@@ -0,0 +1 @@
+# Os testes em tests/ importam os módulos da raiz do projeto (servidor_json, armazenamento...)
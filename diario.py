@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diário de alterações (write-ahead journal) das coleções de dados
+Cada alteração é acrescentada como uma linha JSON no arquivo <colecao>.diario;
+o estado atual é o snapshot JSON mais a reaplicação do diário
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from json_em_blocos import serializar
+from metricas import bytes_gravados, bytes_lidos
+
+
+def substituir_arquivo_atomicamente(arquivo, conteudo, fsync=True):
+    """Grava bytes (ou blocos de bytes) em um arquivo temporário e o renomeia sobre o destino"""
+    diretorio = os.path.dirname(os.path.abspath(arquivo))
+    fd, temporario = tempfile.mkstemp(prefix='.tmp_', dir=diretorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(conteudo, bytes):
+                f.write(conteudo)
+            else:
+                for bloco in conteudo:
+                    f.write(bloco)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(temporario, arquivo)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    if fsync and hasattr(os, 'O_DIRECTORY'):
+        # Garante que a renomeação em si chegou ao disco
+        fd_dir = os.open(diretorio, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd_dir)
+        finally:
+            os.close(fd_dir)
+
+
+def chave_registro(registro, posicao):
+    """Chave do registro no índice; registros sem id recebem chave posicional"""
+    if isinstance(registro, dict) and registro.get('id') is not None:
+        return str(registro['id'])
+    return f"__sem_id_{posicao}"
+
+
+def indexar_registros(dados):
+    """Converte a lista de registros em dicionário ordenado chave -> registro"""
+    return {chave_registro(registro, i): registro for i, registro in enumerate(dados)}
+
+
+def aplicar_operacao(indice, operacao):
+    """Aplica uma operação do diário sobre o índice de registros
+
+    Todas as operações são idempotentes, então reaplicar um trecho do diário
+    sobre um snapshot que já o contém não altera o resultado
+    """
+    tipo = operacao.get('op')
+    if tipo == 'put':
+        registro = operacao['registro']
+        indice[chave_registro(registro, len(indice))] = registro
+    elif tipo == 'del':
+        indice.pop(str(operacao['id']), None)
+    elif tipo == 'set':
+        indice.clear()
+        indice.update(indexar_registros(operacao['dados']))
+
+
+def diferencas(indice_atual, dados_novos):
+    """Operações mínimas que levam o índice atual à nova lista de registros"""
+    novo = indexar_registros(dados_novos)
+    if any(chave.startswith('__sem_id_') for chave in novo):
+        return [{'op': 'set', 'dados': dados_novos}]
+
+    operacoes = [{'op': 'del', 'id': chave} for chave in indice_atual if chave not in novo]
+    operacoes.extend(
+        {'op': 'put', 'registro': registro}
+        for chave, registro in novo.items()
+        if indice_atual.get(chave) != registro
+    )
+
+    # Se quase tudo mudou, uma única operação 'set' é mais compacta
+    if len(operacoes) > max(len(novo), 1) // 2 + 1:
+        return [{'op': 'set', 'dados': dados_novos}]
+    return operacoes
+
+
+class Diario:
+    """Arquivo NDJSON só de acréscimo com as operações de uma coleção"""
+
+    def __init__(self, arquivo, fsync=False):
+        self.arquivo = arquivo
+        self.fsync = fsync
+        # Acréscimos e descarte não podem se intercalar
+        self._lock = threading.Lock()
+
+    def tamanho(self):
+        """Tamanho atual do diário em bytes (sempre ao fim de uma linha completa)"""
+        with self._lock:
+            try:
+                return os.path.getsize(self.arquivo)
+            except OSError:
+                return 0
+
+    def registrar(self, operacoes):
+        """Acrescenta operações ao final do diário"""
+        if not operacoes:
+            return
+        nome = os.path.basename(self.arquivo)
+        with self._lock, open(self.arquivo, 'ab') as f:
+            inicio = f.tell()
+            for operacao in operacoes:
+                if operacao.get('op') == 'set':
+                    # A lista inteira vai para o arquivo em blocos, sem montar a linha
+                    f.write(b'{"op":"set","dados":')
+                    for bloco in serializar(operacao['dados']):
+                        f.write(bloco)
+                    f.write(b'}\n')
+                else:
+                    f.write(json.dumps(operacao, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+            f.flush()
+            bytes_gravados.incrementar(nome, valor=f.tell() - inicio)
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def ler(self, reparar=True):
+        """Lê as operações registradas no diário
+
+        Uma última linha incompleta, deixada por uma queda no meio da
+        escrita, é ignorada (e cortada do arquivo, com `reparar`)
+        """
+        try:
+            with open(self.arquivo, 'rb') as f:
+                conteudo = f.read()
+        except OSError:
+            return []
+        bytes_lidos.incrementar(os.path.basename(self.arquivo), valor=len(conteudo))
+
+        if conteudo and not conteudo.endswith(b'\n'):
+            conteudo = conteudo[:conteudo.rfind(b'\n') + 1]
+            if reparar:
+                # Corta a linha incompleta para que o próximo acréscimo não a continue
+                print(f"Linha incompleta descartada no diário {self.arquivo}")
+                with open(self.arquivo, 'r+b') as f:
+                    f.truncate(len(conteudo))
+
+        operacoes = []
+        for linha in conteudo.split(b'\n'):
+            if not linha.strip():
+                continue
+            try:
+                operacoes.append(json.loads(linha))
+            except ValueError:
+                print(f"Linha inválida ignorada no diário {self.arquivo}")
+        return operacoes
+
+    def descartar_ate(self, posicao):
+        """Remove os primeiros `posicao` bytes, já incorporados ao snapshot"""
+        with self._lock:
+            try:
+                with open(self.arquivo, 'rb') as f:
+                    f.seek(posicao)
+                    restante = f.read()
+            except OSError:
+                return
+            substituir_arquivo_atomicamente(self.arquivo, restante, fsync=self.fsync)
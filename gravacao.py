@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gravação em grupo (group commit) das coleções de dados
+Escritores simultâneos enfileiram suas operações e esperam; um único escritor
+por vez grava de uma só vez tudo o que se acumulou na fila (um acréscimo e um
+fsync para o grupo inteiro)
+"""
+
+import threading
+
+
+class Pedido:
+    """Operações de um escritor aguardando gravação"""
+
+    __slots__ = ('operacoes', 'concluido', 'erro')
+
+    def __init__(self, operacoes):
+        self.operacoes = operacoes
+        self.concluido = False
+        self.erro = None
+
+
+class FilaGravacao:
+    """Fila com um único escritor e gravação em grupo
+
+    `gravar(operacoes)` recebe as operações de todos os pedidos do grupo, na
+    ordem em que foram enfileirados, e deve lançar exceção se falhar
+    """
+
+    def __init__(self, gravar):
+        self._gravar = gravar
+        self._condicao = threading.Condition()
+        self._pendentes = []
+        self._gravando = False
+        # Estatísticas: pedidos gravados e quantos grupos foram necessários
+        self.pedidos = 0
+        self.grupos = 0
+
+    def enfileirar(self, operacoes):
+        """Acrescenta um pedido ao fim da fila; a ordem da fila é a ordem de gravação"""
+        pedido = Pedido(operacoes)
+        with self._condicao:
+            self._pendentes.append(pedido)
+        return pedido
+
+    def pendentes(self):
+        """Operações enfileiradas que nenhum escritor levou ainda, em ordem"""
+        with self._condicao:
+            return [operacao for item in self._pendentes for operacao in item.operacoes]
+
+    def ocupada(self):
+        """Há pedidos na fila ou um grupo sendo gravado"""
+        with self._condicao:
+            return self._gravando or bool(self._pendentes)
+
+    def aguardar_livre(self):
+        """Espera até não haver pedidos na fila nem grupo sendo gravado"""
+        with self._condicao:
+            while self._gravando or self._pendentes:
+                self._condicao.wait()
+
+    def aguardar(self, pedido):
+        """Espera o pedido ser gravado, gravando o grupo se a fila estiver livre
+
+        Não deve ser chamado segurando locks de que `gravar` precise
+        """
+        with self._condicao:
+            while not pedido.concluido and self._gravando:
+                self._condicao.wait()
+            if pedido.concluido:
+                if pedido.erro is not None:
+                    raise pedido.erro
+                return
+            # Esta thread vira o escritor e leva todos os pendentes
+            grupo, self._pendentes = self._pendentes, []
+            self._gravando = True
+
+        erro = None
+        try:
+            self._gravar([operacao for item in grupo for operacao in item.operacoes])
+        except Exception as e:
+            erro = e
+
+        with self._condicao:
+            for item in grupo:
+                item.concluido = True
+                item.erro = erro
+            self.pedidos += len(grupo)
+            self.grupos += 1
+            self._gravando = False
+            self._condicao.notify_all()
+
+        if erro is not None:
+            raise erro
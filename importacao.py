@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importação em lote de entradas a partir de extratos de maquininha (CSV ou NDJSON)
+O corpo é lido linha a linha do fluxo; a cada lote o valor líquido é
+calculado com NumPy pela tabela de taxas, a mesma das regras do front-end
+(EntradaRules em static/js/entradas.js)
+"""
+
+import csv
+import hashlib
+import io
+import json
+import math
+import unicodedata
+from datetime import date, datetime
+from types import MappingProxyType
+
+import numpy as np
+
+# Fração do valor bruto que fica após a taxa de cada tipo de entrada
+TAXAS_ENTRADA = {
+    'Voucher': 0.88,
+    'Débito': 0.98,
+    'Crédito': 0.965,
+    'Pix': 0.98,
+    'Dinheiro': 0.99,
+}
+
+REGISTROS_POR_LOTE = 5000
+# Quantas linhas rejeitadas são descritas na resposta
+LIMITE_REJEITADOS = 100
+
+# Nomes aceitos para cada coluna (comparados sem acentos e sem maiúsculas)
+COLUNAS = {
+    'dataEntrada': ('dataentrada', 'data', 'data da venda', 'data venda', 'date'),
+    'valorBruto': ('valorbruto', 'valor bruto', 'valor', 'value'),
+    'tipoEntrada': ('tipoentrada', 'tipo', 'forma de pagamento', 'modalidade', 'tipo de pagamento'),
+    'id': ('id',),
+}
+
+_TIPOS = list(TAXAS_ENTRADA)
+_FATORES = np.array([TAXAS_ENTRADA[tipo] for tipo in _TIPOS], dtype=np.float64)
+
+
+def _normalizar(texto):
+    """Minúsculas, sem acentos e sem espaços nas pontas"""
+    texto = unicodedata.normalize('NFKD', str(texto).strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+# Tabela fixa, compartilhada por todas as importações: só leitura
+_CODIGOS_TIPO = MappingProxyType({
+    **{_normalizar(tipo): codigo for codigo, tipo in enumerate(_TIPOS)},
+    'debit': _TIPOS.index('Débito'), 'credit': _TIPOS.index('Crédito'), 'cash': _TIPOS.index('Dinheiro'),
+})
+_COLUNAS = {_normalizar(nome): campo for campo, nomes in COLUNAS.items() for nome in nomes}
+
+
+def calcular_valores(valores, codigos):
+    """Valores líquidos de um lote: valor bruto * fator da taxa do tipo
+
+    Mesma multiplicação em float64 do front-end, então o resultado é idêntico
+    """
+    brutos = np.asarray(valores, dtype=np.float64)
+    return (brutos * _FATORES[np.asarray(codigos, dtype=np.intp)]).tolist()
+
+
+def ler_data(valor):
+    """AAAA-MM-DD a partir de AAAA-MM-DD[THH:MM...] ou DD/MM/AAAA"""
+    texto = str(valor).strip()
+    if '/' in texto:
+        dia, mes, ano = texto.split(' ')[0].split('/')
+        return date(int(ano), int(mes), int(dia)).isoformat()
+    return date.fromisoformat(texto[:10]).isoformat()
+
+
+def ler_valor(valor):
+    """Número a partir de 1234.56, "1.234,56", "1,234.56" ou "R$ 10,00" """
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        numero = float(valor)
+    else:
+        texto = str(valor).replace('R$', '').replace(' ', '').strip()
+        if ',' in texto and texto.rfind(',') > texto.rfind('.'):
+            # Vírgula decimal ("1.234,56")
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+        numero = float(texto)
+    if not math.isfinite(numero):
+        raise ValueError('valor não é um número finito')
+    return numero
+
+
+def ler_tipo(valor, vistos=None):
+    """Código do tipo de entrada; `vistos` guarda as formas exatas já lidas
+    (os extratos repetem poucos textos) e pertence a uma única importação"""
+    if vistos is not None:
+        codigo = vistos.get(valor)
+        if codigo is not None:
+            return codigo
+    codigo = _CODIGOS_TIPO.get(valor)
+    if codigo is None:
+        codigo = _CODIGOS_TIPO.get(_normalizar(valor))
+        if codigo is None:
+            raise ValueError(f"tipo de entrada desconhecido: {valor}")
+    if vistos is not None and isinstance(valor, str):
+        vistos[valor] = codigo
+    return codigo
+
+
+def linhas_texto(fluxo):
+    """Linhas de texto de um fluxo binário UTF-8 (com ou sem BOM), lidas em blocos"""
+    return io.TextIOWrapper(fluxo, encoding='utf-8-sig', newline='')
+
+
+def linhas_csv(linhas):
+    """Dicionários {campo: texto} das linhas de um CSV com cabeçalho (';' ou ',')"""
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return
+    separador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    campos = [_COLUNAS.get(_normalizar(nome)) for nome in next(csv.reader([cabecalho], delimiter=separador))]
+    faltando = [campo for campo in ('dataEntrada', 'valorBruto', 'tipoEntrada') if campo not in campos]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}")
+    for numero, valores in enumerate(csv.reader(linhas, delimiter=separador), start=2):
+        if not any(valor.strip() for valor in valores):
+            continue
+        yield numero, {campo: valor for campo, valor in zip(campos, valores) if campo is not None}
+
+
+def linhas_ndjson(linhas):
+    """Objetos de um NDJSON (um JSON por linha), com os nomes de campo aceitos no CSV"""
+    for numero, linha in enumerate(linhas, start=1):
+        if not linha.strip():
+            continue
+        try:
+            objeto = json.loads(linha)
+            if not isinstance(objeto, dict):
+                raise ValueError('a linha não é um objeto JSON')
+        except ValueError as e:
+            yield numero, e
+            continue
+        yield numero, {_COLUNAS[_normalizar(nome)]: valor for nome, valor in objeto.items()
+                       if _normalizar(nome) in _COLUNAS}
+
+
+def _encadear(primeira, linhas):
+    yield primeira
+    yield from linhas
+
+
+def id_importado(data_entrada, valor, codigo, ocorrencia):
+    """Id estável da transação: reimportar o mesmo extrato gera os mesmos ids"""
+    texto = f"{data_entrada}|{valor!r}|{_TIPOS[codigo]}|{ocorrencia}"
+    return 'imp' + hashlib.sha1(texto.encode('utf-8')).hexdigest()[:17]
+
+
+class ImportacaoEntradas:
+    """Converte as linhas lidas em entradas, em lotes com o valor líquido vetorizado
+
+    Transações sem id recebem um id derivado de data, valor, tipo e da
+    ordem entre as iguais do mesmo extrato (duas vendas de R$ 10 no Pix
+    no mesmo dia são a 1ª e a 2ª ocorrência)
+    """
+
+    def __init__(self, registros_por_lote=REGISTROS_POR_LOTE):
+        self.registros_por_lote = registros_por_lote
+        self.entradas = []
+        self.rejeitados = []
+        self.total_rejeitados = 0
+        self.linhas = 0
+        self._ocorrencias = {}
+        self._tipos_vistos = {}
+        self._lote = []
+        self._agora = datetime.now().isoformat()
+
+    def _rejeitar(self, numero, erro):
+        self.total_rejeitados += 1
+        if len(self.rejeitados) < LIMITE_REJEITADOS:
+            self.rejeitados.append({'linha': numero, 'erro': str(erro)})
+
+    def adicionar(self, numero, campos):
+        """Valida uma linha; o cálculo do valor líquido espera o lote completar"""
+        self.linhas += 1
+        if isinstance(campos, Exception):
+            self._rejeitar(numero, campos)
+            return
+        try:
+            faltando = [campo for campo in ('dataEntrada', 'valorBruto', 'tipoEntrada')
+                        if campos.get(campo) in (None, '')]
+            if faltando:
+                raise ValueError(f"campos ausentes: {', '.join(faltando)}")
+            linha = (ler_data(campos['dataEntrada']), ler_valor(campos['valorBruto']),
+                     ler_tipo(campos['tipoEntrada'], self._tipos_vistos), campos.get('id'))
+        except (ValueError, TypeError) as e:
+            self._rejeitar(numero, e)
+            return
+        self._lote.append(linha)
+        if len(self._lote) >= self.registros_por_lote:
+            self._fechar_lote()
+
+    def _fechar_lote(self):
+        lote, self._lote = self._lote, []
+        if not lote:
+            return
+        datas, brutos, codigos, ids = zip(*lote)
+        for data_entrada, bruto, codigo, id_registro, liquido in zip(
+                datas, brutos, codigos, ids, calcular_valores(brutos, codigos)):
+            if id_registro in (None, ''):
+                chave = (data_entrada, bruto, codigo)
+                ocorrencia = self._ocorrencias.get(chave, 0) + 1
+                self._ocorrencias[chave] = ocorrencia
+                id_registro = id_importado(data_entrada, bruto, codigo, ocorrencia)
+            self.entradas.append({
+                'dataEntrada': data_entrada,
+                'valorBruto': bruto,
+                'valorCalculado': liquido,
+                'tipoEntrada': _TIPOS[codigo],
+                'id': str(id_registro),
+                'dataCriacao': self._agora,
+            })
+
+    def ler(self, fluxo, formato=None):
+        """Lê um fluxo binário inteiro; formato 'csv', 'ndjson' ou None (detectado pela 1ª linha)"""
+        linhas = linhas_texto(fluxo)
+        if formato is None:
+            primeira = next(linhas, '')
+            formato = 'ndjson' if primeira.lstrip().startswith('{') else 'csv'
+            linhas = _encadear(primeira, linhas)
+        if formato == 'csv':
+            origem = linhas_csv(iter(linhas))
+        elif formato == 'ndjson':
+            origem = linhas_ndjson(linhas)
+        else:
+            raise ValueError("Formato deve ser csv ou ndjson")
+        for numero, campos in origem:
+            self.adicionar(numero, campos)
+        self._fechar_lote()
+        return self.entradas
+
+
+def formato_do_tipo(tipo_conteudo):
+    """Formato a partir do Content-Type (None quando não indica)"""
+    tipo = (tipo_conteudo or '').split(';')[0].strip().lower()
+    if tipo in ('text/csv', 'application/csv'):
+        return 'csv'
+    if tipo in ('application/x-ndjson', 'application/ndjson', 'application/jsonl',
+                'application/x-jsonlines', 'application/jsonlines'):
+        return 'ndjson'
+    return None
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índices em memória para consultas filtradas e paginadas
+Uma lista ordenada por data (busca binária) e índices hash por campo
+permitem responder consultas seletivas sem percorrer toda a coleção
+"""
+
+import base64
+import json
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from agregados import data_valida
+
+# Maior que qualquer chave de registro, usado como limite superior da busca
+CHAVE_MAXIMA = '\uffff'
+
+
+def codificar_cursor(posicao):
+    """Cursor opaco a partir da última posição (data, chave) devolvida"""
+    texto = json.dumps(list(posicao), ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    """Posição (data, chave) a partir do cursor recebido na consulta"""
+    try:
+        data, chave = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (str(data), str(chave))
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+class IndiceColecao:
+    """Índice ordenado por um campo de data e índices hash por campos exatos
+
+    Funciona como ouvinte de ColecaoEmCache (reiniciar/alterar)
+    """
+
+    def __init__(self, campo_data, campos_hash, ordem_padrao='asc'):
+        self.campo_data = campo_data
+        self.campos_hash = tuple(campos_hash)
+        self.ordem_padrao = ordem_padrao
+        self._lock = threading.Lock()
+        self._limpar()
+
+    def _limpar(self):
+        self._registros = {}
+        self._ordem = []
+        self._hash = {campo: {} for campo in self.campos_hash}
+
+    def _posicao(self, chave, registro):
+        return (data_valida(registro.get(self.campo_data)) or '', chave)
+
+    def _adicionar(self, chave, registro):
+        self._registros[chave] = registro
+        self._ordem.append(self._posicao(chave, registro))
+        for campo in self.campos_hash:
+            self._hash[campo].setdefault(registro.get(campo), set()).add(chave)
+
+    def _remover(self, chave, registro):
+        del self._registros[chave]
+        posicao = self._posicao(chave, registro)
+        i = bisect_left(self._ordem, posicao)
+        if i < len(self._ordem) and self._ordem[i] == posicao:
+            del self._ordem[i]
+        for campo in self.campos_hash:
+            valor = registro.get(campo)
+            chaves = self._hash[campo].get(valor)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._hash[campo][valor]
+
+    def reiniciar(self, registros):
+        """Reconstrói os índices a partir do índice completo da coleção"""
+        with self._lock:
+            self._limpar()
+            for chave, registro in registros.items():
+                self._adicionar(chave, registro)
+            self._ordem.sort()
+
+    def alterar(self, chave, anterior, novo):
+        """Atualiza os índices para um registro criado, alterado ou excluído"""
+        with self._lock:
+            if anterior is not None and chave in self._registros:
+                self._remover(chave, self._registros[chave])
+            if novo is not None:
+                self._registros[chave] = novo
+                insort(self._ordem, self._posicao(chave, novo))
+                for campo in self.campos_hash:
+                    self._hash[campo].setdefault(novo.get(campo), set()).add(chave)
+
+    def consultar(self, filtros=None, de=None, ate=None, ordem=None, limite=50, cursor=None):
+        """Consulta uma página de registros
+
+        filtros: {campo: valor} sobre os campos com índice hash
+        de/ate: intervalo inclusivo 'AAAA-MM-DD' sobre o campo de data
+        cursor: valor de 'proximoCursor' da página anterior
+        """
+        filtros = filtros or {}
+        for campo in filtros:
+            if campo not in self.campos_hash:
+                raise ValueError(f'Filtro não suportado: {campo}')
+        decrescente = (ordem or self.ordem_padrao) == 'desc'
+        apos = decodificar_cursor(cursor) if cursor else None
+
+        with self._lock:
+            lo = bisect_left(self._ordem, (de, '')) if de else 0
+            hi = bisect_right(self._ordem, (ate, CHAVE_MAXIMA)) if ate else len(self._ordem)
+            if apos is not None:
+                if decrescente:
+                    hi = min(hi, bisect_left(self._ordem, apos))
+                else:
+                    lo = max(lo, bisect_right(self._ordem, apos))
+
+            conjuntos = [self._hash[campo].get(valor, set()) for campo, valor in filtros.items()]
+            conjuntos.sort(key=len)
+
+            # Percorrer a ordem por data visita ~ (limite+1) * (hi-lo) / len(conjunto)
+            # posições até completar a página; partir do conjunto custa len(conjunto)
+            if conjuntos and len(conjuntos[0]) ** 2 < (limite + 1) * (hi - lo):
+                # Filtro seletivo: parte do menor conjunto em vez do intervalo de datas
+                candidatos = [
+                    self._posicao(chave, self._registros[chave])
+                    for chave in conjuntos[0]
+                    if all(chave in outro for outro in conjuntos[1:])
+                ]
+                inicio = self._ordem[lo]
+                fim = self._ordem[hi] if hi < len(self._ordem) else None
+                candidatos = [
+                    pos for pos in candidatos
+                    if pos >= inicio and (fim is None or pos < fim)
+                ]
+                candidatos.sort(reverse=decrescente)
+                selecionados = candidatos[:limite + 1]
+            else:
+                passo = range(hi - 1, lo - 1, -1) if decrescente else range(lo, hi)
+                selecionados = []
+                for i in passo:
+                    posicao = self._ordem[i]
+                    if all(posicao[1] in conjunto for conjunto in conjuntos):
+                        selecionados.append(posicao)
+                        if len(selecionados) > limite:
+                            break
+
+            itens = [self._registros[chave] for _, chave in selecionados[:limite]]
+            proximo = codificar_cursor(selecionados[limite - 1]) if len(selecionados) > limite else None
+
+        return {'itens': itens, 'proximoCursor': proximo, 'limite': limite}
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instantâneo binário das coleções para o início rápido do servidor
+Guardado ao lado do JSON (<arquivo>.instantaneo), com os registros em
+colunas (números em arrays de 8 bytes, textos como índices de uma tabela
+de textos sem repetição) e o corpo JSON compacto já serializado para a API
+
+O arquivo é aberto com mmap: a quantidade de registros e o corpo da API
+saem sem decodificar nada, e os registros só são montados quando alguém
+precisa deles. Ele registra a assinatura do JSON/diário de que foi gerado
+e é ignorado quando o JSON muda
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from diario import substituir_arquivo_atomicamente
+
+MAGICA = b'PRCINST1'
+# Mágica, ordem dos bytes ('<' ou '>') e tamanho dos metadados JSON
+CABECALHO = struct.Struct('<8sc3xI')
+ALINHAMENTO = 8
+SEPARADOR_TEXTOS = '\x00'
+
+# Tipos de coluna
+INTEIROS = 'i'    # int64
+REAIS = 'f'       # float64
+NUMEROS = 'n'     # float64 + um byte por registro marcando os inteiros
+TEXTOS = 's'      # uint32, índice na tabela de textos
+JSON = 'j'        # uint32, índice na tabela de textos do valor em JSON
+
+LIMITE_INT64 = 2 ** 63
+# Inteiros representáveis sem perda em float64
+LIMITE_EXATO_FLOAT = 2 ** 53
+
+
+def _tipo_coluna(valores):
+    """Codificação de uma coluna conforme os tipos dos valores"""
+    tipos = set(map(type, valores))
+    if tipos == {str}:
+        if any(SEPARADOR_TEXTOS in valor for valor in valores):
+            return JSON
+        return TEXTOS
+    if tipos == {int}:
+        if all(-LIMITE_INT64 <= valor < LIMITE_INT64 for valor in valores):
+            return INTEIROS
+        return JSON
+    if tipos == {float}:
+        return REAIS
+    if tipos == {int, float}:
+        if all(type(valor) is float or -LIMITE_EXATO_FLOAT <= valor <= LIMITE_EXATO_FLOAT for valor in valores):
+            return NUMEROS
+    return JSON
+
+
+class _Escritor:
+    """Monta as seções do arquivo, cada uma alinhada a 8 bytes"""
+
+    def __init__(self):
+        self.secoes = []
+        self.tamanho = 0
+        self.textos = {}
+
+    def secao(self, conteudo):
+        deslocamento = self.tamanho
+        self.secoes.append(conteudo)
+        self.tamanho += len(conteudo)
+        sobra = -self.tamanho % ALINHAMENTO
+        if sobra:
+            self.secoes.append(b'\x00' * sobra)
+            self.tamanho += sobra
+        return [deslocamento, len(conteudo)]
+
+    def indice_texto(self, texto):
+        indice = self.textos.get(texto)
+        if indice is None:
+            indice = self.textos[texto] = len(self.textos)
+        return indice
+
+    def coluna(self, valores):
+        tipo = _tipo_coluna(valores)
+        if tipo == INTEIROS:
+            return [tipo, self.secao(array('q', valores).tobytes())]
+        if tipo == REAIS:
+            return [tipo, self.secao(array('d', valores).tobytes())]
+        if tipo == NUMEROS:
+            reais = array('d', valores).tobytes()
+            inteiros = bytes(type(valor) is int for valor in valores)
+            return [tipo, self.secao(reais), self.secao(inteiros)]
+        if tipo == TEXTOS:
+            indices = [self.indice_texto(valor) for valor in valores]
+        else:
+            indices = [self.indice_texto(json.dumps(valor, ensure_ascii=False, separators=(',', ':')))
+                       for valor in valores]
+        return [tipo, self.secao(array('I', indices).tobytes())]
+
+
+def gravar_instantaneo(arquivo, registros, origem, corpo_json):
+    """Grava o instantâneo de uma lista de registros (dicts)
+
+    `origem` é a assinatura dos arquivos de que os registros vieram e
+    `corpo_json` a lista já serializada no formato compacto da API
+    """
+    escritor = _Escritor()
+
+    # Registros com as mesmas chaves, na mesma ordem, formam um grupo
+    grupos = {}
+    for posicao, registro in enumerate(registros):
+        grupos.setdefault(tuple(registro), []).append(posicao)
+
+    meta_grupos = []
+    for chaves, posicoes in grupos.items():
+        grupo = [registros[posicao] for posicao in posicoes]
+        meta = {'chaves': list(chaves), 'registros': len(posicoes), 'colunas': []}
+        if len(grupos) > 1:
+            meta['posicoes'] = escritor.secao(array('I', posicoes).tobytes())
+        for chave in chaves:
+            meta['colunas'].append(escritor.coluna([registro[chave] for registro in grupo]))
+        meta_grupos.append(meta)
+
+    meta = {
+        'origem': origem,
+        'registros': len(registros),
+        'grupos': meta_grupos,
+        'textos': escritor.secao(SEPARADOR_TEXTOS.join(escritor.textos).encode('utf-8')),
+        'quantidadeTextos': len(escritor.textos),
+        'json': escritor.secao(corpo_json),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    inicio = CABECALHO.size + len(meta_bytes)
+    inicio += -inicio % ALINHAMENTO
+    cabecalho = CABECALHO.pack(MAGICA, b'<' if sys.byteorder == 'little' else b'>', len(meta_bytes))
+    preenchimento = b'\x00' * (inicio - CABECALHO.size - len(meta_bytes))
+
+    substituir_arquivo_atomicamente(
+        arquivo, [cabecalho, meta_bytes, preenchimento] + escritor.secoes, fsync=False
+    )
+
+
+def _normalizar(valor):
+    """Assinaturas vêm como tuplas; depois de passar pelo JSON, como listas"""
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(item) for item in valor]
+    return valor
+
+
+class Instantaneo:
+    """Instantâneo aberto com mmap; os registros são montados só em registros()"""
+
+    def __init__(self, mapa, meta, inicio):
+        self._mapa = mapa
+        self._meta = meta
+        self._inicio = inicio
+        self.contagem = meta['registros']
+
+    def _bytes(self, secao):
+        deslocamento, tamanho = secao
+        inicio = self._inicio + deslocamento
+        return memoryview(self._mapa)[inicio:inicio + tamanho]
+
+    def _array(self, secao, formato):
+        visao = self._bytes(secao)
+        if not len(visao):
+            return []
+        return visao.cast(formato).tolist()
+
+    def corpo_json(self):
+        """Lista serializada no formato compacto da API"""
+        return bytes(self._bytes(self._meta['json']))
+
+    def registros(self):
+        """Monta a lista de registros (dicts) na ordem original"""
+        meta = self._meta
+        textos = None
+        if meta['quantidadeTextos']:
+            textos = str(self._bytes(meta['textos']), 'utf-8').split(SEPARADOR_TEXTOS)
+        textos_json = {}
+
+        registros = [None] * meta['registros'] if len(meta['grupos']) > 1 else None
+        for grupo in meta['grupos']:
+            colunas = []
+            for coluna in grupo['colunas']:
+                tipo = coluna[0]
+                if tipo == INTEIROS:
+                    valores = self._array(coluna[1], 'q')
+                elif tipo == REAIS:
+                    valores = self._array(coluna[1], 'd')
+                elif tipo == NUMEROS:
+                    valores = [int(valor) if inteiro else valor for valor, inteiro in
+                               zip(self._array(coluna[1], 'd'), self._bytes(coluna[2]))]
+                elif tipo == TEXTOS:
+                    valores = list(map(textos.__getitem__, self._array(coluna[1], 'I')))
+                else:
+                    valores = []
+                    for indice in self._array(coluna[1], 'I'):
+                        if indice not in textos_json:
+                            textos_json[indice] = json.loads(textos[indice])
+                        valor = textos_json[indice]
+                        # Listas e objetos não podem ser compartilhados entre registros
+                        valores.append(json.loads(textos[indice]) if isinstance(valor, (list, dict)) else valor)
+                colunas.append(valores)
+
+            chaves = grupo['chaves']
+            if colunas:
+                montados = [dict(zip(chaves, valores)) for valores in zip(*colunas)]
+            else:
+                montados = [{} for _ in range(grupo['registros'])]
+            if registros is None:
+                return montados
+            for posicao, registro in zip(self._array(grupo['posicoes'], 'I'), montados):
+                registros[posicao] = registro
+        return registros or []
+
+    def fechar(self):
+        self._mapa.close()
+
+
+def abrir_instantaneo(arquivo, origem):
+    """Abre o instantâneo se ele existir e tiver sido gerado de `origem`; senão None"""
+    try:
+        with open(arquivo, 'rb') as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Inexistente ou vazio
+        return None
+
+    try:
+        magica, ordem, tamanho_meta = CABECALHO.unpack_from(mapa, 0)
+        if magica != MAGICA or ordem != (b'<' if sys.byteorder == 'little' else b'>'):
+            raise ValueError('formato ou ordem dos bytes diferente')
+        meta = json.loads(mapa[CABECALHO.size:CABECALHO.size + tamanho_meta])
+        if meta['origem'] != _normalizar(origem):
+            mapa.close()
+            return None
+        inicio = CABECALHO.size + tamanho_meta
+        inicio += -inicio % ALINHAMENTO
+        return Instantaneo(mapa, meta, inicio)
+    except Exception as e:
+        print(f"Instantâneo inválido ignorado {arquivo}: {e}")
+        mapa.close()
+        return None
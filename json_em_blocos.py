@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura e escrita de JSON em blocos
+Corpos grandes de requisição são lidos do fluxo aos poucos e listas são
+gravadas registro a registro, sem manter o documento inteiro (bytes e
+texto) em memória além dos próprios objetos
+"""
+
+import codecs
+import json
+import re
+
+TAMANHO_BLOCO = 64 * 1024
+REGISTROS_POR_BLOCO = 500
+
+ESPACOS = re.compile(r'[ \t\n\r]*')
+# O que pode vir depois de um número decodificado ainda sendo parte dele
+RESTO_NUMERO = re.compile(r'[0-9.eE+-]*')
+CARACTERES_NUMERO = frozenset('0123456789.eE+-')
+# Separador entre elementos de uma lista, com os espaços em volta
+SEPARADOR_LISTA = re.compile(r'[ \t\n\r]*([,\]])[ \t\n\r]*')
+_decodificador = json.JSONDecoder()
+
+
+class LeitorJSON:
+    """Analisador de JSON sobre um fluxo binário (ex.: request.stream) lido em blocos"""
+
+    def __init__(self, fluxo, tamanho_bloco=TAMANHO_BLOCO):
+        self.fluxo = fluxo
+        self.tamanho_bloco = tamanho_bloco
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._texto = ''
+        self._pos = 0
+        self._fim = False
+        # Como json.loads, registros diferentes compartilham as mesmas chaves
+        self._chaves = {}
+
+    def _ler_bloco(self):
+        """Acrescenta o próximo bloco ao que falta analisar; False no fim do fluxo"""
+        if self._fim:
+            return False
+        bloco = self.fluxo.read(self.tamanho_bloco)
+        if not bloco:
+            self._fim = True
+        self._texto = self._texto[self._pos:] + self._utf8.decode(bloco, final=not bloco)
+        self._pos = 0
+        return True
+
+    def proximo(self):
+        """Próximo caractere que não é espaço, sem consumi-lo ('' no fim do fluxo)"""
+        while True:
+            self._pos = ESPACOS.match(self._texto, self._pos).end()
+            if self._pos < len(self._texto):
+                return self._texto[self._pos]
+            if not self._ler_bloco():
+                return ''
+
+    def _consumir(self, esperados):
+        caractere = self.proximo()
+        if not caractere or caractere not in esperados:
+            raise ValueError(f"JSON inválido: esperado um de {esperados!r}, encontrado {caractere!r}")
+        self._pos += 1
+        return caractere
+
+    def valor(self):
+        """Decodifica o próximo valor JSON inteiro"""
+        self.proximo()
+        return self._decodificar()
+
+    def _decodificar(self):
+        """Decodifica o valor que começa na posição atual (já sem espaços)"""
+        while True:
+            texto = self._texto
+            try:
+                valor, fim = _decodificador.raw_decode(texto, self._pos)
+            except json.JSONDecodeError:
+                # Valor cortado no fim do bloco: lê mais e tenta de novo
+                if self._ler_bloco():
+                    continue
+                raise
+            if ((fim == len(texto) or texto[fim] in CARACTERES_NUMERO)
+                    and RESTO_NUMERO.fullmatch(texto, fim) and self._ler_bloco()):
+                # Um número no fim do bloco pode continuar no próximo
+                continue
+            self._pos = fim
+            return valor
+
+    def itens(self, nivel=0):
+        """Gera os elementos de uma lista JSON um a um"""
+        self._consumir('[')
+        if self.proximo() == ']':
+            self._pos += 1
+            return
+        while True:
+            # Elementos de listas nunca são o objeto do nível 0: só listas
+            # internas são montadas aos poucos
+            if self.proximo() == '[':
+                yield list(self.itens(nivel + 1))
+            else:
+                item = self._decodificar()
+                if type(item) is dict:
+                    chaves = self._chaves
+                    item = {chaves.setdefault(chave, chave): valor for chave, valor in item.items()}
+                yield item
+            separador = SEPARADOR_LISTA.match(self._texto, self._pos)
+            if separador is not None and separador.end() < len(self._texto):
+                self._pos = separador.end()
+                fechou = separador.group(1) == ']'
+            else:
+                # Separador no fim do bloco
+                fechou = self._consumir(',]') == ']'
+            if fechou:
+                return
+
+    def campos(self, nivel=0):
+        """Gera os pares (chave, valor) de um objeto JSON um a um"""
+        self._consumir('{')
+        if self.proximo() == '}':
+            self._pos += 1
+            return
+        while True:
+            chave = self.valor()
+            if not isinstance(chave, str):
+                raise ValueError('JSON inválido: chave de objeto deve ser texto')
+            self._consumir(':')
+            yield chave, self.montar(nivel + 1)
+            if self._consumir(',}') == '}':
+                return
+
+    def montar(self, nivel=0):
+        """Próximo valor; listas e o objeto do nível 0 são montados elemento a elemento
+
+        Objetos internos (os registros) são decodificados inteiros, de uma vez
+        """
+        caractere = self.proximo()
+        if caractere == '[':
+            return list(self.itens(nivel))
+        if caractere == '{' and nivel == 0:
+            return dict(self.campos(nivel))
+        return self.valor()
+
+    def terminar(self):
+        """Garante que não sobrou nada além de espaços depois do valor"""
+        if self.proximo():
+            raise ValueError('JSON inválido: conteúdo após o fim do documento')
+
+
+def carregar(fluxo, tamanho_bloco=TAMANHO_BLOCO):
+    """Equivalente a json.load(fluxo) lendo o fluxo em blocos"""
+    leitor = LeitorJSON(fluxo, tamanho_bloco)
+    if not leitor.proximo():
+        raise ValueError('JSON inválido: corpo vazio')
+    valor = leitor.montar()
+    leitor.terminar()
+    return valor
+
+
+def serializar(dados, indent=None, registros_por_bloco=REGISTROS_POR_BLOCO):
+    """Gera em blocos de bytes o mesmo JSON de json.dumps(dados, ensure_ascii=False)
+
+    Compacto quando indent é None (como as respostas da API) ou indentado
+    como os arquivos de dados; listas são serializadas em fatias de
+    `registros_por_bloco` registros
+    """
+    if indent is None:
+        codificador = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        abre, separador, fecha = '[', ',', ']'
+    else:
+        codificador = json.JSONEncoder(ensure_ascii=False, indent=indent)
+        recuo = '\n' + ' ' * indent
+        abre, separador, fecha = '[' + recuo, ',' + recuo, '\n]'
+
+    if not isinstance(dados, list) or not dados:
+        yield codificador.encode(dados).encode('utf-8')
+        return
+
+    for inicio in range(0, len(dados), registros_por_bloco):
+        # A fatia sai como uma lista completa, já com o recuo certo; só os
+        # colchetes das pontas são trocados pelo separador entre fatias
+        texto = codificador.encode(dados[inicio:inicio + registros_por_bloco])
+        texto = texto[len(abre):-len(fecha)]
+        prefixo = abre if inicio == 0 else separador
+        sufixo = fecha if inicio + registros_por_bloco >= len(dados) else ''
+        yield (prefixo + texto + sufixo).encode('utf-8')
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dados particionados por loja (filial)
+Cada loja tem o próprio diretório (data/lojas/<id>/) com contas, entradas e
+config, e uma partição em memória com depósito, totais, índices e revisões
+próprios. A partição é aberta no primeiro pedido da loja e descarregada
+quando há lojas abertas demais ou quando fica muito tempo sem uso; a loja
+principal (o próprio data/) fica sempre aberta
+
+As estatísticas consolidadas somam os totais parciais de cada loja: as
+abertas respondem da memória e as demais são lidas do disco (só leitura)
+em paralelo, em threads ou em um conjunto de processos
+"""
+
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from agregados import AgregadosContas, AgregadosEntradas
+from armazenamento import DepositoDados, assinatura_arquivo, ler_colecao_somente_leitura
+from backup import RepositorioBackup
+from diario import indexar_registros
+from revisoes import Revisoes
+
+LOJA_PRINCIPAL = 'principal'
+# Usado como nome de diretório: letras minúsculas, números, - e _
+ID_LOJA = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+ARQUIVOS_JSON = ('contas.json', 'entradas.json', 'config.json')
+BANCO_SQLITE = 'dados.db'
+
+# Com processos, só consultas com ao menos tantas lojas a ler do disco
+# usam o conjunto de processos; menos que isso são lidas em threads
+MINIMO_LOJAS_PROCESSOS = 4
+# Processos por padrão quando há mais de um núcleo (0 = só threads)
+PROCESSOS_PADRAO = min(8, os.cpu_count() or 1) if (os.cpu_count() or 1) > 1 else 0
+
+
+def normalizar_loja(valor):
+    """Id da loja em minúsculas (o mesmo diretório em qualquer sistema) ou ValueError"""
+    id_loja = str(valor or '').strip().lower()
+    if not ID_LOJA.match(id_loja):
+        raise ValueError(f"Loja inválida: {valor!r} (use letras, números, - e _)")
+    return id_loja
+
+
+def abrir_deposito(diretorio, armazenamento='json', **opcoes):
+    """Depósito dos arquivos de uma loja: JSON (com diário/instantâneo) ou SQLite"""
+    if armazenamento == 'sqlite':
+        from armazenamento_sqlite import DepositoSQLite
+        return DepositoSQLite(os.path.join(diretorio, BANCO_SQLITE), fsync=opcoes.get('fsync', False))
+    return DepositoDados(*(os.path.join(diretorio, nome) for nome in ARQUIVOS_JSON), **opcoes)
+
+
+def assinatura_loja(diretorio, armazenamento='json'):
+    """Assinatura dos arquivos de contas e entradas de uma loja (muda a cada gravação)"""
+    if armazenamento == 'sqlite':
+        nomes = (BANCO_SQLITE, BANCO_SQLITE + '-wal')
+    else:
+        nomes = [nome + sufixo for nome in ARQUIVOS_JSON[:2] for sufixo in ('', '.diario')]
+    return tuple(assinatura_arquivo(os.path.join(diretorio, nome)) for nome in nomes)
+
+
+def registros_do_disco(diretorio, armazenamento='json', opcoes=None):
+    """Contas e entradas de uma loja lidas sem gravar nada no disco
+
+    Não cria arquivos padrão, não repara o diário, não regrava
+    instantâneos nem faz checkpoint: a loja pode estar sendo aberta ao
+    mesmo tempo pelo servidor
+    """
+    if armazenamento == 'sqlite':
+        from armazenamento_sqlite import ler_tabelas_somente_leitura
+        tabelas = ler_tabelas_somente_leitura(os.path.join(diretorio, BANCO_SQLITE), ('contas', 'entradas'))
+        return tabelas['contas'], tabelas['entradas']
+    opcoes = opcoes or {}
+    leitura = {'usar_diario': opcoes.get('usar_diario', False),
+               'usar_instantaneo': opcoes.get('usar_instantaneo', False)}
+    return tuple(ler_colecao_somente_leitura(os.path.join(diretorio, nome), **leitura)
+                 for nome in ARQUIVOS_JSON[:2])
+
+
+def parciais_do_disco(diretorio, armazenamento='json', opcoes=None):
+    """Totais parciais de contas e entradas de uma loja fechada
+
+    Pode rodar em outro processo: devolve tipos simples (AgregadosBase.parcial)
+    """
+    contas, entradas = AgregadosContas(), AgregadosEntradas()
+    registros_contas, registros_entradas = registros_do_disco(diretorio, armazenamento, opcoes)
+    contas.reiniciar(indexar_registros(registros_contas))
+    entradas.reiniciar(indexar_registros(registros_entradas))
+    return contas.parcial(), entradas.parcial()
+
+
+class Loja:
+    """Partição de uma loja: depósito, totais, índices, revisões e backups próprios"""
+
+    def __init__(self, id_loja, diretorio, deposito, limite_lapides, retencao_backup=None, instancia=None):
+        self.id = id_loja
+        self.diretorio = diretorio
+        # Versões e revisões recomeçam a cada abertura: entram nos ETags e no /api/sync
+        self.instancia = instancia or uuid.uuid4().hex[:8]
+        self.deposito = deposito
+
+        # Totais do dashboard mantidos incrementalmente a cada gravação
+        self.agregados_contas = AgregadosContas()
+        self.agregados_entradas = AgregadosEntradas()
+        deposito.contas.adicionar_ouvinte(self.agregados_contas)
+        deposito.entradas.adicionar_ouvinte(self.agregados_entradas)
+
+        # Índices para consultas filtradas e paginadas (mesma ordem padrão das telas)
+        self.indice_contas = deposito.contas.criar_indice('dataVencimento', ['status', 'empresa'], ordem_padrao='asc')
+        self.indice_entradas = deposito.entradas.criar_indice('dataEntrada', ['tipoEntrada'], ordem_padrao='desc')
+
+        # Revisão de cada registro para /api/sync
+        self.revisoes = Revisoes(limite_lapides=limite_lapides)
+        deposito.contas.adicionar_ouvinte(self.revisoes.historico('contas'))
+        deposito.entradas.adicionar_ouvinte(self.revisoes.historico('entradas'))
+
+        self.repositorio_backup = RepositorioBackup(os.path.join(diretorio, 'backups'), retencao_backup)
+
+        # Pedidos em andamento e último uso, para o descarregamento
+        self.em_uso = 0
+        self.usada_em = time.monotonic()
+
+    def dados_para_backup(self):
+        """Estado atual em memória de todos os arquivos de dados"""
+        return {
+            'contas.json': self.deposito.contas.obter(),
+            'entradas.json': self.deposito.entradas.obter(),
+            'config.json': self.deposito.config.obter(),
+        }
+
+    def parciais(self):
+        """Totais parciais de contas e entradas a partir da memória"""
+        self.deposito.contas.verificar()
+        self.deposito.entradas.verificar()
+        return self.agregados_contas.parcial(), self.agregados_entradas.parcial()
+
+    def fechar(self):
+        self.deposito.fechar()
+
+
+class ParticoesLojas:
+    """Lojas abertas sob demanda, descarregadas pela ordem do uso mais antigo
+
+    `abrir(id_loja, diretorio)` cria a Loja de um id; lojas com pedidos em
+    andamento (emprestar/devolver) nunca são descarregadas
+    """
+
+    def __init__(self, diretorio_lojas, abrir, principal, limite_abertas=8, ociosidade_segundos=None):
+        self.diretorio_lojas = diretorio_lojas
+        self.principal = principal
+        self.limite_abertas = max(1, limite_abertas)
+        self.ociosidade_segundos = ociosidade_segundos
+        self._abrir = abrir
+        self._lock = threading.Lock()
+        self._abertas = OrderedDict({principal.id: principal})
+        # Um lock por loja sendo aberta: a abertura lê arquivos sem travar as demais lojas
+        self._abrindo = {}
+        # Lojas descarregadas ainda fechando (compactação, instantâneo): só
+        # reabrem depois, para duas instâncias não gravarem os mesmos arquivos
+        self._fechando = {}
+        self.aberturas = 0
+        self.descarregamentos = 0
+
+    def diretorio(self, id_loja):
+        if id_loja == self.principal.id:
+            return self.principal.diretorio
+        return os.path.join(self.diretorio_lojas, id_loja)
+
+    def existe(self, id_loja):
+        return id_loja == self.principal.id or os.path.isdir(self.diretorio(id_loja))
+
+    def ids(self):
+        """Ids de todas as lojas (a principal primeiro), abertas ou não"""
+        try:
+            nomes = sorted(os.listdir(self.diretorio_lojas))
+        except FileNotFoundError:
+            nomes = []
+        return [self.principal.id] + [
+            nome for nome in nomes
+            if nome != self.principal.id and ID_LOJA.match(nome) and os.path.isdir(self.diretorio(nome))
+        ]
+
+    def criar(self, id_loja):
+        """Cria o diretório de uma loja nova; False se ela já existe"""
+        if self.existe(id_loja):
+            return False
+        os.makedirs(self.diretorio_lojas, exist_ok=True)
+        try:
+            os.mkdir(self.diretorio(id_loja))
+        except FileExistsError:
+            # Criada ao mesmo tempo por outro pedido
+            return False
+        return True
+
+    def aberta(self, id_loja):
+        """Loja aberta ou None, sem abrir"""
+        return self._abertas.get(id_loja)
+
+    def abertas(self):
+        with self._lock:
+            return list(self._abertas)
+
+    def emprestar(self, id_loja, abrir=True):
+        """Abre a loja se preciso e a marca em uso até devolver()
+
+        Com abrir=False só empresta uma loja já aberta (senão None)
+        """
+        while True:
+            with self._lock:
+                loja = self._abertas.get(id_loja)
+                if loja is not None:
+                    loja.em_uso += 1
+                    self._abertas.move_to_end(id_loja)
+                    return loja
+                if not abrir:
+                    return None
+                abrindo = self._abrindo.setdefault(id_loja, threading.Lock())
+
+            with abrindo:
+                with self._lock:
+                    if id_loja in self._abertas:
+                        # Aberta por outro pedido enquanto esperávamos
+                        continue
+                    fechando = self._fechando.get(id_loja)
+                if fechando is not None:
+                    fechando.wait()
+                try:
+                    loja = self._abrir(id_loja, self.diretorio(id_loja))
+                finally:
+                    with self._lock:
+                        self._abrindo.pop(id_loja, None)
+                with self._lock:
+                    loja.em_uso += 1
+                    self._abertas[id_loja] = loja
+                    self.aberturas += 1
+            print(f"🏪 Loja {id_loja} aberta ({len(self._abertas)} em memória)")
+            self._descarregar_excesso()
+            return loja
+
+    def devolver(self, loja):
+        """Fim de um pedido: a loja pode voltar a ser descarregada"""
+        with self._lock:
+            loja.em_uso -= 1
+            loja.usada_em = time.monotonic()
+        self._descarregar_excesso()
+
+    def _descarregar_excesso(self):
+        """Descarrega as lojas sem uso mais antigas além do limite e as ociosas"""
+        agora = time.monotonic()
+        descarregadas = []
+        with self._lock:
+            excesso = len(self._abertas) - self.limite_abertas
+            for id_loja, loja in list(self._abertas.items()):
+                if loja is self.principal or loja.em_uso:
+                    continue
+                ociosa = (self.ociosidade_segundos is not None
+                          and agora - loja.usada_em > self.ociosidade_segundos)
+                if excesso > 0 or ociosa:
+                    del self._abertas[id_loja]
+                    self._fechando[id_loja] = threading.Event()
+                    descarregadas.append(loja)
+                    excesso -= 1
+            self.descarregamentos += len(descarregadas)
+        for loja in descarregadas:
+            try:
+                self._fechar(loja)
+            finally:
+                with self._lock:
+                    self._fechando.pop(loja.id).set()
+            print(f"🏪 Loja {loja.id} descarregada da memória")
+
+    @staticmethod
+    def _fechar(loja):
+        try:
+            loja.fechar()
+        except Exception as e:
+            print(f"Erro ao fechar loja {loja.id}: {e}")
+
+    def fechar(self):
+        """Fecha todas as lojas abertas (ao encerrar o servidor)"""
+        with self._lock:
+            lojas = list(self._abertas.values())
+        for loja in lojas:
+            self._fechar(loja)
+
+
+class ConsolidacaoLojas:
+    """Totais de várias lojas calculados em paralelo e somados
+
+    As lojas abertas entregam os totais da memória; as fechadas são lidas
+    do disco em threads e os totais ficam guardados pela assinatura dos
+    arquivos até a loja mudar. Com `processos` > 0 (o padrão com mais de um
+    núcleo), consultas com ao menos `minimo_processos` lojas a ler usam um
+    conjunto de processos (spawn), criado só na primeira delas; com 0 tudo
+    é lido em threads
+    """
+
+    def __init__(self, particoes, armazenamento='json', opcoes=None, processos=PROCESSOS_PADRAO,
+                 minimo_processos=MINIMO_LOJAS_PROCESSOS):
+        self.particoes = particoes
+        self.armazenamento = armazenamento
+        self.opcoes = opcoes or {}
+        self.processos = processos
+        self.minimo_processos = minimo_processos
+        self._threads = None
+        self._processos = None
+        self._lock = threading.Lock()
+        # id da loja -> (assinatura dos arquivos, parciais)
+        self._cache = {}
+
+    def _obter_executor(self, lojas_a_ler):
+        with self._lock:
+            if self.processos > 0 and lojas_a_ler >= self.minimo_processos:
+                if self._processos is None:
+                    # spawn: o servidor tem threads, e fork copiaria locks travados
+                    self._processos = ProcessPoolExecutor(
+                        max_workers=self.processos, mp_context=multiprocessing.get_context('spawn'))
+                return self._processos
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                                   thread_name_prefix='consolidacao')
+            return self._threads
+
+    def parciais(self, ids):
+        """{id: (parcial de contas, parcial de entradas) ou a exceção da loja}"""
+        resultados = {}
+        a_ler = {}
+        for id_loja in ids:
+            loja = self.particoes.emprestar(id_loja, abrir=False)
+            if loja is not None:
+                try:
+                    resultados[id_loja] = loja.parciais()
+                except Exception as e:
+                    resultados[id_loja] = e
+                finally:
+                    self.particoes.devolver(loja)
+                continue
+
+            diretorio = self.particoes.diretorio(id_loja)
+            assinatura = assinatura_loja(diretorio, self.armazenamento)
+            guardado = self._cache.get(id_loja)
+            if guardado is not None and guardado[0] == assinatura:
+                resultados[id_loja] = guardado[1]
+            else:
+                a_ler[id_loja] = (diretorio, assinatura)
+
+        pendentes = {}
+        if a_ler:
+            executor = self._obter_executor(len(a_ler))
+            for id_loja, (diretorio, assinatura) in a_ler.items():
+                pendentes[id_loja] = (assinatura, executor.submit(
+                    parciais_do_disco, diretorio, self.armazenamento, self.opcoes))
+
+        for id_loja, (assinatura, futuro) in pendentes.items():
+            try:
+                resultados[id_loja] = futuro.result()
+                self._cache[id_loja] = (assinatura, resultados[id_loja])
+            except Exception as e:
+                print(f"Erro ao consolidar loja {id_loja}: {e}")
+                resultados[id_loja] = e
+        return {id_loja: resultados[id_loja] for id_loja in ids}
+
+    def encerrar(self):
+        with self._lock:
+            for executor in (self._threads, self._processos):
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            self._threads = self._processos = None
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas do servidor no formato texto do Prometheus (/api/metrics)
+Contadores, histogramas de duração e medidores calculados na coleta;
+cada observação custa um perf_counter, um bisect e um lock curto
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Limites (segundos) dos histogramas de duração, como os padrões do Prometheus
+LIMITES_DURACAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(valor)
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra is not None:
+        pares.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class Contador:
+    """Valor que só cresce, por combinação de rótulos"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *rotulos, valor=1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def valor(self, *rotulos):
+        return self._valores.get(rotulos, 0)
+
+    def linhas(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        for rotulos, valor in sorted(valores):
+            yield f'{self.nome}{_formatar_rotulos(self.rotulos, rotulos)} {_formatar_numero(valor)}'
+
+
+class Histograma:
+    """Distribuição de valores (durações em segundos) em faixas cumulativas"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_DURACAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(limites)
+        # rótulos -> [contagem por faixa (não cumulativa) + acima do último limite, soma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *rotulos):
+        faixa = bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][faixa] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def total(self, *rotulos):
+        serie = self._series.get(rotulos)
+        return serie[2] if serie else 0
+
+    def linhas(self):
+        with self._lock:
+            series = [(rotulos, list(serie[0]), serie[1], serie[2]) for rotulos, serie in self._series.items()]
+        for rotulos, contagens, soma, total in sorted(series, key=lambda serie: serie[0]):
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float('inf'),), contagens):
+                acumulado += contagem
+                rotulo_faixa = ('le', _formatar_numero(float(limite)))
+                yield f'{self.nome}_bucket{_formatar_rotulos(self.rotulos, rotulos, rotulo_faixa)} {acumulado}'
+            yield f'{self.nome}_sum{_formatar_rotulos(self.rotulos, rotulos)} {_formatar_numero(soma)}'
+            yield f'{self.nome}_count{_formatar_rotulos(self.rotulos, rotulos)} {total}'
+
+
+class Medidor:
+    """Valor atual calculado só na coleta (ex.: quantidade de registros)"""
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._funcoes = {}
+
+    def definir(self, funcao, *rotulos):
+        self._funcoes[rotulos] = funcao
+
+    def linhas(self):
+        for rotulos, funcao in sorted(self._funcoes.items(), key=lambda item: item[0]):
+            try:
+                valor = funcao()
+            except Exception as e:
+                print(f"Erro ao calcular métrica {self.nome}: {e}")
+                continue
+            yield f'{self.nome}{_formatar_rotulos(self.rotulos, rotulos)} {_formatar_numero(valor)}'
+
+
+class Metricas:
+    """Registro das métricas do processo"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, classe, nome, ajuda, rotulos, **opcoes):
+        with self._lock:
+            metrica = self._metricas.get(nome)
+            if metrica is None:
+                metrica = self._metricas[nome] = classe(nome, ajuda, rotulos, **opcoes)
+            elif not isinstance(metrica, classe) or metrica.rotulos != tuple(rotulos):
+                raise ValueError(f"Métrica {nome} já registrada com outro tipo ou rótulos")
+            return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador, nome, ajuda, rotulos)
+
+    def histograma(self, nome, ajuda, rotulos=(), limites=LIMITES_DURACAO):
+        return self._registrar(Histograma, nome, ajuda, rotulos, limites=limites)
+
+    def medidor(self, nome, ajuda, rotulos=()):
+        return self._registrar(Medidor, nome, ajuda, rotulos)
+
+    def exportar(self):
+        """Todas as métricas no formato texto do Prometheus"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        linhas = []
+        for metrica in metricas:
+            linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            linhas.extend(metrica.linhas())
+        return '\n'.join(linhas) + '\n'
+
+
+# Registro único do processo, usado pelos módulos de armazenamento e pelo servidor
+metricas = Metricas()
+
+duracao_funcoes = metricas.histograma(
+    'funcao_duracao_segundos', 'Duração das funções instrumentadas', ('funcao',))
+erros_funcoes = metricas.contador(
+    'funcao_erros_total', 'Exceções lançadas pelas funções instrumentadas', ('funcao',))
+bytes_lidos = metricas.contador(
+    'arquivo_bytes_lidos_total', 'Bytes lidos de arquivos de dados', ('arquivo',))
+bytes_gravados = metricas.contador(
+    'arquivo_bytes_gravados_total', 'Bytes gravados em arquivos de dados', ('arquivo',))
+duracao_decodificacao = metricas.histograma(
+    'json_decodificacao_duracao_segundos', 'Tempo de decodificação de JSON', ('origem',))
+duracao_serializacao = metricas.histograma(
+    'json_serializacao_duracao_segundos', 'Tempo de serialização de JSON', ('origem',))
+
+
+def cronometrar(nome=None):
+    """Decorador: duração e exceções de uma função em funcao_duracao_segundos/funcao_erros_total"""
+    def decorar(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def funcao_cronometrada(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            except BaseException:
+                erros_funcoes.incrementar(rotulo)
+                raise
+            finally:
+                duracao_funcoes.observar(time.perf_counter() - inicio, rotulo)
+        return funcao_cronometrada
+    return decorar
+
+
+def contar_blocos(blocos, arquivo, origem):
+    """Repassa blocos de bytes serializados somando o tempo gasto para gerá-los e os bytes gravados"""
+    total = 0
+    tempo = 0.0
+    iterador = iter(blocos)
+    while True:
+        inicio = time.perf_counter()
+        try:
+            bloco = next(iterador)
+        except StopIteration:
+            break
+        finally:
+            tempo += time.perf_counter() - inicio
+        total += len(bloco)
+        yield bloco
+    duracao_serializacao.observar(tempo, origem)
+    bytes_gravados.incrementar(arquivo, valor=total)
+
+
+def instrumentar_rotas(app):
+    """Envolve todas as rotas já registradas no app medindo duração, status e erros
+
+    A duração vai até a resposta ficar pronta; corpos enviados em partes
+    continuam sendo transmitidos depois
+    """
+    from flask import request
+    from werkzeug.exceptions import HTTPException
+
+    requisicoes = metricas.contador(
+        'http_requisicoes_total', 'Requisições atendidas por rota, método e status', ('rota', 'metodo', 'status'))
+    duracao = metricas.histograma(
+        'http_requisicao_duracao_segundos', 'Duração das requisições por rota', ('rota', 'metodo'))
+    erros = metricas.contador(
+        'http_erros_total', 'Requisições com erro do servidor (5xx ou exceção)', ('rota', 'metodo'))
+
+    def envolver(funcao):
+        @functools.wraps(funcao)
+        def rota_instrumentada(*args, **kwargs):
+            inicio = time.perf_counter()
+            rota = request.url_rule.rule
+            metodo = request.method
+            try:
+                resposta = app.make_response(funcao(*args, **kwargs))
+            except HTTPException as e:
+                status = e.code or 500
+                raise
+            except BaseException:
+                status = 500
+                raise
+            else:
+                status = resposta.status_code
+                return resposta
+            finally:
+                duracao.observar(time.perf_counter() - inicio, rota, metodo)
+                requisicoes.incrementar(rota, metodo, str(status))
+                if status >= 500:
+                    erros.incrementar(rota, metodo)
+        return rota_instrumentada
+
+    for endpoint, funcao in list(app.view_functions.items()):
+        app.view_functions[endpoint] = envolver(funcao)
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precificação de desossas em lote com NumPy
+Primais, cortes, rendimentos, margens e regras de arredondamento vêm do
+catálogo (catalogo_cortes.json), compilado uma vez em vetores de coeficientes
+"""
+
+import json
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+
+MEDIA_PERDAS_PADRAO = 27
+MEDIA_LUCRO_PADRAO = 40
+
+ARQUIVO_CATALOGO = os.environ.get(
+    'CATALOGO_CORTES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalogo_cortes.json')
+)
+
+MODOS_ARREDONDAMENTO = ('cima', 'proximo', 'nenhum')
+
+# Peças recentes guardadas por (tipo, peso, preço, perdas, lucro)
+TAMANHO_CACHE_PRECOS = int(os.environ.get('CACHE_PRECOS', 4096))
+
+# Pontos (preços x perdas x lucros) de uma simulação em grade
+LIMITE_PONTOS_GRADE = int(os.environ.get('LIMITE_PONTOS_GRADE', 1_000_000))
+# Preços por corte devolvidos em uma simulação (pontos x cortes pedidos)
+LIMITE_VALORES_GRADE = int(os.environ.get('LIMITE_VALORES_GRADE', 2_000_000))
+# Pontos calculados por vez: limita a memória dos arrays intermediários
+PONTOS_POR_BLOCO = 1 << 17
+# Faixa e precisão da busca pela margem mínima (media_lucro, em %)
+LUCRO_MAXIMO_BUSCA = 1000
+PRECISAO_LUCRO = 0.01
+
+_round_python = np.frompyfunc(round, 2, 1)
+
+# Divide um float64 em duas metades de 26 bits (Veltkamp)
+_DIVISOR_METADES = 2.0 ** 27 + 1
+# Maior escala em que as metades vezes a escala ainda são exatas
+CASAS_MEIO_EXATO = 7
+
+
+def _desempatar_meios(valores, casas):
+    """round(valores, casas) do Python para valores perto de meio centavo
+
+    O round() do Python decide pelo valor binário exato; aqui o produto
+    valores * 10**casas é calculado sem erro (produto + erro, como no
+    algoritmo de Dekker) e comparado ao meio, com empate exato para o par
+    """
+    escala = 10.0 ** casas
+    produto = valores * escala
+    grande = ~(np.abs(produto) < 2.0 ** 50)
+    if casas < 0 or casas > CASAS_MEIO_EXATO or np.any(grande):
+        return _round_python(valores, casas).astype(np.float64)
+    c = _DIVISOR_METADES * valores
+    alto = c - (c - valores)
+    baixo = valores - alto
+    erro = (alto * escala - produto) + baixo * escala
+    inferior = np.floor(produto)
+    diferenca = (produto - (inferior + 0.5)) + erro
+    par = np.where(np.fmod(inferior, 2) == 0, inferior, inferior + 1)
+    inteiros = np.where(diferenca > 0, inferior + 1, np.where(diferenca < 0, inferior, par))
+    # Zero mantém o sinal do valor, como no round() (-0.0)
+    return np.copysign(inteiros / escala, valores)
+
+
+def arredondar_casas(valores, casas):
+    """np.round com o mesmo resultado do round() do Python
+
+    np.round multiplica por 10**casas antes de arredondar e pode errar os
+    casos de meio centavo (49.005); esses valores são desempatados pelo
+    produto exato, como faz o round()
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    escala = 10.0 ** casas
+    # As mesmas contas de np.round (rint(v * 10**casas) / 10**casas), com a
+    # distância até o inteiro mais próximo aproveitada para achar os meios
+    escalados = valores * escala
+    arredondados = np.rint(escalados)
+    distancia = np.subtract(escalados, arredondados, out=escalados)
+    np.abs(distancia, out=distancia)
+    distancia -= 0.5
+    np.abs(distancia, out=distancia)
+    duvidosos = distancia < 1e-6
+    # Valores enormes (ou não finitos) perdem precisão em v * 10**casas
+    duvidosos |= ~(np.abs(arredondados) < 2.0 ** 50)
+    arredondados /= escala
+    if duvidosos.any():
+        arredondados[duvidosos] = _desempatar_meios(valores[duvidosos], casas)
+    return arredondados
+
+
+class PrimalCompilado:
+    """Um primal do catálogo com os coeficientes de preço já montados
+
+    Preço de venda de cada corte:
+        preco * (usaPerdas * perdas/100 + 1 + ajustePerdas) * (usaLucro * lucro/100 + 1 + ajusteLucro)
+    mais os acréscimos das regras por faixa de preço, e então arredondado
+    """
+
+    def __init__(self, definicao, arredondamento):
+        try:
+            self.chave = str(definicao['chave'])
+            self.nome = str(definicao['nome'])
+            cortes = definicao['cortes']
+            rendimentos = definicao['rendimentos']
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Primal sem o campo obrigatório {e}")
+        if not cortes:
+            raise ValueError(f"Primal {self.chave} sem cortes")
+
+        self.cortes = [(str(c['chave']), str(c.get('nome', c['chave']))) for c in cortes]
+        self.rendimentos = [(str(r['chave']), str(r.get('nome', r['chave']))) for r in rendimentos]
+        chaves_cortes = [c[0] for c in self.cortes]
+        for chaves, grupo in ((chaves_cortes, 'corte'), ([r[0] for r in self.rendimentos], 'rendimento')):
+            if len(set(chaves)) != len(chaves):
+                raise ValueError(f"Primal {self.chave} com {grupo} repetido")
+
+        self.usa_perdas = np.array([float(c.get('usaPerdas', True)) for c in cortes])
+        self.ajuste_perdas = np.array([float(c.get('ajustePerdas', 0)) for c in cortes])
+        self.usa_lucro = np.array([float(c.get('usaLucro', True)) for c in cortes])
+        self.ajuste_lucro = np.array([float(c.get('ajusteLucro', 0)) for c in cortes])
+        self.fracoes = np.array([float(r['fracao']) for r in rendimentos])
+        if np.any(self.fracoes < 0) or self.fracoes.sum() > 1:
+            raise ValueError(f"Rendimentos inválidos no primal {self.chave}")
+
+        # Fração do peso da peça vendida a cada corte: cada rendimento é vendido
+        # pelo corte indicado em 'corte' ou pelo de mesma chave; sem corte, não entra
+        self.fracoes_venda = np.zeros(len(cortes))
+        for r, fracao in zip(rendimentos, self.fracoes):
+            corte = r.get('corte', r['chave'])
+            if corte in chaves_cortes:
+                self.fracoes_venda[chaves_cortes.index(corte)] += fracao
+            elif 'corte' in r:
+                raise ValueError(f"Rendimento {r['chave']} do primal {self.chave} cita corte inexistente: {corte}")
+
+        # Regras por faixa de preço: (preço máximo, acréscimo por corte)
+        self.regras = []
+        for regra in definicao.get('regras', []):
+            desconhecidos = set(regra.get('acrescimo', {})) - set(chaves_cortes)
+            if desconhecidos:
+                raise ValueError(f"Regra do primal {self.chave} cita cortes inexistentes: {sorted(desconhecidos)}")
+            acrescimo = np.array([float(regra['acrescimo'].get(c, 0)) for c in chaves_cortes])
+            self.regras.append((float(regra['precoAte']), acrescimo))
+
+        self.casas = int(arredondamento.get('casas', 2))
+        self.modo = arredondamento.get('modo', 'cima')
+        if self.modo not in MODOS_ARREDONDAMENTO:
+            raise ValueError(f"Modo de arredondamento inválido: {self.modo}")
+
+        self.dtype = np.dtype([
+            ('precos', [(c, 'f8') for c in chaves_cortes]),
+            ('pesos', [(r[0], 'f8') for r in self.rendimentos]),
+            ('lucro', 'f8'),
+        ])
+
+    def _arredondar(self, valores):
+        if self.modo == 'nenhum':
+            return valores
+        valores = arredondar_casas(valores, self.casas)
+        return np.ceil(valores) if self.modo == 'cima' else valores
+
+    def fatores(self, perdas, lucro):
+        """Vetores de perdas e lucro -> matrizes (valores x cortes) dos fatores de preço"""
+        fator_perdas = self.usa_perdas * (perdas[:, None] / 100) + 1 + self.ajuste_perdas
+        fator_lucro = self.usa_lucro * (lucro[:, None] / 100) + 1 + self.ajuste_lucro
+        return fator_perdas, fator_lucro
+
+    def finalizar_precos(self, precos, preco):
+        """Regras por faixa e arredondamento; `preco` com a forma de precos sem o eixo dos cortes"""
+        if self.regras:
+            # Acréscimos entram depois dos centavos e antes do arredondamento final
+            if self.modo != 'nenhum':
+                precos = arredondar_casas(precos, self.casas)
+            for limite, acrescimo in self.regras:
+                precos = precos + np.where(preco[..., None] <= limite, acrescimo, 0.0)
+        return self._arredondar(precos)
+
+    def precos_venda(self, preco, perdas, lucro):
+        """Vetores de mesmo tamanho -> matriz (peças x cortes) de preços de venda"""
+        fator_perdas, fator_lucro = self.fatores(perdas, lucro)
+        # A ordem das operações reproduz a da calculadora
+        return self.finalizar_precos(preco[:, None] * fator_perdas * fator_lucro, preco)
+
+    def lucro_venda(self, precos, peso, preco):
+        """Receita da venda dos cortes menos o custo da peça, em centavos arredondados"""
+        return arredondar_casas(precos @ self.fracoes_venda * peso - peso * preco, 2)
+
+    def precificar(self, peso, preco, perdas, lucro):
+        """Vetores de mesmo tamanho -> array estruturado com self.dtype"""
+        precos = self.precos_venda(preco, perdas, lucro)
+
+        pesos = peso[:, None] * self.fracoes
+        custo_cortes = np.zeros_like(peso)
+        for i in range(pesos.shape[1]):
+            custo_cortes = custo_cortes + preco * pesos[:, i]
+        lucro_peca = self._arredondar(peso * preco - custo_cortes)
+
+        resultado = np.empty(peso.shape[0], dtype=self.dtype)
+        for i, (chave, _) in enumerate(self.cortes):
+            resultado['precos'][chave] = precos[:, i]
+        for i, (chave, _) in enumerate(self.rendimentos):
+            resultado['pesos'][chave] = pesos[:, i]
+        resultado['lucro'] = lucro_peca
+        return resultado
+
+
+class CatalogoCortes:
+    """Primais compilados, acessíveis pela chave ou pelo nome de exibição"""
+
+    def __init__(self, definicao):
+        arredondamento = definicao.get('arredondamento', {})
+        self.primais = {}
+        self._aliases = {}
+        for item in definicao.get('primais', []):
+            primal = PrimalCompilado(item, {**arredondamento, **item.get('arredondamento', {})})
+            if primal.chave in self.primais:
+                raise ValueError(f"Primal repetido no catálogo: {primal.chave}")
+            self.primais[primal.chave] = primal
+            self._aliases[primal.chave.lower()] = primal
+            self._aliases[primal.nome.lower()] = primal
+
+    @classmethod
+    def carregar(cls, arquivo=ARQUIVO_CATALOGO):
+        """Lê e compila o catálogo de um arquivo JSON"""
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def primal(self, tipo):
+        """Primal a partir do nome usado na calculadora ou na API"""
+        primal = self._aliases.get(str(tipo).strip().lower())
+        if primal is None:
+            raise ValueError(f"Tipo de peça desconhecido: {tipo}")
+        return primal
+
+    def tipos(self):
+        """Nomes de exibição dos primais, na ordem do catálogo"""
+        return [primal.nome for primal in self.primais.values()]
+
+
+catalogo = CatalogoCortes.carregar()
+
+
+def chave_primal(tipo):
+    """Chave interna do primal a partir do nome usado na calculadora ou na API"""
+    return catalogo.primal(tipo).chave
+
+
+def dtype_resultado(tipo):
+    """dtype estruturado do resultado: precos (por corte), pesos (por peça) e lucro"""
+    return catalogo.primal(tipo).dtype
+
+
+def _vetor(nome, valores):
+    try:
+        vetor = np.atleast_1d(np.asarray(valores, dtype=np.float64))
+    except (TypeError, ValueError):
+        raise ValueError(f"{nome} deve ser um número ou uma lista de números")
+    if vetor.ndim != 1:
+        raise ValueError(f"{nome} deve ser um número ou uma lista de números")
+    if not np.all(np.isfinite(vetor)):
+        raise ValueError(f"{nome} contém valores inválidos")
+    return vetor
+
+
+def precificar_lote(tipo, peso, preco, media_perdas=MEDIA_PERDAS_PADRAO, media_lucro=MEDIA_LUCRO_PADRAO):
+    """Precifica N peças de um primal de uma vez
+
+    peso, preco, media_perdas e media_lucro podem ser números ou vetores de
+    mesmo tamanho (números são repetidos para todas as peças). Retorna um
+    array estruturado com dtype_resultado(tipo)
+    """
+    primal = catalogo.primal(tipo)
+    vetores = (
+        _vetor('peso', peso), _vetor('preco', preco),
+        _vetor('media_perdas', media_perdas), _vetor('media_lucro', media_lucro)
+    )
+    try:
+        peso, preco, perdas, lucro = np.broadcast_arrays(*vetores)
+    except ValueError:
+        raise ValueError("peso, preco, media_perdas e media_lucro devem ter o mesmo tamanho")
+    return primal.precificar(peso, preco, perdas, lucro)
+
+
+def resultado_para_dict(resultado):
+    """Converte o array estruturado em listas (formato JSON colunar)"""
+    return {
+        'precos': {nome: resultado['precos'][nome].tolist() for nome in resultado.dtype['precos'].names},
+        'pesos': {nome: resultado['pesos'][nome].tolist() for nome in resultado.dtype['pesos'].names},
+        'lucro': resultado['lucro'].tolist(),
+    }
+
+
+def precificar_itens(itens):
+    """Precifica uma lista de peças de primais variados, agrupando por tipo
+
+    Cada item: {'tipo', 'peso', 'preco', 'media_perdas'?, 'media_lucro'?}.
+    Retorna a lista de resultados na mesma ordem dos itens
+    """
+    grupos = {}
+    for posicao, item in enumerate(itens):
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {posicao} deve ser um objeto")
+        grupos.setdefault(chave_primal(item.get('tipo')), []).append(posicao)
+
+    resultados = [None] * len(itens)
+    for chave, posicoes in grupos.items():
+        selecionados = [itens[p] for p in posicoes]
+        try:
+            lote = precificar_lote(
+                chave,
+                [item['peso'] for item in selecionados],
+                [item['preco'] for item in selecionados],
+                [item.get('media_perdas', MEDIA_PERDAS_PADRAO) for item in selecionados],
+                [item.get('media_lucro', MEDIA_LUCRO_PADRAO) for item in selecionados],
+            )
+        except KeyError as e:
+            raise ValueError(f"Campo obrigatório ausente: {e.args[0]}")
+        colunas = resultado_para_dict(lote)
+        for i, posicao in enumerate(posicoes):
+            resultados[posicao] = {
+                'tipo': catalogo.primais[chave].nome,
+                'precos': {nome: valores[i] for nome, valores in colunas['precos'].items()},
+                'pesos': {nome: valores[i] for nome, valores in colunas['pesos'].items()},
+                'lucro': colunas['lucro'][i],
+            }
+    return resultados
+
+
+def _numero(nome, valor):
+    if isinstance(valor, bool):
+        raise ValueError(f"{nome} deve ser um número")
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{nome} deve ser um número")
+    if not math.isfinite(valor):
+        raise ValueError(f"{nome} contém valores inválidos")
+    return valor
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_PRECOS)
+def _precificar_peca(chave, peso, preco, media_perdas, media_lucro):
+    primal = catalogo.primais[chave]
+    peca = primal.precificar(
+        np.array([peso]), np.array([preco]), np.array([media_perdas]), np.array([media_lucro])
+    )[0]
+    return tuple(peca['precos'].tolist()), tuple(peca['pesos'].tolist()), float(peca['lucro'])
+
+
+def precificar(tipo, peso, preco, media_perdas=MEDIA_PERDAS_PADRAO, media_lucro=MEDIA_LUCRO_PADRAO):
+    """Precifica uma peça, com cache das combinações já calculadas
+
+    Retorna {'tipo', 'precos': {corte: R$}, 'pesos': {peça: kg}, 'lucro'}
+    """
+    primal = catalogo.primal(tipo)
+    precos, pesos, lucro = _precificar_peca(
+        primal.chave, _numero('peso', peso), _numero('preco', preco),
+        _numero('media_perdas', media_perdas), _numero('media_lucro', media_lucro)
+    )
+    return {
+        'tipo': primal.nome,
+        'precos': dict(zip((c[0] for c in primal.cortes), precos)),
+        'pesos': dict(zip((r[0] for r in primal.rendimentos), pesos)),
+        'lucro': lucro,
+    }
+
+
+def precificar_parametros(parametros):
+    """precificar() a partir de um dicionário (query string ou corpo JSON)
+
+    Inclui os nomes de exibição dos cortes e das peças
+    """
+    for campo in ('tipo', 'peso', 'preco'):
+        if parametros.get(campo) in (None, ''):
+            raise ValueError(f"Campo obrigatório ausente: {campo}")
+    opcionais = {
+        campo: padrao if parametros.get(campo) in (None, '') else parametros[campo]
+        for campo, padrao in (('media_perdas', MEDIA_PERDAS_PADRAO), ('media_lucro', MEDIA_LUCRO_PADRAO))
+    }
+    resultado = precificar(parametros['tipo'], parametros['peso'], parametros['preco'], **opcionais)
+    primal = catalogo.primal(parametros['tipo'])
+    resultado['nomes'] = {
+        'precos': dict(primal.cortes),
+        'pesos': dict(primal.rendimentos),
+    }
+    return resultado
+
+
+def eixo_grade(nome, valor):
+    """Valores de um eixo da simulação: número, lista ou {"de", "ate", "passo"}"""
+    if isinstance(valor, dict):
+        try:
+            de, ate, passo = (_numero(f"{nome}.{campo}", valor[campo]) for campo in ('de', 'ate', 'passo'))
+        except KeyError as e:
+            raise ValueError(f"{nome} deve ter de, ate e passo (falta {e.args[0]})")
+        if passo <= 0 or ate < de:
+            raise ValueError(f"{nome}: passo deve ser positivo e ate >= de")
+        quantidade = math.floor((ate - de) / passo + 1e-9) + 1
+        if quantidade > LIMITE_PONTOS_GRADE:
+            raise ValueError(f"{nome} tem pontos demais")
+        # Arredondado para 0.1 + 0.2 virar 0.3 nos rótulos e no cache
+        return np.round(de + passo * np.arange(quantidade), 9)
+    vetor = _vetor(nome, valor)
+    if vetor.size == 0:
+        raise ValueError(f"{nome} não pode ser vazio")
+    return vetor
+
+
+def _blocos(linhas, pontos_por_linha):
+    """Fatias de linhas com cerca de PONTOS_POR_BLOCO pontos cada"""
+    por_bloco = max(1, PONTOS_POR_BLOCO // max(pontos_por_linha, 1))
+    for inicio in range(0, linhas, por_bloco):
+        yield slice(inicio, min(inicio + por_bloco, linhas))
+
+
+def simular_grade(tipo, peso, precos, perdas, lucros):
+    """Preços de venda e lucro da peça em toda a grade preço x perdas x lucro
+
+    precos, perdas e lucros são os eixos (ver eixo_grade); cada ponto é a
+    mesma conta de precificar(). Retorna {'eixos', 'precos': (P, L, M, cortes),
+    'lucro': (P, L, M)}, com o lucro = venda dos cortes - custo da peça
+    (não o "lucro aproximado" de precificar(), que não depende das margens)
+    """
+    primal = catalogo.primal(tipo)
+    peso = _numero('peso', peso)
+    eixos = (eixo_grade('preco', precos), eixo_grade('media_perdas', perdas), eixo_grade('media_lucro', lucros))
+    forma = tuple(len(eixo) for eixo in eixos)
+    if math.prod(forma) > LIMITE_PONTOS_GRADE:
+        raise ValueError(f"Grade com {math.prod(forma)} pontos; o limite é {LIMITE_PONTOS_GRADE}")
+
+    precos_venda = np.empty(forma + (len(primal.cortes),))
+    lucro = np.empty(forma)
+    eixo_preco = eixos[0]
+    # Os fatores dependem só de perdas ou só de lucro: uma linha por valor do eixo
+    fator_perdas, _ = primal.fatores(eixos[1], eixos[1])
+    _, fator_lucro = primal.fatores(eixos[2], eixos[2])
+    for fatia in _blocos(forma[0], forma[1] * forma[2]):
+        preco = eixo_preco[fatia, None, None]
+        # (preços, perdas, lucros, cortes), na ordem de operações de precos_venda
+        bloco = primal.finalizar_precos(
+            preco[..., None] * fator_perdas[:, None, :] * fator_lucro[None, :, :],
+            np.broadcast_to(preco, (len(eixo_preco[fatia]),) + forma[1:])
+        )
+        precos_venda[fatia] = bloco
+        lucro[fatia] = primal.lucro_venda(bloco, peso, preco)
+    return {'eixos': eixos, 'precos': precos_venda, 'lucro': lucro}
+
+
+def lucro_minimo(tipo, peso, precos, perdas, lucro_alvo,
+                 lucro_maximo=LUCRO_MAXIMO_BUSCA, precisao=PRECISAO_LUCRO):
+    """Menor media_lucro (múltiplo de `precisao`) com lucro da peça >= lucro_alvo
+
+    Para cada preço x perdas; NaN onde nem lucro_maximo alcança o alvo. O
+    lucro só cresce com a margem, então a busca binária anda em todos os
+    pontos ao mesmo tempo, com ~log2(lucro_maximo / precisao) avaliações
+    """
+    primal = catalogo.primal(tipo)
+    peso = _numero('peso', peso)
+    alvo = _numero('lucro_alvo', lucro_alvo)
+    eixo_preco, eixo_perdas = eixo_grade('preco', precos), eixo_grade('media_perdas', perdas)
+    forma = (len(eixo_preco), len(eixo_perdas))
+    if math.prod(forma) > LIMITE_PONTOS_GRADE:
+        raise ValueError(f"Grade com {math.prod(forma)} pontos; o limite é {LIMITE_PONTOS_GRADE}")
+    preco, perda = (eixo.ravel() for eixo in np.meshgrid(eixo_preco, eixo_perdas, indexing='ij'))
+
+    def alcanca(passos):
+        return primal.lucro_venda(primal.precos_venda(preco, perda, passos * precisao), peso, preco) >= alvo
+
+    # Menor passo em [0, maximo] que alcança o alvo: inferior não alcança (ou é 0), superior alcança
+    maximo = math.ceil(lucro_maximo / precisao)
+    inferior = np.zeros(preco.shape, dtype=np.int64)
+    superior = np.full(preco.shape, maximo, dtype=np.int64)
+    possivel = alcanca(superior)
+    pendente = possivel & ~alcanca(inferior)
+    while np.any(pendente):
+        meio = (inferior + superior) // 2
+        ok = alcanca(meio)
+        superior = np.where(pendente & ok, meio, superior)
+        inferior = np.where(pendente & ~ok, meio, inferior)
+        pendente &= superior - inferior > 1
+    passos = np.where(alcanca(inferior), inferior, superior)
+    resultado = np.where(possivel, np.round(passos * precisao, 9), np.nan)
+    return {'eixos': (eixo_preco, eixo_perdas), 'lucroMinimo': resultado.reshape(forma)}
+
+
+def _lista(valores):
+    """tolist() com NaN como None e inteiros sem o .0 (JSON menor e mais rápido)"""
+    vazios = np.isnan(valores)
+    if np.any(vazios):
+        objetos = valores.astype(object)
+        objetos[vazios] = None
+        return objetos.tolist()
+    if np.all(np.abs(valores) < 2 ** 53) and np.array_equal(valores, np.floor(valores)):
+        return valores.astype(np.int64).tolist()
+    return valores.tolist()
+
+
+def simulacao_para_dict(tipo, grade, cortes=None, minimo=None):
+    """Simulação no formato JSON: eixos, lucroTotal[preço][perdas][lucro] e precos[corte][...]
+
+    `cortes` escolhe as matrizes de preço devolvidas (todas por padrão);
+    `minimo` é o resultado de lucro_minimo() para os mesmos eixos
+    """
+    primal = catalogo.primal(tipo)
+    chaves = [chave for chave, _ in primal.cortes]
+    if cortes is None:
+        cortes = chaves
+    if not isinstance(cortes, list) or any(corte not in chaves for corte in cortes):
+        raise ValueError(f"cortes deve ser uma lista com cortes de {primal.nome}: {', '.join(chaves)}")
+    if grade['lucro'].size * len(cortes) > LIMITE_VALORES_GRADE:
+        raise ValueError(
+            f"{grade['lucro'].size * len(cortes)} preços pedidos; o limite é {LIMITE_VALORES_GRADE}"
+            " (escolha menos cortes, ou cortes: [] para só o lucro)"
+        )
+    eixo_preco, eixo_perdas, eixo_lucros = grade['eixos']
+    resultado = {
+        'tipo': primal.nome,
+        'eixos': {'preco': _lista(eixo_preco), 'media_perdas': _lista(eixo_perdas),
+                  'media_lucro': _lista(eixo_lucros)},
+        'pontos': grade['lucro'].size,
+        'lucroTotal': _lista(grade['lucro']),
+        'precos': {corte: _lista(grade['precos'][..., chaves.index(corte)]) for corte in cortes},
+        'nomes': {'precos': dict(primal.cortes)},
+    }
+    if minimo is not None:
+        resultado['lucroMinimo'] = _lista(minimo['lucroMinimo'])
+    return resultado
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Revisões das coleções para a sincronização incremental do navegador
+Cada gravação incrementa um contador monotônico; cada registro guarda a
+revisão da sua última alteração e as exclusões deixam uma lápide, então
+/api/sync?since=N devolve só o que mudou depois da revisão N
+"""
+
+import threading
+from collections import OrderedDict, deque
+
+# Lápides mantidas por coleção; clientes mais atrasados recebem tudo de novo
+LIMITE_LAPIDES_PADRAO = 10000
+
+
+class Revisoes:
+    """Contador de revisões compartilhado pelas coleções
+
+    As alterações de todas as coleções e as consultas passam pelo mesmo
+    lock, então cada resposta é um retrato consistente de uma revisão
+    """
+
+    def __init__(self, limite_lapides=LIMITE_LAPIDES_PADRAO):
+        self.atual = 0
+        # Menor `since` ainda atendido com alterações (lápides anteriores foram descartadas)
+        self.minima = 0
+        self.limite_lapides = limite_lapides
+        self.historicos = {}
+        self._condicao = threading.Condition()
+
+    def historico(self, nome):
+        """Ouvinte que registra as revisões da coleção `nome`"""
+        historico = HistoricoColecao(self)
+        self.historicos[nome] = historico
+        return historico
+
+    def _proxima(self):
+        """Nova revisão (chamada com o lock seguro)"""
+        self.atual += 1
+        self._condicao.notify_all()
+        return self.atual
+
+    def aguardar(self, revisao, espera):
+        """Espera até `espera` segundos enquanto a revisão atual for `revisao`"""
+        with self._condicao:
+            self._condicao.wait_for(lambda: self.atual != revisao, timeout=espera)
+
+    def alteracoes_desde(self, revisao):
+        """Revisão atual e, por coleção, os registros alterados e removidos depois de `revisao`
+
+        Com revisao 0, futura ou anterior à última lápide descartada a
+        resposta é completa: todos os registros, para o cliente substituir
+        o que tem
+        """
+        with self._condicao:
+            completo = revisao <= 0 or revisao > self.atual or revisao < self.minima
+            resposta = {'revisao': self.atual, 'completo': completo}
+            for nome, historico in self.historicos.items():
+                if completo:
+                    resposta[nome] = {'alterados': historico.todos(), 'removidos': []}
+                else:
+                    resposta[nome] = historico.desde(revisao)
+            return resposta
+
+
+class HistoricoColecao:
+    """Ouvinte de ColecaoEmCache (reiniciar/alterar) com a revisão de cada registro"""
+
+    def __init__(self, revisoes):
+        self.revisoes = revisoes
+        # chave -> registro atual, na ordem da coleção
+        self._registros = {}
+        # chave -> revisão da última alteração, da mais antiga para a mais recente
+        self._ordem = OrderedDict()
+        # (revisão, chave) das exclusões, para descartar as mais antigas
+        self._lapides = deque()
+
+    def _marcar(self, chave, revisao):
+        self._ordem[chave] = revisao
+        self._ordem.move_to_end(chave)
+
+    def _excluir(self, chave, revisao):
+        self._marcar(chave, revisao)
+        self._lapides.append((revisao, chave))
+        while len(self._lapides) > self.revisoes.limite_lapides:
+            antiga, chave_antiga = self._lapides.popleft()
+            if self._ordem.get(chave_antiga) == antiga:
+                del self._ordem[chave_antiga]
+            self.revisoes.minima = max(self.revisoes.minima, antiga)
+
+    def reiniciar(self, registros):
+        """Compara o índice completo com o estado conhecido; só o que mudou ganha revisão
+
+        Cobre gravações da lista inteira e recargas do disco feitas por outro processo
+        """
+        with self.revisoes._condicao:
+            revisao = None
+            anteriores = self._registros
+            for chave, registro in registros.items():
+                anterior = anteriores.get(chave)
+                if anterior is not registro and anterior != registro:
+                    revisao = revisao or self.revisoes._proxima()
+                    self._marcar(chave, revisao)
+            for chave in anteriores:
+                if chave not in registros:
+                    revisao = revisao or self.revisoes._proxima()
+                    self._excluir(chave, revisao)
+            self._registros = dict(registros)
+
+    def alterar(self, chave, anterior, novo):
+        """Registra a revisão de um registro criado, alterado ou excluído"""
+        with self.revisoes._condicao:
+            revisao = self.revisoes._proxima()
+            if novo is None:
+                self._registros.pop(chave, None)
+                self._excluir(chave, revisao)
+            else:
+                self._registros[chave] = novo
+                self._marcar(chave, revisao)
+
+    def todos(self):
+        return list(self._registros.values())
+
+    def desde(self, revisao):
+        """Registros alterados e chaves removidas depois de `revisao`, na ordem das alterações"""
+        alterados, removidos = [], []
+        for chave, revisao_registro in reversed(self._ordem.items()):
+            if revisao_registro <= revisao:
+                break
+            registro = self._registros.get(chave)
+            if registro is None:
+                removidos.append(chave)
+            else:
+                alterados.append(registro)
+        alterados.reverse()
+        removidos.reverse()
+        return {'alterados': alterados, 'removidos': removidos}
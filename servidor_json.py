@@ -7,16 +7,36 @@ Sistema simples e robusto para controle financeiro
 
 import time
 import webbrowser
-import json
 import os
-import subprocess
+import hashlib
+import uuid
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import threading
+from armazenamento import DepositoDados, serializar_json
+from ativos import INTERVALO_VERIFICACAO, PAGINA_PRINCIPAL, AtivosEstaticos
+from agregados import AgregadosContas, AgregadosEntradas
+from backup import TrabalhadorBackup, resumo_manifesto
+from compressao import (
+    TAMANHO_MAXIMO_CACHE, TAMANHO_MINIMO, CacheCompressao, comprimir_em_fluxo, escolher_codificacao
+)
+from json_em_blocos import carregar as carregar_json_em_blocos
+from lojas import (
+    LOJA_PRINCIPAL, MINIMO_LOJAS_PROCESSOS, PROCESSOS_PADRAO, ConsolidacaoLojas, Loja, ParticoesLojas,
+    abrir_deposito, normalizar_loja
+)
+from importacao import ImportacaoEntradas, formato_do_tipo
+from metricas import TIPO_CONTEUDO, duracao_decodificacao, instrumentar_rotas, metricas
+from precificacao import (
+    MEDIA_LUCRO_PADRAO, MEDIA_PERDAS_PADRAO, catalogo, lucro_minimo,
+    precificar_itens, precificar_lote, precificar_parametros, resultado_para_dict,
+    simulacao_para_dict, simular_grade
+)
 
 app = Flask(__name__)
-CORS(app)
+# ETag precisa ser exposto para o front-end revalidar pelo navegador (porta 3000)
+CORS(app, expose_headers=['ETag'])
 
 # Configuração
 DATA_DIR = "data"
@@ -24,56 +44,245 @@ CONTAS_FILE = os.path.join(DATA_DIR, "contas.json")
 ENTRADAS_FILE = os.path.join(DATA_DIR, "entradas.json")
 CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
 
-# Garantir que o diretório de dados existe
-os.makedirs(DATA_DIR, exist_ok=True)
+# Onde os dados ficam: 'json' (arquivos acima) ou 'sqlite' (um banco em modo
+# WAL que vários processos do servidor podem compartilhar)
+ARMAZENAMENTO = os.environ.get('ARMAZENAMENTO', 'json').lower()
+BANCO_SQLITE = os.environ.get('BANCO_SQLITE', os.path.join(DATA_DIR, "dados.db"))
+PERSISTENCIA = 'SQLite' if ARMAZENAMENTO == 'sqlite' else 'JSON Files'
 
-def carregar_dados_arquivo(arquivo, dados_padrao=None):
-    """Carrega dados de um arquivo JSON com fallback para dados padrão"""
-    try:
-        if os.path.exists(arquivo):
-            with open(arquivo, 'r', encoding='utf-8') as f:
-                return json.load(f)
+# Diário de alterações: cada gravação de contas/entradas acrescenta só as
+# mudanças em <arquivo>.diario, compactado quando passa do limite
+DIARIO_ATIVO = os.environ.get('DIARIO_ATIVO', '1') != '0'
+DIARIO_LIMITE_BYTES = int(os.environ.get('DIARIO_LIMITE_BYTES', 1024 * 1024))
+
+# Durabilidade: com fsync cada gravação só é confirmada depois de chegar ao
+# disco; gravações simultâneas são agrupadas e dividem o mesmo fsync
+FSYNC_ATIVO = os.environ.get('FSYNC_ATIVO', '1') != '0'
+
+# Instantâneo binário (<arquivo>.instantaneo) aberto com mmap no início em
+# vez de decodificar o JSON; regenerado quando o JSON muda
+INSTANTANEO_ATIVO = os.environ.get('INSTANTANEO_ATIVO', '1') != '0'
+
+# Backups deduplicados em data/backups/ (e em backups/ de cada loja) e
+# política de retenção
+BACKUP_RETENCAO = {
+    'horario': int(os.environ.get('BACKUP_RETENCAO_HORARIO', 24)),
+    'diario': int(os.environ.get('BACKUP_RETENCAO_DIARIO', 7)),
+    'semanal': int(os.environ.get('BACKUP_RETENCAO_SEMANAL', 4)),
+    'manual': int(os.environ.get('BACKUP_RETENCAO_MANUAL', 10)),
+}
+BACKUP_INTERVALO_MINUTOS = int(os.environ.get('BACKUP_INTERVALO_MINUTOS', 0))
+
+# Sincronização incremental (/api/sync): exclusões lembradas por coleção e
+# tempo máximo que uma consulta pode esperar por alterações
+SYNC_LIMITE_LAPIDES = int(os.environ.get('SYNC_LIMITE_LAPIDES', 10000))
+SYNC_ESPERA_MAXIMA = 25
+
+# Lojas (filiais): a principal usa os arquivos acima e cada outra loja tem
+# os mesmos arquivos em data/lojas/<id>/. Lojas são abertas no primeiro
+# pedido e descarregadas além do limite ou depois de ociosas; as
+# estatísticas consolidadas leem as lojas fechadas em processos quando há
+# ao menos LOJAS_MINIMO_PROCESSOS lojas fechadas a ler (LOJAS_PROCESSOS,
+# padrão um por núcleo até 8 com mais de um núcleo) e, com menos lojas ou
+# LOJAS_PROCESSOS=0, em threads
+LOJAS_DIR = os.path.join(DATA_DIR, "lojas")
+LOJAS_ABERTAS = int(os.environ.get('LOJAS_ABERTAS', 8))
+LOJAS_OCIOSIDADE_MINUTOS = float(os.environ.get('LOJAS_OCIOSIDADE_MINUTOS', 30))
+LOJAS_PROCESSOS = int(os.environ.get('LOJAS_PROCESSOS', PROCESSOS_PADRAO))
+LOJAS_MINIMO_PROCESSOS = int(os.environ.get('LOJAS_MINIMO_PROCESSOS', MINIMO_LOJAS_PROCESSOS))
+
+# Os processos da consolidação (spawn) importam este módulo de novo como
+# __mp_main__: neles só valem as definições, sem abrir dados, threads ou
+# comprimir a interface
+PROCESSO_AUXILIAR = __name__ == '__mp_main__'
+
+# Opções do depósito da principal e de cada loja
+OPCOES_DEPOSITO = {'fsync': FSYNC_ATIVO} if ARMAZENAMENTO == 'sqlite' else dict(
+    usar_diario=DIARIO_ATIVO, limite_diario=DIARIO_LIMITE_BYTES, fsync=FSYNC_ATIVO,
+    usar_instantaneo=INSTANTANEO_ATIVO
+)
+
+def abrir_loja(id_loja, diretorio):
+    """Partição de uma loja além da principal, com o mesmo armazenamento"""
+    return Loja(id_loja, diretorio, abrir_deposito(diretorio, ARMAZENAMENTO, **OPCOES_DEPOSITO),
+                SYNC_LIMITE_LAPIDES, BACKUP_RETENCAO)
+
+if not PROCESSO_AUXILIAR:
+    # Garantir que o diretório de dados existe
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    # Identifica esta execução: as versões dos dados recomeçam a cada início
+    INSTANCIA = uuid.uuid4().hex[:8]
+
+    if ARMAZENAMENTO == 'sqlite':
+        from armazenamento_sqlite import DepositoSQLite
+        deposito = DepositoSQLite(BANCO_SQLITE, **OPCOES_DEPOSITO)
+    else:
+        deposito = DepositoDados(CONTAS_FILE, ENTRADAS_FILE, CONFIG_FILE, **OPCOES_DEPOSITO)
+
+    # Totais do dashboard, índices para consultas filtradas e paginadas (em
+    # memória com arquivos JSON, os do próprio banco com SQLite), revisões para
+    # /api/sync e backups de cada loja ficam na sua partição
+    loja_principal = Loja(LOJA_PRINCIPAL, DATA_DIR, deposito, SYNC_LIMITE_LAPIDES, BACKUP_RETENCAO,
+                          instancia=INSTANCIA)
+    particoes = ParticoesLojas(
+        LOJAS_DIR, abrir_loja, loja_principal, limite_abertas=LOJAS_ABERTAS,
+        ociosidade_segundos=LOJAS_OCIOSIDADE_MINUTOS * 60 if LOJAS_OCIOSIDADE_MINUTOS > 0 else None
+    )
+    consolidacao = ConsolidacaoLojas(particoes, ARMAZENAMENTO, OPCOES_DEPOSITO, processos=LOJAS_PROCESSOS,
+                                     minimo_processos=LOJAS_MINIMO_PROCESSOS)
+
+    # Quantidade de registros (da loja principal) e de lojas em memória,
+    # calculadas só quando /api/metrics é consultado
+    registros_colecao = metricas.medidor('colecao_registros', 'Registros em cada coleção', ('colecao',))
+    registros_colecao.definir(deposito.contas.contagem, 'contas')
+    registros_colecao.definir(deposito.entradas.contagem, 'entradas')
+    metricas.medidor('lojas_abertas', 'Lojas com dados em memória').definir(lambda: len(particoes.abertas()))
+
+LIMITE_PAGINA_PADRAO = 50
+LIMITE_PAGINA_MAXIMO = 1000
+
+# Corpos JSON de POST maiores que isso são lidos do fluxo em blocos, sem
+# guardar o corpo inteiro (bytes e texto) antes de decodificar
+LIMITE_CORPO_EM_BLOCOS = int(os.environ.get('LIMITE_CORPO_EM_BLOCOS', 1024 * 1024))
+
+cache_compressao = CacheCompressao()
+
+def resposta_json(corpo):
+    """Resposta HTTP com corpo JSON já serializado"""
+    return Response(corpo, mimetype='application/json')
+
+def etag_dados(*partes):
+    """ETag derivado da loja, das versões dos dados e dos parâmetros da requisição"""
+    loja = g.get('loja')
+    texto = '|'.join(str(parte) for parte in (loja.instancia if loja else INSTANCIA,) + partes)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:20]
+
+def resposta_em_partes(partes, etag):
+    """Resposta JSON enviada parte a parte, sem juntar as partes em um único corpo
+
+    Comprimida como as demais: até TAMANHO_MAXIMO_CACHE o corpo comprimido
+    fica no cache pelo ETag; acima disso é comprimido enquanto é enviado
+    """
+    tamanho = sum(len(parte) for parte in partes)
+    codificacao = escolher_codificacao(request.headers.get('Accept-Encoding'))
+    if codificacao is not None and tamanho >= TAMANHO_MINIMO:
+        if tamanho > TAMANHO_MAXIMO_CACHE:
+            corpo = comprimir_em_fluxo(partes, codificacao)
         else:
-            # Criar arquivo com dados padrão
-            salvar_dados_arquivo(arquivo, dados_padrao or [])
-            return dados_padrao or []
-    except Exception as e:
-        print(f"Erro ao carregar {arquivo}: {e}")
-        return dados_padrao or []
+            corpo = cache_compressao.obter(etag, codificacao, partes)
+        resposta = Response(corpo, mimetype='application/json')
+        resposta.headers['Content-Encoding'] = codificacao
+    else:
+        resposta = Response(iter(partes), mimetype='application/json')
+        resposta.headers['Content-Length'] = str(tamanho)
+    resposta.vary.add('Accept-Encoding')
+    return resposta
 
-def salvar_dados_arquivo(arquivo, dados):
-    """Salva dados em um arquivo JSON"""
-    try:
-        with open(arquivo, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"Erro ao salvar {arquivo}: {e}")
-        return False
+def corpo_json():
+    """Corpo JSON da requisição; corpos grandes são decodificados enquanto chegam
+
+    None se o corpo estiver ausente, não for JSON ou for inválido (como
+    request.get_json(silent=True)): as rotas respondem 400
+    """
+    tamanho = request.content_length
+    inicio = time.perf_counter()
+    if request.is_json and (tamanho is None or tamanho > LIMITE_CORPO_EM_BLOCOS):
+        try:
+            dados = carregar_json_em_blocos(request.stream)
+        except (ValueError, UnicodeDecodeError):
+            dados = None
+    else:
+        dados = request.get_json(silent=True)
+    duracao_decodificacao.observar(time.perf_counter() - inicio, 'requisicao')
+    return dados
+
+def validar_partes(deposito, partes):
+    """Confere o formato de cada parte (contas, entradas, config) antes de gravar qualquer uma
+
+    Levanta ValueError: nada é gravado se uma das partes for inválida
+    """
+    for nome, dados in partes.items():
+        try:
+            getattr(deposito, nome).validar_dados(dados)
+        except ValueError as e:
+            raise ValueError(f'{nome}: {e}') from e
+
+def resposta_condicional(etag, gerar):
+    """Responde 304 se o cliente já tem esta versão; senão gera a resposta com ETag"""
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = gerar()
+        if isinstance(resposta, tuple):
+            # Respostas de erro seguem sem ETag
+            return resposta
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    # A mesma URL responde por outra loja com outro X-Loja
+    resposta.vary.add('X-Loja')
+    return resposta
+
+@app.after_request
+def comprimir_resposta(resposta):
+    """Comprime respostas JSON da API conforme o Accept-Encoding do cliente"""
+    if (not request.path.startswith('/api/') or resposta.status_code != 200
+            or resposta.direct_passthrough or resposta.is_streamed
+            or 'Content-Encoding' in resposta.headers
+            or resposta.mimetype != 'application/json'):
+        return resposta
+
+    resposta.vary.add('Accept-Encoding')
+    codificacao = escolher_codificacao(request.headers.get('Accept-Encoding'))
+    corpo = resposta.get_data()
+    if codificacao is None or len(corpo) < TAMANHO_MINIMO:
+        return resposta
+
+    etag, _ = resposta.get_etag()
+    resposta.set_data(cache_compressao.obter(etag, codificacao, corpo))
+    resposta.headers['Content-Encoding'] = codificacao
+    return resposta
 
-def criar_backup():
-    """Cria um backup dos dados com timestamp"""
+def criar_backup(loja=None):
+    """Cria um backup dos dados de uma loja (padrão: a principal) e retorna o caminho do manifesto"""
+    loja = loja or loja_principal
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_dir = os.path.join(DATA_DIR, f"backup_{timestamp}")
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        # Copiar arquivos de dados
-        if os.path.exists(CONTAS_FILE):
-            with open(CONTAS_FILE, 'r', encoding='utf-8') as src:
-                with open(os.path.join(backup_dir, "contas.json"), 'w', encoding='utf-8') as dst:
-                    dst.write(src.read())
-        
-        if os.path.exists(ENTRADAS_FILE):
-            with open(ENTRADAS_FILE, 'r', encoding='utf-8') as src:
-                with open(os.path.join(backup_dir, "entradas.json"), 'w', encoding='utf-8') as dst:
-                    dst.write(src.read())
-        
-        return backup_dir
+        manifesto = loja.repositorio_backup.criar(loja.dados_para_backup())
+        return os.path.join(loja.repositorio_backup.dir_manifestos, manifesto['id'] + '.json')
     except Exception as e:
         print(f"Erro ao criar backup: {e}")
         return None
 
+# Uma fila de backups para todas as lojas; o periódico copia a principal
+if not PROCESSO_AUXILIAR:
+    trabalhador_backup = TrabalhadorBackup(loja_principal.repositorio_backup, loja_principal.dados_para_backup)
+
+@app.before_request
+def escolher_loja():
+    """Loja da requisição pelo cabeçalho X-Loja ou por ?loja= (padrão: a principal)"""
+    if not request.path.startswith('/api/'):
+        return None
+    try:
+        g.id_loja = normalizar_loja(request.headers.get('X-Loja') or request.args.get('loja') or LOJA_PRINCIPAL)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not particoes.existe(g.id_loja):
+        return jsonify({'error': f'Loja não encontrada: {g.id_loja}'}), 404
+    return None
+
+def loja_atual():
+    """Partição da loja da requisição, aberta (se preciso) no primeiro uso"""
+    if 'loja' not in g:
+        g.loja = particoes.emprestar(g.get('id_loja', LOJA_PRINCIPAL))
+    return g.loja
+
+@app.teardown_request
+def devolver_loja(erro=None):
+    """Libera a loja para ser descarregada quando a requisição termina"""
+    loja = g.pop('loja', None)
+    if loja is not None:
+        particoes.devolver(loja)
+
 # Rotas da API (devem vir antes das rotas estáticas)
 @app.route('/api/health')
 def health_check():
@@ -82,18 +291,23 @@ def health_check():
         'status': 'OK',
         'timestamp': datetime.now().isoformat(),
         'version': '2.0.0',
-        'persistence': 'JSON Files',
+        'persistence': PERSISTENCIA,
         'data_directory': DATA_DIR
     })
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Métricas do servidor no formato texto do Prometheus"""
+    return Response(metricas.exportar(), content_type=TIPO_CONTEUDO)
+
 @app.route('/api/config')
 def get_config():
     """Configuração do sistema"""
-    return jsonify({
+    return resposta_condicional(etag_dados('config-sistema'), lambda: jsonify({
         'appName': 'Controle Financeiro Comercial',
         'version': '2.0.0',
         'environment': 'development',
-        'persistence': 'JSON Files',
+        'persistence': PERSISTENCIA,
         'data_directory': DATA_DIR,
         'features': {
             'api': True,
@@ -102,23 +316,68 @@ def get_config():
             'backup': True,
             'localStorage': 'disabled'
         }
-    })
+    }))
+
+def consultar_colecao(colecao, indice):
+    """Consulta paginada a partir dos parâmetros da URL
+
+    Filtros pelos campos indexados (status, empresa, tipoEntrada), intervalo
+    de=AAAA-MM-DD / ate=AAAA-MM-DD ou mes=AAAA-MM, ordem=asc|desc,
+    limite=N e cursor=<proximoCursor da página anterior>
+    """
+    args = request.args
+    filtros = {campo: args[campo] for campo in indice.campos_hash if campo in args}
+    de, ate = args.get('de'), args.get('ate')
+    if args.get('mes'):
+        de, ate = f"{args['mes']}-01", f"{args['mes']}-31"
+
+    try:
+        limite = int(args.get('limite', LIMITE_PAGINA_PADRAO))
+    except ValueError:
+        return jsonify({'error': 'Parâmetro limite inválido'}), 400
+    limite = max(1, min(limite, LIMITE_PAGINA_MAXIMO))
+
+    ordem = args.get('ordem')
+    if ordem not in (None, 'asc', 'desc'):
+        return jsonify({'error': 'Parâmetro ordem deve ser asc ou desc'}), 400
+
+    colecao.verificar()
+    try:
+        pagina = indice.consultar(filtros, de, ate, ordem, limite, args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(pagina)
+
+def ler_colecao(colecao, indice, nome):
+    """GET de uma coleção inteira ou consulta filtrada, com ETag pela versão dos dados"""
+    consulta = request.query_string.decode('utf-8')
+    # ?loja= só escolhe a loja (o ETag já leva a instância dela)
+    if any(parametro != 'loja' for parametro in request.args):
+        colecao.verificar()
+        etag = etag_dados(nome, colecao.versao_consultas(), consulta)
+        return resposta_condicional(etag, lambda: consultar_colecao(colecao, indice))
+    # A lista inteira sai da resposta já serializada, sem montar os registros
+    etag = etag_dados(nome, colecao.versao_atual(), consulta)
+    return resposta_condicional(etag, lambda: resposta_json(colecao.obter_bytes()))
 
 @app.route('/api/contas', methods=['GET'])
 def get_contas():
-    """Obter todas as contas"""
+    """Obter todas as contas ou, com parâmetros, uma página filtrada"""
     try:
-        contas = carregar_dados_arquivo(CONTAS_FILE, [])
-        return jsonify(contas)
+        return ler_colecao(loja_atual().deposito.contas, loja_atual().indice_contas, 'contas')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/contas', methods=['POST'])
 def save_contas():
-    """Salvar contas"""
+    """Salvar contas (lista completa) ou criar uma conta (objeto)"""
     try:
-        contas = request.json
-        if salvar_dados_arquivo(CONTAS_FILE, contas):
+        contas = corpo_json()
+        if contas is None:
+            return jsonify({'error': 'Corpo da requisição deve ser JSON'}), 400
+        if isinstance(contas, dict):
+            return criar_registro(loja_atual().deposito.contas, contas, 'Conta')
+        if loja_atual().deposito.contas.salvar(contas):
             return jsonify({
                 'success': True, 
                 'message': 'Contas salvas com sucesso',
@@ -126,24 +385,29 @@ def save_contas():
             })
         else:
             return jsonify({'error': 'Falha ao salvar contas'}), 500
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/entradas', methods=['GET'])
 def get_entradas():
-    """Obter todas as entradas"""
+    """Obter todas as entradas ou, com parâmetros, uma página filtrada"""
     try:
-        entradas = carregar_dados_arquivo(ENTRADAS_FILE, [])
-        return jsonify(entradas)
+        return ler_colecao(loja_atual().deposito.entradas, loja_atual().indice_entradas, 'entradas')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/entradas', methods=['POST'])
 def save_entradas():
-    """Salvar entradas"""
+    """Salvar entradas (lista completa) ou criar uma entrada (objeto)"""
     try:
-        entradas = request.json
-        if salvar_dados_arquivo(ENTRADAS_FILE, entradas):
+        entradas = corpo_json()
+        if entradas is None:
+            return jsonify({'error': 'Corpo da requisição deve ser JSON'}), 400
+        if isinstance(entradas, dict):
+            return criar_registro(loja_atual().deposito.entradas, entradas, 'Entrada')
+        if loja_atual().deposito.entradas.salvar(entradas):
             return jsonify({
                 'success': True, 
                 'message': 'Entradas salvas com sucesso',
@@ -151,6 +415,118 @@ def save_entradas():
             })
         else:
             return jsonify({'error': 'Falha ao salvar entradas'}), 500
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/entradas/import', methods=['POST'])
+def import_entradas():
+    """Importar um extrato de maquininha (CSV ou NDJSON) em uma única gravação
+
+    O formato vem de ?formato=csv|ndjson, do Content-Type ou da primeira
+    linha; o valor líquido é calculado pela tabela de taxas e transações
+    já importadas (mesmo id) são ignoradas
+    """
+    try:
+        formato = request.args.get('formato') or formato_do_tipo(request.content_type)
+        if formato not in (None, 'csv', 'ndjson'):
+            return jsonify({'error': 'Formato deve ser csv ou ndjson'}), 400
+
+        importacao = ImportacaoEntradas()
+        try:
+            entradas = importacao.ler(request.stream, formato)
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({'error': f'Arquivo inválido: {e}'}), 400
+
+        inseridas = loja_atual().deposito.entradas.inserir_lote(entradas)
+        return jsonify({
+            'success': True,
+            'linhas': importacao.linhas,
+            'importadas': len(inseridas),
+            'duplicadas': len(entradas) - len(inseridas),
+            'rejeitadas': importacao.total_rejeitados,
+            'erros': importacao.rejeitados
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Operações por registro: só o registro alterado trafega e é gravado
+def criar_registro(colecao, dados, nome):
+    """Cria um registro na coleção e responde com ele"""
+    registro = colecao.inserir(dados)
+    if registro is None:
+        return jsonify({'error': f'{nome} com id {dados.get("id")} já existe'}), 409
+    return jsonify(registro), 201
+
+def obter_registro(colecao, id_registro, nome):
+    """Responde com um registro ou 404"""
+    registro = colecao.obter_registro(id_registro)
+    if registro is None:
+        return jsonify({'error': f'{nome} não encontrada'}), 404
+    return resposta_condicional(etag_dados(nome, colecao.versao, id_registro), lambda: jsonify(registro))
+
+def atualizar_registro(colecao, id_registro, nome):
+    """Aplica os campos do corpo da requisição a um registro"""
+    campos = request.get_json(silent=True)
+    if not isinstance(campos, dict):
+        return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
+    registro = colecao.atualizar(id_registro, campos)
+    if registro is None:
+        return jsonify({'error': f'{nome} não encontrada'}), 404
+    return jsonify(registro)
+
+def excluir_registro(colecao, id_registro, nome):
+    """Exclui um registro pelo id"""
+    if not colecao.remover(id_registro):
+        return jsonify({'error': f'{nome} não encontrada'}), 404
+    return jsonify({'success': True, 'message': f'{nome} excluída com sucesso', 'id': id_registro})
+
+@app.route('/api/contas/<id_registro>', methods=['GET'])
+def get_conta(id_registro):
+    """Obter uma conta"""
+    try:
+        return obter_registro(loja_atual().deposito.contas, id_registro, 'Conta')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/contas/<id_registro>', methods=['PATCH'])
+def update_conta(id_registro):
+    """Atualizar campos de uma conta"""
+    try:
+        return atualizar_registro(loja_atual().deposito.contas, id_registro, 'Conta')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/contas/<id_registro>', methods=['DELETE'])
+def delete_conta(id_registro):
+    """Excluir uma conta"""
+    try:
+        return excluir_registro(loja_atual().deposito.contas, id_registro, 'Conta')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/entradas/<id_registro>', methods=['GET'])
+def get_entrada(id_registro):
+    """Obter uma entrada"""
+    try:
+        return obter_registro(loja_atual().deposito.entradas, id_registro, 'Entrada')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/entradas/<id_registro>', methods=['PATCH'])
+def update_entrada(id_registro):
+    """Atualizar campos de uma entrada"""
+    try:
+        return atualizar_registro(loja_atual().deposito.entradas, id_registro, 'Entrada')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/entradas/<id_registro>', methods=['DELETE'])
+def delete_entrada(id_registro):
+    """Excluir uma entrada"""
+    try:
+        return excluir_registro(loja_atual().deposito.entradas, id_registro, 'Entrada')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -158,17 +534,11 @@ def save_entradas():
 def get_all_data():
     """Obter todos os dados"""
     try:
-        contas = carregar_dados_arquivo(CONTAS_FILE, [])
-        entradas = carregar_dados_arquivo(ENTRADAS_FILE, [])
-        config = carregar_dados_arquivo(CONFIG_FILE, {})
-        
-        return jsonify({
-            'contas': contas,
-            'entradas': entradas,
-            'config': config,
-            'ultimaAtualizacao': datetime.now().isoformat(),
-            'fonte': 'JSON Files'
-        })
+        loja = loja_atual()
+        etag = etag_dados('dados', *loja.deposito.versoes())
+        return resposta_condicional(etag, lambda: resposta_em_partes(loja.deposito.dados_completos_partes(
+            loja.deposito.ultima_alteracao(), PERSISTENCIA
+        ), etag))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -176,12 +546,20 @@ def get_all_data():
 def save_all_data():
     """Salvar todos os dados"""
     try:
-        dados = request.json
-        
+        dados = corpo_json()
+        if not isinstance(dados, dict):
+            return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
+
+        deposito = loja_atual().deposito
+        partes = {
+            'contas': dados.get('contas', []),
+            'entradas': dados.get('entradas', []),
+            'config': dados.get('config', {}),
+        }
+        validar_partes(deposito, partes)
         success = True
-        success &= salvar_dados_arquivo(CONTAS_FILE, dados.get('contas', []))
-        success &= salvar_dados_arquivo(ENTRADAS_FILE, dados.get('entradas', []))
-        success &= salvar_dados_arquivo(CONFIG_FILE, dados.get('config', {}))
+        for nome, parte in partes.items():
+            success &= getattr(deposito, nome).salvar(parte)
         
         if success:
             return jsonify({
@@ -190,72 +568,366 @@ def save_all_data():
             })
         else:
             return jsonify({'error': 'Falha ao salvar dados'}), 500
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sync', methods=['GET'])
+def sync():
+    """Alterações de contas e entradas desde uma revisão
+
+    since=<revisao> e instancia=<instancia> da última resposta (since=0 ou
+    ausente devolve tudo); espera=<segundos> (até 25) segura a resposta até
+    haver alguma alteração
+    """
+    try:
+        try:
+            desde = int(request.args.get('since', 0))
+            espera = min(float(request.args.get('espera', 0)), SYNC_ESPERA_MAXIMA)
+        except ValueError:
+            return jsonify({'error': 'Parâmetros since/espera inválidos'}), 400
+        loja = loja_atual()
+        if request.args.get('instancia', loja.instancia) != loja.instancia:
+            # Outra execução do servidor (ou a loja foi reaberta): as revisões recomeçaram do zero
+            desde = 0
+
+        loja.deposito.contas.verificar()
+        loja.deposito.entradas.verificar()
+        if espera > 0 and desde == loja.revisoes.atual:
+            loja.revisoes.aguardar(desde, espera)
+
+        resposta = loja.revisoes.alteracoes_desde(desde)
+        resposta['instancia'] = loja.instancia
+        return jsonify(resposta)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    """Obter estatísticas do sistema"""
+    """Obter estatísticas do sistema a partir dos agregados materializados
+
+    Parâmetros opcionais: mes=AAAA-MM (padrão: mês atual),
+    hoje=AAAA-MM-DD (referência para contas vencidas) e lojas=todas ou
+    lojas=<id>,<id> para somar várias lojas em vez da loja da requisição
+    """
     try:
-        contas = carregar_dados_arquivo(CONTAS_FILE, [])
-        entradas = carregar_dados_arquivo(ENTRADAS_FILE, [])
+        hoje = request.args.get('hoje') or datetime.now().date().isoformat()
+        mes = request.args.get('mes') or hoje[:7]
+        if request.args.get('lojas'):
+            return stats_consolidadas(request.args['lojas'], mes, hoje)
         
-        # Estatísticas de contas
-        total_contas = len(contas)
-        contas_pagar = len([c for c in contas if c.get('status') == 'à pagar'])
-        contas_pagas = len([c for c in contas if c.get('status') == 'pago'])
-        
-        # Estatísticas de entradas
-        total_entradas = len(entradas)
-        
-        return jsonify([
+        loja = loja_atual()
+        loja.deposito.contas.verificar()
+        loja.deposito.entradas.verificar()
+        etag = etag_dados('stats', loja.deposito.contas.versao, loja.deposito.entradas.versao, mes, hoje)
+        return resposta_condicional(etag, lambda: jsonify(
+            montar_stats(loja.agregados_contas, loja.agregados_entradas, mes, hoje)
+        ))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros mes/hoje inválidos'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def montar_stats(agregados_contas, agregados_entradas, mes, hoje):
+    """Corpo de /api/stats a partir dos agregados"""
+    contas = agregados_contas.resumo(mes, hoje)
+    entradas = agregados_entradas.resumo(mes, hoje)
+    
+    return {
+        'mes': mes,
+        'hoje': hoje,
+        'contas': contas,
+        'entradas': entradas,
+        # Mesmo critério do dashboard: entradas do mês - contas pagas do mês
+        'saldoMes': round(entradas['valorMes'] - contas['mes']['valorPago'], 2),
+        'tabelas': [
             {
                 'tabela': 'contas',
-                'total': total_contas,
-                'pagas': contas_pagas,
-                'a_pagar': contas_pagar
+                'total': contas['total'],
+                'pagas': contas['pagas'],
+                'a_pagar': contas['aPagar']
             },
             {
                 'tabela': 'entradas',
-                'total': total_entradas,
+                'total': entradas['total'],
                 'pagas': 0,
                 'a_pagar': 0
             }
-        ])
+        ]
+    }
+
+def stats_consolidadas(lojas, mes, hoje):
+    """/api/stats somando os totais parciais de várias lojas
+
+    As lojas em memória entram com os próprios agregados e as demais são
+    lidas em paralelo (ConsolidacaoLojas); uma loja que falhar fica de fora
+    e aparece em erros
+    """
+    try:
+        if lojas == 'todas':
+            ids = particoes.ids()
+        else:
+            ids = list(dict.fromkeys(normalizar_loja(id_loja) for id_loja in lojas.split(',')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    desconhecidas = [id_loja for id_loja in ids if not particoes.existe(id_loja)]
+    if desconhecidas:
+        return jsonify({'error': f"Lojas não encontradas: {', '.join(desconhecidas)}"}), 404
+
+    contas, entradas = AgregadosContas(), AgregadosEntradas()
+    por_loja, erros = {}, {}
+    for id_loja, resultado in consolidacao.parciais(ids).items():
+        if isinstance(resultado, Exception):
+            erros[id_loja] = str(resultado)
+            continue
+        contas.mesclar(resultado[0])
+        entradas.mesclar(resultado[1])
+
+        contas_loja, entradas_loja = AgregadosContas(), AgregadosEntradas()
+        contas_loja.mesclar(resultado[0])
+        entradas_loja.mesclar(resultado[1])
+        stats_loja = montar_stats(contas_loja, entradas_loja, mes, hoje)
+        por_loja[id_loja] = {
+            'contas': stats_loja['contas']['total'],
+            'aPagar': stats_loja['contas']['aPagar'],
+            'valorAPagar': stats_loja['contas']['valorAPagar'],
+            'entradas': stats_loja['entradas']['total'],
+            'valorEntradasMes': stats_loja['entradas']['valorMes'],
+            'saldoMes': stats_loja['saldoMes'],
+        }
+
+    corpo = montar_stats(contas, entradas, mes, hoje)
+    corpo.update({'lojas': list(por_loja), 'porLoja': por_loja, 'erros': erros})
+    return jsonify(corpo)
+
+@app.route('/api/lojas', methods=['GET'])
+def list_lojas():
+    """Listar as lojas e quais estão com os dados em memória"""
+    try:
+        abertas = set(particoes.abertas())
+        return jsonify({
+            'lojas': [{'id': id_loja, 'aberta': id_loja in abertas} for id_loja in particoes.ids()],
+            'principal': LOJA_PRINCIPAL,
+            'limiteAbertas': particoes.limite_abertas
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/lojas', methods=['POST'])
+def create_loja():
+    """Criar uma loja (corpo {"id": "..."}) com dados vazios"""
+    try:
+        dados = corpo_json()
+        try:
+            id_loja = normalizar_loja(dados.get('id') if isinstance(dados, dict) else None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not particoes.criar(id_loja):
+            return jsonify({'error': f'Loja já existe: {id_loja}'}), 409
+        return jsonify({'success': True, 'id': id_loja}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/backup', methods=['POST'])
 def create_backup():
-    """Criar backup dos dados"""
+    """Agendar um backup dos dados (executado em segundo plano)"""
     try:
-        backup_dir = criar_backup()
-        if backup_dir:
-            return jsonify({
-                'success': True,
-                'message': 'Backup criado com sucesso',
-                'backupPath': backup_dir
-            })
+        loja = loja_atual()
+        id_tarefa = trabalhador_backup.agendar(loja.repositorio_backup, loja.dados_para_backup)
+        return jsonify({
+            'success': True,
+            'message': 'Backup agendado',
+            'tarefa': id_tarefa,
+            'statusUrl': f'/api/backup/tarefas/{id_tarefa}'
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/backup', methods=['GET'])
+def list_backups():
+    """Listar backups com tamanho e duração"""
+    try:
+        repositorio = loja_atual().repositorio_backup
+        backups = [resumo_manifesto(m) for m in repositorio.listar()]
+        return jsonify({
+            'backups': backups,
+            'retencao': repositorio.retencao,
+            'tamanhoTotalGravado': sum(b['tamanhoGravado'] for b in backups)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/backup/tarefas/<id_tarefa>', methods=['GET'])
+def get_backup_task(id_tarefa):
+    """Situação de um backup agendado"""
+    tarefa = trabalhador_backup.tarefas.get(id_tarefa)
+    if tarefa is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    return jsonify(tarefa)
+
+@app.route('/api/backup/<id_backup>/restaurar', methods=['POST'])
+def restore_backup(id_backup):
+    """Restaurar os dados a partir de um backup"""
+    try:
+        deposito = loja_atual().deposito
+        arquivos = loja_atual().repositorio_backup.carregar(id_backup)
+    except FileNotFoundError:
+        return jsonify({'error': 'Backup não encontrado'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    partes = {
+        'contas': arquivos.get('contas.json', []),
+        'entradas': arquivos.get('entradas.json', []),
+        'config': arquivos.get('config.json', {}),
+    }
+    try:
+        validar_partes(deposito, partes)
+    except ValueError as e:
+        return jsonify({'error': f'Backup inválido: {e}'}), 400
+
+    success = True
+    for nome, parte in partes.items():
+        success &= getattr(deposito, nome).salvar(parte)
+    if not success:
+        return jsonify({'error': 'Falha ao restaurar backup'}), 500
+    return jsonify({
+        'success': True,
+        'message': 'Backup restaurado com sucesso',
+        'backupId': id_backup
+    })
+
+@app.route('/api/precificar/lote', methods=['POST'])
+def precificar_em_lote():
+    """Precificar várias peças de uma vez
+
+    Aceita {"itens": [{"tipo", "peso", "preco", "media_perdas"?, "media_lucro"?}, ...]}
+    ou o formato colunar {"tipo", "peso": [...], "preco": [...], "media_perdas"?, "media_lucro"?}
+    """
+    try:
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, dict):
+            return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
+
+        if 'itens' in dados:
+            if not isinstance(dados['itens'], list):
+                return jsonify({'error': 'itens deve ser uma lista'}), 400
+            return jsonify({'resultados': precificar_itens(dados['itens'])})
+
+        if 'peso' not in dados or 'preco' not in dados:
+            return jsonify({'error': 'Informe peso e preco'}), 400
+        lote = precificar_lote(
+            dados.get('tipo'), dados['peso'], dados['preco'],
+            dados.get('media_perdas', MEDIA_PERDAS_PADRAO),
+            dados.get('media_lucro', MEDIA_LUCRO_PADRAO)
+        )
+        resultado = resultado_para_dict(lote)
+        resultado['tipo'] = catalogo.primal(dados.get('tipo')).nome
+        resultado['quantidade'] = len(lote)
+        return jsonify(resultado)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/precificar/grade', methods=['POST'])
+def precificar_grade():
+    """Simular preços e lucro de uma peça em toda a grade preço x perdas x lucro
+
+    Aceita {"tipo", "peso", "preco", "media_perdas"?, "media_lucro"?, "cortes"?, "lucro_alvo"?};
+    cada eixo é um número, uma lista ou {"de", "ate", "passo"}. Com lucro_alvo,
+    inclui a menor margem que alcança esse lucro em cada preço x perdas
+    """
+    try:
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, dict):
+            return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
+        if 'peso' not in dados or 'preco' not in dados:
+            return jsonify({'error': 'Informe peso e preco'}), 400
+
+        tipo = dados.get('tipo')
+        perdas = dados.get('media_perdas', MEDIA_PERDAS_PADRAO)
+        grade = simular_grade(tipo, dados['peso'], dados['preco'], perdas,
+                              dados.get('media_lucro', MEDIA_LUCRO_PADRAO))
+        minimo = None
+        if dados.get('lucro_alvo') is not None:
+            minimo = lucro_minimo(tipo, dados['peso'], dados['preco'], perdas, dados['lucro_alvo'])
+        return resposta_json(serializar_json(simulacao_para_dict(tipo, grade, dados.get('cortes'), minimo)))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/precificar', methods=['GET', 'POST'])
+def precificar_peca():
+    """Precificar uma peça (tipo, peso, preco, media_perdas?, media_lucro?)
+
+    GET com parâmetros na URL ou POST com objeto JSON; combinações repetidas
+    vêm do cache em memória
+    """
+    try:
+        if request.method == 'POST':
+            parametros = request.get_json(silent=True)
+            if not isinstance(parametros, dict):
+                return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
         else:
-            return jsonify({'error': 'Falha ao criar backup'}), 500
+            parametros = request.args.to_dict()
+        return jsonify(precificar_parametros(parametros))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Rota para abrir calculadora
+@app.route('/api/precificar/tipos', methods=['GET'])
+def tipos_precificacao():
+    """Primais disponíveis no catálogo de cortes"""
+    return jsonify({'tipos': catalogo.tipos()})
+
+# Rota antiga da calculadora: mesma resposta de GET /api/precificar
 @app.route('/calcular')
 def calcular():
-    """Abre a calculadora desktop"""
-    try:
-        subprocess.Popen(["python", "Calcdesossa.py"])
-        return "Calculadora aberta com sucesso!"
-    except Exception as e:
-        return f"Erro ao abrir calculadora: {str(e)}", 500
+    """Calculadora de precificação (sem abrir janela no servidor)"""
+    return precificar_peca()
+
+# Arquivos da interface lidos e comprimidos uma vez, servidos da memória;
+# static/ é verificado no disco no máximo a cada ATIVOS_INTERVALO_SEGUNDOS
+# (0: a cada carregamento da página; negativo: só na inicialização)
+ATIVOS_INTERVALO_SEGUNDOS = float(os.environ.get('ATIVOS_INTERVALO_SEGUNDOS', INTERVALO_VERIFICACAO))
+if not PROCESSO_AUXILIAR:
+    ativos_estaticos = AtivosEstaticos(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'),
+        intervalo=ATIVOS_INTERVALO_SEGUNDOS if ATIVOS_INTERVALO_SEGUNDOS >= 0 else None)
+
+def servir_ativo(caminho):
+    """Arquivo estático da memória, já comprimido, com ETag e Cache-Control"""
+    encontrado = ativos_estaticos.obter(caminho)
+    if encontrado is None:
+        print(f"Arquivo não encontrado: static/{caminho}")
+        return "Arquivo não encontrado", 404
+    ativo, cache = encontrado
+
+    if request.if_none_match.contains(ativo.etag):
+        resposta = Response(status=304)
+    else:
+        codificacao = escolher_codificacao(request.headers.get('Accept-Encoding'))
+        corpo = ativo.comprimidos.get(codificacao)
+        if corpo is None:
+            resposta = Response(ativo.conteudo, mimetype=ativo.tipo)
+        else:
+            resposta = Response(corpo, mimetype=ativo.tipo)
+            resposta.headers['Content-Encoding'] = codificacao
+    if ativo.comprimidos:
+        resposta.vary.add('Accept-Encoding')
+    resposta.set_etag(ativo.etag)
+    resposta.headers['Cache-Control'] = cache
+    return resposta
 
 # Rotas estáticas (devem vir depois das rotas da API)
 @app.route('/')
 def index():
     """Serve a página principal"""
-    return send_from_directory('static', 'index.html')
+    return servir_ativo(PAGINA_PRINCIPAL)
 
 @app.route('/<path:path>')
 def static_files(path):
@@ -263,18 +935,10 @@ def static_files(path):
     # Ignorar rotas da API e calculadora
     if path.startswith('api/') or path == 'calcular':
         return "Endpoint not found", 404
-    
-    # Log para debug
-    print(f"Requisitando arquivo estático: {path}")
-    
-    # Tentar servir da pasta static
-    static_path = os.path.join('static', path)
-    if os.path.exists(static_path):
-        print(f"Servindo de: {static_path}")
-        return send_from_directory('static', path)
-    else:
-        print(f"Arquivo não encontrado: {static_path}")
-        return "Arquivo não encontrado", 404
+    return servir_ativo(path)
+
+# Duração, status e erros de todas as rotas acima
+instrumentar_rotas(app)
 
 def print_banner():
     """Exibe banner de inicialização"""
@@ -294,7 +958,8 @@ def print_banner():
 ║    - data/contas.json                                        ║
 ║    - data/entradas.json                                      ║
 ║    - data/config.json                                        ║
-║    - data/backup_YYYYMMDD_HHMMSS/ (backups)                 ║
+║    - data/backups/ (backups deduplicados)                   ║
+║    - data/lojas/<id>/ (outras lojas, mesmos arquivos)       ║
 ║                                                              ║
 ║    Pressione Ctrl+C para parar o servidor                   ║
 ║                                                              ║
@@ -306,13 +971,24 @@ if __name__ == '__main__':
     
     # Verificar se os arquivos de dados existem
     print("📋 Verificando arquivos de dados...")
-    contas = carregar_dados_arquivo(CONTAS_FILE, [])
-    entradas = carregar_dados_arquivo(ENTRADAS_FILE, [])
-    print(f"   ✅ Contas: {len(contas)} registros")
-    print(f"   ✅ Entradas: {len(entradas)} registros")
+    print(f"   ✅ Contas: {deposito.contas.contagem()} registros")
+    print(f"   ✅ Entradas: {deposito.entradas.contagem()} registros")
     print("   ✅ Sistema pronto para uso!")
     print()
     
+    # Índices, totais e revisões são montados enquanto o servidor já atende
+    threading.Thread(target=deposito.preparar, name="preparar-dados", daemon=True).start()
+    
+    if BACKUP_INTERVALO_MINUTOS > 0:
+        trabalhador_backup.agendar_periodico(BACKUP_INTERVALO_MINUTOS * 60)
+        print(f"   💾 Backup automático a cada {BACKUP_INTERVALO_MINUTOS} min")
+    
     webbrowser.open("http://localhost:5000")
     # Iniciar servidor
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    try:
+        app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+    finally:
+        # O próximo início abre o instantâneo em vez de reler JSON e diário
+        # (de cada loja aberta)
+        particoes.fechar()
+        consolidacao.encerrar()
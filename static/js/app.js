@@ -11,6 +11,20 @@ class FinanceiroApp {
         this.definirDataPadrao();
         this.mostrarSecao('dashboard');
         this.carregarConfiguracoes();
+        this.iniciarSincronizacao();
+    }
+
+    // Atualizar a tela quando contas/entradas forem alteradas em outra aba ou dispositivo
+    iniciarSincronizacao() {
+        storage.iniciarSincronizacao(async () => {
+            if (typeof contasManager !== 'undefined') {
+                await contasManager.carregarContas();
+            }
+            if (typeof entradasManager !== 'undefined') {
+                await entradasManager.carregarEntradas();
+            }
+            this.atualizarDadosSecao(this.secaoAtual);
+        });
     }
 
     setupEventListeners() {
@@ -0,0 +1,101 @@
+// Calculadora de precificação de desossas (calculada pelo servidor)
+
+class CalculadoraManager {
+    constructor() {
+        this.init();
+    }
+
+    async init() {
+        this.setupEventListeners();
+        await this.carregarTipos();
+    }
+
+    setupEventListeners() {
+        const form = document.getElementById('calculadoraForm');
+        if (form) {
+            form.addEventListener('submit', (e) => {
+                e.preventDefault();
+                this.calcular();
+            });
+        }
+    }
+
+    // Atualiza a lista de peças com os primais do catálogo do servidor
+    async carregarTipos() {
+        const select = document.getElementById('calcTipo');
+        const tipos = await storage.obterTiposPeca();
+        if (!select || !tipos || tipos.length === 0) {
+            return;
+        }
+        const selecionado = select.value;
+        select.innerHTML = tipos.map(tipo => `<option value="${tipo}">${tipo}</option>`).join('');
+        if (tipos.includes(selecionado)) {
+            select.value = selecionado;
+        }
+    }
+
+    async calcular() {
+        const parametros = {
+            tipo: document.getElementById('calcTipo').value,
+            peso: parseFloat(document.getElementById('calcPeso').value),
+            preco: parseFloat(document.getElementById('calcPreco').value),
+            media_perdas: parseFloat(document.getElementById('calcPerdas').value),
+            media_lucro: parseFloat(document.getElementById('calcLucro').value)
+        };
+
+        if (isNaN(parametros.peso) || isNaN(parametros.preco)) {
+            this.notificar('Por favor, insira valores válidos.', 'error');
+            return;
+        }
+
+        const resultado = await storage.precificar(parametros);
+        if (!resultado) {
+            this.notificar('Erro ao calcular preços', 'error');
+            return;
+        }
+        this.renderizarResultado(resultado);
+    }
+
+    renderizarResultado(resultado) {
+        const container = document.getElementById('calculadoraResultado');
+        if (!container) return;
+
+        const linhas = (valores, nomes, sufixo, casas) => Object.entries(valores).map(([chave, valor]) => `
+            <div class="flex justify-between py-1">
+                <span>${nomes[chave] || chave}</span>
+                <span class="font-medium">${sufixo === 'R$' ? this.formatarMoeda(valor) : `${valor.toFixed(casas)} kg`}</span>
+            </div>
+        `).join('');
+
+        container.innerHTML = `
+            <div class="grid grid-cols-1 md:grid-cols-2 gap-4">
+                <div class="bg-gray-50 p-4 rounded">
+                    <h5 class="font-semibold mb-2">Preços para venda</h5>
+                    ${linhas(resultado.precos, resultado.nomes.precos, 'R$')}
+                    <div class="flex justify-between py-1 border-t mt-2 pt-2">
+                        <span>Lucro aproximado na peça</span>
+                        <span class="font-bold text-green-600">${this.formatarMoeda(resultado.lucro)}</span>
+                    </div>
+                </div>
+                <div class="bg-gray-50 p-4 rounded">
+                    <h5 class="font-semibold mb-2">Peso estimado por peça</h5>
+                    ${linhas(resultado.pesos, resultado.nomes.pesos, 'kg', 2)}
+                </div>
+            </div>
+        `;
+        container.classList.remove('hidden');
+    }
+
+    formatarMoeda(valor) {
+        return window.app ? window.app.formatarMoeda(valor) : `R$ ${valor.toFixed(2)}`;
+    }
+
+    notificar(mensagem, tipo) {
+        if (window.app) {
+            window.app.mostrarNotificacao(mensagem, tipo);
+        }
+    }
+}
+
+// Instância global
+const calculadoraManager = new CalculadoraManager();
@@ -136,38 +136,27 @@ class ContasManager {
         }
     }
 
-    renderizarContas() {
+    async renderizarContas() {
         const tbody = document.getElementById('contasTableBody');
         if (!tbody) return;
 
         const filtroStatus = document.getElementById('filtroStatus')?.value || 'todos';
         const filtroMes = document.getElementById('filtroMes')?.value;
 
-        let contasFiltradas = this.contas;
-
-        // Aplicar filtros
+        // Filtros e ordenação por vencimento são resolvidos pelos índices do servidor
+        const filtros = { ordem: 'asc' };
         if (filtroStatus !== 'todos') {
-            contasFiltradas = contasFiltradas.filter(c => c.status === filtroStatus);
+            filtros.status = filtroStatus;
         }
-
         if (filtroMes) {
-            const [ano, mes] = filtroMes.split('-');
-            contasFiltradas = contasFiltradas.filter(c => {
-                // Usar DateUtils para parsing seguro da data
-                if (!DateUtils.isValidDate(c.dataVencimento)) return false;
-                
-                const dataVenc = new Date(c.dataVencimento + 'T00:00:00');
-                return dataVenc.getFullYear() === parseInt(ano) && 
-                       (dataVenc.getMonth() + 1) === parseInt(mes);
-            });
+            filtros.mes = filtroMes;
         }
 
-        // Ordenar por data de vencimento - usando parsing seguro
-        contasFiltradas.sort((a, b) => {
-            const dataA = new Date(a.dataVencimento + 'T00:00:00');
-            const dataB = new Date(b.dataVencimento + 'T00:00:00');
-            return dataA - dataB;
-        });
+        let contasFiltradas = await storage.consultar('contas', filtros);
+        if (contasFiltradas === null) {
+            // Sem conexão: usar a lista já carregada, sem filtros
+            contasFiltradas = this.contas;
+        }
 
         tbody.innerHTML = '';
 
@@ -7,9 +7,9 @@ class DashboardManager {
     }
 
     init() {
+        this.estatisticas = null;
         this.setupEventListeners();
-        this.atualizarDados();
-        this.iniciarGraficos();
+        this.atualizarDados().then(() => this.iniciarGraficos());
     }
 
     setupEventListeners() {
@@ -35,41 +35,35 @@ class DashboardManager {
         }
     }
 
-    atualizarDados() {
+    async atualizarDados() {
+        await this.carregarEstatisticas();
         this.atualizarResumoFinanceiro();
         this.atualizarGraficos();
     }
 
+    // Totais já agregados pelo servidor (não percorre contas/entradas no navegador)
+    async carregarEstatisticas() {
+        const mesSelecionado = document.getElementById('dashboardMes')?.value;
+        const estatisticas = await storage.obterEstatisticasBD(mesSelecionado);
+        if (estatisticas) {
+            this.estatisticas = estatisticas;
+        }
+    }
+
     atualizarResumoFinanceiro() {
         const mesSelecionado = document.getElementById('dashboardMes')?.value;
-        if (!mesSelecionado) return;
+        if (!mesSelecionado || !this.estatisticas) return;
 
-        const [ano, mes] = mesSelecionado.split('-');
-        
-        // Obter dados filtrados pelo mês selecionado
-        const contasMes = contasManager.contas.filter(c => {
-            if (!DateUtils.isValidDate(c.dataVencimento)) return false;
-            
-            const dataVenc = new Date(c.dataVencimento + 'T00:00:00');
-            return dataVenc.getFullYear() === parseInt(ano) && 
-                   (dataVenc.getMonth() + 1) === parseInt(mes);
-        });
-
-        const entradasMes = entradasManager.entradas.filter(e => {
-            if (!DateUtils.isValidDate(e.dataEntrada)) return false;
-            
-            const dataEntrada = new Date(e.dataEntrada + 'T00:00:00');
-            return dataEntrada.getFullYear() === parseInt(ano) && 
-                   (dataEntrada.getMonth() + 1) === parseInt(mes);
-        });
+        const contasMes = this.estatisticas.contas.mes;
+        const entradasStats = this.estatisticas.entradas;
 
         // Calcular totais
-        const totalEntradas = entradasMes.reduce((sum, e) => sum + parseFloat(e.valorCalculado), 0);
-        const totalContasPagas = contasMes.filter(c => c.status === 'pago').reduce((sum, c) => sum + parseFloat(c.valor), 0);
-        const totalContasAPagar = contasMes.filter(c => c.status === 'à pagar').reduce((sum, c) => sum + parseFloat(c.valor), 0);
+        const totalEntradas = entradasStats.valorMes;
+        const totalContasPagas = contasMes.valorPago;
+        const totalContasAPagar = contasMes.valorAPagar;
         
         // Saldo do mês (entradas - contas pagas)
-        const saldoMes = totalEntradas - totalContasPagas;
+        const saldoMes = this.estatisticas.saldoMes;
 
         // Atualizar elementos
         const saldoElement = document.getElementById('saldoAtual');
@@ -86,7 +80,7 @@ class DashboardManager {
 
         const qtdEntradasElement = document.getElementById('qtdEntradas');
         if (qtdEntradasElement) {
-            qtdEntradasElement.textContent = `${entradasMes.length} entradas`;
+            qtdEntradasElement.textContent = `${entradasStats.totalMes} entradas`;
         }
 
         // Contas pagas do mês
@@ -97,8 +91,7 @@ class DashboardManager {
 
         const qtdContasPagasElement = document.getElementById('qtdContasPagas');
         if (qtdContasPagasElement) {
-            const contasPagas = contasMes.filter(c => c.status === 'pago');
-            qtdContasPagasElement.textContent = `${contasPagas.length} contas pagas`;
+            qtdContasPagasElement.textContent = `${contasMes.pagas} contas pagas`;
         }
 
         // Total contas à pagar
@@ -108,20 +101,9 @@ class DashboardManager {
         }
 
         // Contas vencidas
-        const dataAtual = new Date();
-        dataAtual.setHours(0, 0, 0, 0); // Zerar horas para comparação justa
-        
-        const contasVencidas = contasMes.filter(c => {
-            if (c.status === 'pago') return false;
-            if (!DateUtils.isValidDate(c.dataVencimento)) return false;
-            
-            const dataVenc = new Date(c.dataVencimento + 'T00:00:00');
-            return dataVenc < dataAtual;
-        });
-
         const contasVencidasElement = document.getElementById('contasVencidas');
         if (contasVencidasElement) {
-            contasVencidasElement.textContent = `${contasVencidas.length} contas vencidas`;
+            contasVencidasElement.textContent = `${contasMes.vencidas} contas vencidas`;
         }
     }
 
@@ -134,18 +116,17 @@ class DashboardManager {
         const ctx = document.getElementById('evolucaoChart');
         if (!ctx) return;
 
-        const entradasDados = entradasManager.obterDadosGraficos();
-        const contasResumo = contasManager.obterResumo();
+        if (!this.estatisticas) return;
+
+        const entradasPorMes = this.estatisticas.entradas.porMes;
+        const contasPorMes = this.estatisticas.contas.porMes;
 
         // Preparar dados para o gráfico
-        const meses = Object.keys(entradasDados.porMes).sort();
-        const valoresEntradas = meses.map(mes => entradasDados.porMes[mes] || 0);
+        const meses = Object.keys(entradasPorMes).sort();
+        const valoresEntradas = meses.map(mes => entradasPorMes[mes] || 0);
         
-        // Calcular contas por mês (simplificado)
-        const valoresContas = meses.map(mes => {
-            // Para simplificar, vamos usar uma média ou estimativa
-            return contasResumo.valorMes / 3; // Estimativa mensal
-        });
+        // Contas por mês de vencimento
+        const valoresContas = meses.map(mes => contasPorMes[mes] || 0);
 
         if (this.graficos.evolucao) {
             this.graficos.evolucao.destroy();
@@ -205,14 +186,16 @@ class DashboardManager {
         const ctx = document.getElementById('distribuicaoChart');
         if (!ctx) return;
 
-        const entradasDados = entradasManager.obterDadosGraficos();
+        if (!this.estatisticas) return;
+
+        const porTipo = this.estatisticas.entradas.porTipo;
 
         if (this.graficos.distribuicao) {
             this.graficos.distribuicao.destroy();
         }
 
-        const tipos = Object.keys(entradasDados.porTipo);
-        const valores = Object.values(entradasDados.porTipo);
+        const tipos = Object.keys(porTipo);
+        const valores = tipos.map(tipo => porTipo[tipo].valor);
 
         this.graficos.distribuicao = new Chart(ctx, {
             type: 'doughnut',
@@ -30,6 +30,18 @@ class EntradasManager {
             });
         }
 
+        // Importação de extrato da maquininha
+        const arquivoImportacao = document.getElementById('arquivoImportacaoEntradas');
+        if (arquivoImportacao) {
+            arquivoImportacao.addEventListener('change', () => {
+                const arquivo = arquivoImportacao.files[0];
+                arquivoImportacao.value = '';
+                if (arquivo) {
+                    this.importarEntradas(arquivo);
+                }
+            });
+        }
+
         // Filtros
         const filtroTipo = document.getElementById('filtroTipo');
         const filtroMes = document.getElementById('filtroMesEntradas');
@@ -89,6 +101,27 @@ class EntradasManager {
         }
     }
 
+    async importarEntradas(arquivo) {
+        try {
+            const resultado = await storage.importarEntradas(arquivo);
+            await this.carregarEntradas();
+            this.renderizarEntradas();
+
+            if (typeof dashboard !== 'undefined') {
+                dashboard.atualizarDados();
+            }
+
+            const rejeitadas = resultado.rejeitadas ? `, ${resultado.rejeitadas} linhas rejeitadas` : '';
+            this.mostrarNotificacao(
+                `${resultado.importadas} entradas importadas (${resultado.duplicadas} já existiam${rejeitadas})`,
+                resultado.rejeitadas ? 'error' : 'success'
+            );
+        } catch (error) {
+            console.error('Erro ao importar entradas:', error);
+            this.mostrarNotificacao(`Erro ao importar entradas: ${error.message}`, 'error');
+        }
+    }
+
     async editarEntrada(id) {
         const entrada = this.entradas.find(e => e.id === id);
         if (!entrada) return;
@@ -125,38 +158,27 @@ class EntradasManager {
         }
     }
 
-    renderizarEntradas() {
+    async renderizarEntradas() {
         const tbody = document.getElementById('entradasTableBody');
         if (!tbody) return;
 
         const filtroTipo = document.getElementById('filtroTipo')?.value || 'todos';
         const filtroMes = document.getElementById('filtroMesEntradas')?.value;
 
-        let entradasFiltradas = this.entradas;
-
-        // Aplicar filtros
+        // Filtros e ordenação (mais recentes primeiro) são resolvidos pelos índices do servidor
+        const filtros = { ordem: 'desc' };
         if (filtroTipo !== 'todos') {
-            entradasFiltradas = entradasFiltradas.filter(e => e.tipoEntrada === filtroTipo);
+            filtros.tipoEntrada = filtroTipo;
         }
-
         if (filtroMes) {
-            const [ano, mes] = filtroMes.split('-');
-            entradasFiltradas = entradasFiltradas.filter(e => {
-                // Usar DateUtils para parsing seguro da data
-                if (!DateUtils.isValidDate(e.dataEntrada)) return false;
-                
-                const dataEntrada = new Date(e.dataEntrada + 'T00:00:00');
-                return dataEntrada.getFullYear() === parseInt(ano) && 
-                       (dataEntrada.getMonth() + 1) === parseInt(mes);
-            });
+            filtros.mes = filtroMes;
         }
 
-        // Ordenar por data (mais recentes primeiro) - usando parsing seguro
-        entradasFiltradas.sort((a, b) => {
-            const dataA = new Date(a.dataEntrada + 'T00:00:00');
-            const dataB = new Date(b.dataEntrada + 'T00:00:00');
-            return dataB - dataA;
-        });
+        let entradasFiltradas = await storage.consultar('entradas', filtros);
+        if (entradasFiltradas === null) {
+            // Sem conexão: usar a lista já carregada, sem filtros
+            entradasFiltradas = this.entradas;
+        }
 
         tbody.innerHTML = '';
 
@@ -7,21 +7,25 @@ class StorageManager {
             ? 'http://localhost:5000' 
             : window.location.origin;
         
-        // Cache temporário em memória (não persiste)
+        // Loja (filial) cujos dados esta página usa: ?loja=<id> na URL,
+        // enviada em todas as requisições no cabeçalho X-Loja
+        this.loja = new URLSearchParams(window.location.search).get('loja') || 'principal';
+        
+        // Cache temporário em memória (não persiste), usado também offline
         this.memoryCache = {
             contas: null,
             entradas: null,
             timestamp: null
         };
         
-        // Cache duration em milissegundos (2 minutos)
-        this.cacheDuration = 2 * 60 * 1000;
-    }
-
-    // Verificar se o cache em memória é válido
-    isCacheValid() {
-        return this.memoryCache.timestamp && 
-               (Date.now() - this.memoryCache.timestamp) < this.cacheDuration;
+        // Últimas respostas GET por endpoint, revalidadas pelo ETag do servidor
+        this.respostasCache = new Map();
+        
+        // Posição na sincronização incremental (/api/sync): instância do
+        // servidor e última revisão aplicada ao cache em memória
+        this.sincronizacao = { instancia: null, revisao: 0 };
+        this.sincronizacaoEmAndamento = null;
+        this.sincronizacaoAtiva = false;
     }
 
     // Atualizar cache em memória
@@ -38,8 +42,11 @@ class StorageManager {
         try {
             const options = {
                 method,
+                // O cache é feito aqui, com ETag; evita uma segunda cópia no cache HTTP
+                cache: 'no-store',
                 headers: {
                     'Content-Type': 'application/json',
+                    'X-Loja': this.loja,
                 }
             };
 
@@ -47,38 +54,40 @@ class StorageManager {
                 options.body = JSON.stringify(data);
             }
 
+            const emCache = method === 'GET' ? this.respostasCache.get(endpoint) : null;
+            if (emCache) {
+                options.headers['If-None-Match'] = emCache.etag;
+            }
+
             const response = await fetch(`${this.apiBaseUrl}/api${endpoint}`, options);
             
+            // 304: os dados não mudaram desde a última resposta
+            if (response.status === 304 && emCache) {
+                return Array.isArray(emCache.dados) ? [...emCache.dados] : emCache.dados;
+            }
+
             if (!response.ok) {
                 throw new Error(`Erro HTTP: ${response.status}`);
             }
 
-            return await response.json();
+            const dados = await response.json();
+            const etag = response.headers.get('ETag');
+            if (method === 'GET' && etag) {
+                this.respostasCache.set(endpoint, { etag, dados });
+                return Array.isArray(dados) ? [...dados] : dados;
+            }
+            return dados;
         } catch (error) {
             console.error(`Erro na requisição API ${endpoint}:`, error);
             throw error;
         }
     }
 
-    // Carregar contas da API (com cache em memória)
+    // Carregar contas da API (cache em memória atualizado só com o que mudou)
     async carregarContas() {
         try {
-            // Tentar usar cache em memória primeiro
-            if (this.isCacheValid() && this.memoryCache.contas) {
-                console.log('📋 Usando cache em memória para contas');
-                return this.memoryCache.contas;
-            }
-
-            // Carregar da API
-            console.log('🔄 Carregando contas da API JSON...');
-            const contas = await this.apiRequest('/contas');
-            
-            // Atualizar cache
-            if (this.isCacheValid()) {
-                this.memoryCache.contas = contas;
-            }
-            
-            return contas;
+            await this.sincronizar();
+            return [...this.memoryCache.contas];
         } catch (error) {
             console.error('❌ Falha ao carregar contas da API:', error);
             
@@ -101,9 +110,7 @@ class StorageManager {
             const resultado = await this.apiRequest('/contas', 'POST', contas);
             
             // Atualizar cache em memória
-            if (this.isCacheValid()) {
-                this.memoryCache.contas = contas;
-            }
+            this.memoryCache.contas = contas;
             
             console.log('✅ Contas salvas com sucesso em JSON');
             return true;
@@ -113,25 +120,11 @@ class StorageManager {
         }
     }
 
-    // Carregar entradas da API (com cache em memória)
+    // Carregar entradas da API (cache em memória atualizado só com o que mudou)
     async carregarEntradas() {
         try {
-            // Tentar usar cache em memória primeiro
-            if (this.isCacheValid() && this.memoryCache.entradas) {
-                console.log('💰 Usando cache em memória para entradas');
-                return this.memoryCache.entradas;
-            }
-
-            // Carregar da API
-            console.log('🔄 Carregando entradas da API JSON...');
-            const entradas = await this.apiRequest('/entradas');
-            
-            // Atualizar cache
-            if (this.isCacheValid()) {
-                this.memoryCache.entradas = entradas;
-            }
-            
-            return entradas;
+            await this.sincronizar();
+            return [...this.memoryCache.entradas];
         } catch (error) {
             console.error('❌ Falha ao carregar entradas da API:', error);
             
@@ -154,9 +147,7 @@ class StorageManager {
             const resultado = await this.apiRequest('/entradas', 'POST', entradas);
             
             // Atualizar cache em memória
-            if (this.isCacheValid()) {
-                this.memoryCache.entradas = entradas;
-            }
+            this.memoryCache.entradas = entradas;
             
             console.log('✅ Entradas salvas com sucesso em JSON');
             return true;
@@ -166,66 +157,189 @@ class StorageManager {
         }
     }
 
-    // Adicionar uma conta
-    async adicionarConta(conta) {
-        const contas = await this.carregarContas();
-        conta.id = this.gerarId();
-        conta.dataCriacao = new Date().toISOString();
-        contas.push(conta);
+    // Consultar registros filtrados e ordenados pelo servidor, seguindo as páginas
+    async consultar(colecao, filtros = {}, limitePagina = 500) {
+        try {
+            const registros = [];
+            let cursor = null;
+            do {
+                const params = new URLSearchParams({ ...filtros, limite: limitePagina });
+                if (cursor) {
+                    params.set('cursor', cursor);
+                }
+                const pagina = await this.apiRequest(`/${colecao}?${params}`);
+                registros.push(...pagina.itens);
+                cursor = pagina.proximoCursor;
+            } while (cursor);
+            return registros;
+        } catch (error) {
+            console.error(`❌ Erro ao consultar ${colecao}:`, error);
+            return null;
+        }
+    }
+
+    // Trazer para o cache em memória as alterações desde a última revisão
+    // (espera > 0 segura a resposta no servidor até haver alguma alteração)
+    async sincronizar(espera = 0) {
+        if (espera === 0 && this.sincronizacaoEmAndamento) {
+            return this.sincronizacaoEmAndamento;
+        }
+        const promessa = (async () => {
+            // Sem as duas coleções em cache (início, limpeza, importação) pede tudo
+            const completo = !this.memoryCache.contas || !this.memoryCache.entradas;
+            const params = new URLSearchParams({
+                since: completo ? 0 : this.sincronizacao.revisao,
+                espera: espera
+            });
+            if (this.sincronizacao.instancia) {
+                params.set('instancia', this.sincronizacao.instancia);
+            }
+            const resposta = await this.apiRequest(`/sync?${params}`);
+            return this.aplicarSincronizacao(resposta);
+        })();
+        if (espera === 0) {
+            this.sincronizacaoEmAndamento = promessa;
+            promessa.finally(() => {
+                if (this.sincronizacaoEmAndamento === promessa) {
+                    this.sincronizacaoEmAndamento = null;
+                }
+            }).catch(() => {});
+        }
+        return promessa;
+    }
+
+    // Aplicar uma resposta de /api/sync ao cache; retorna se algo mudou
+    aplicarSincronizacao(resposta) {
+        const mesmaInstancia = resposta.instancia === this.sincronizacao.instancia;
+        if (mesmaInstancia && resposta.revisao < this.sincronizacao.revisao) {
+            // Resposta atrasada (ex.: long-poll e carregamento simultâneos)
+            return false;
+        }
         
-        const salvo = await this.salvarContas(contas);
-        return salvo ? conta : null;
+        let alterou = !mesmaInstancia || resposta.completo;
+        for (const colecao of ['contas', 'entradas']) {
+            const { alterados, removidos } = resposta[colecao];
+            if (resposta.completo || !this.memoryCache[colecao]) {
+                this.memoryCache[colecao] = alterados;
+                continue;
+            }
+            if (alterados.length === 0 && removidos.length === 0) {
+                continue;
+            }
+            alterou = true;
+            
+            const registros = this.memoryCache[colecao];
+            const posicoes = new Map(registros.map((registro, i) => [String(registro.id), i]));
+            for (const registro of alterados) {
+                const posicao = posicoes.get(String(registro.id));
+                if (posicao === undefined) {
+                    posicoes.set(String(registro.id), registros.length);
+                    registros.push(registro);
+                } else {
+                    registros[posicao] = registro;
+                }
+            }
+            if (removidos.length > 0) {
+                const excluidos = new Set(removidos.map(String));
+                this.memoryCache[colecao] = registros.filter(registro => !excluidos.has(String(registro.id)));
+            }
+        }
+        
+        this.sincronizacao = { instancia: resposta.instancia, revisao: resposta.revisao };
+        this.memoryCache.timestamp = Date.now();
+        return alterou;
+    }
+
+    // Acompanhar alterações feitas em outras abas/dispositivos (long-poll)
+    async iniciarSincronizacao(aoAlterar, espera = 25) {
+        if (this.sincronizacaoAtiva) {
+            return;
+        }
+        this.sincronizacaoAtiva = true;
+        while (this.sincronizacaoAtiva) {
+            try {
+                if (await this.sincronizar(espera)) {
+                    await aoAlterar();
+                }
+            } catch (error) {
+                console.warn('⚠️ Falha na sincronização, tentando novamente em 5s:', error);
+                await new Promise(resolve => setTimeout(resolve, 5000));
+            }
+        }
+    }
+
+    pararSincronizacao() {
+        this.sincronizacaoAtiva = false;
     }
 
-    // Adicionar uma entrada
+    // Adicionar uma conta (envia só o novo registro)
+    async adicionarConta(conta) {
+        try {
+            conta.id = this.gerarId();
+            conta.dataCriacao = new Date().toISOString();
+            const novaConta = await this.apiRequest('/contas', 'POST', conta);
+            return novaConta;
+        } catch (error) {
+            console.error('❌ Erro ao adicionar conta:', error);
+            return null;
+        }
+    }
+
+    // Adicionar uma entrada (envia só o novo registro)
     async adicionarEntrada(entrada) {
-        const entradas = await this.carregarEntradas();
-        entrada.id = this.gerarId();
-        entrada.dataCriacao = new Date().toISOString();
-        entradas.push(entrada);
-        
-        const salvo = await this.salvarEntradas(entradas);
-        return salvo ? entrada : null;
+        try {
+            entrada.id = this.gerarId();
+            entrada.dataCriacao = new Date().toISOString();
+            const novaEntrada = await this.apiRequest('/entradas', 'POST', entrada);
+            return novaEntrada;
+        } catch (error) {
+            console.error('❌ Erro ao adicionar entrada:', error);
+            return null;
+        }
     }
 
-    // Atualizar conta
+    // Atualizar conta (envia só os campos alterados)
     async atualizarConta(id, dadosAtualizados) {
-        const contas = await this.carregarContas();
-        const index = contas.findIndex(conta => conta.id === id);
-        if (index !== -1) {
-            contas[index] = { ...contas[index], ...dadosAtualizados };
-            const salvo = await this.salvarContas(contas);
-            return salvo ? contas[index] : null;
+        try {
+            const conta = await this.apiRequest(`/contas/${encodeURIComponent(id)}`, 'PATCH', dadosAtualizados);
+            return conta;
+        } catch (error) {
+            console.error('❌ Erro ao atualizar conta:', error);
+            return null;
         }
-        return null;
     }
 
-    // Atualizar entrada
+    // Atualizar entrada (envia só os campos alterados)
     async atualizarEntrada(id, dadosAtualizados) {
-        const entradas = await this.carregarEntradas();
-        const index = entradas.findIndex(entrada => entrada.id === id);
-        if (index !== -1) {
-            entradas[index] = { ...entradas[index], ...dadosAtualizados };
-            const salvo = await this.salvarEntradas(entradas);
-            return salvo ? entradas[index] : null;
+        try {
+            const entrada = await this.apiRequest(`/entradas/${encodeURIComponent(id)}`, 'PATCH', dadosAtualizados);
+            return entrada;
+        } catch (error) {
+            console.error('❌ Erro ao atualizar entrada:', error);
+            return null;
         }
-        return null;
     }
 
     // Excluir conta
     async excluirConta(id) {
-        const contas = await this.carregarContas();
-        const contasFiltradas = contas.filter(conta => conta.id !== id);
-        const salvo = await this.salvarContas(contasFiltradas);
-        return salvo && contas.length !== contasFiltradas.length;
+        try {
+            await this.apiRequest(`/contas/${encodeURIComponent(id)}`, 'DELETE');
+            return true;
+        } catch (error) {
+            console.error('❌ Erro ao excluir conta:', error);
+            return false;
+        }
     }
 
     // Excluir entrada
     async excluirEntrada(id) {
-        const entradas = await this.carregarEntradas();
-        const entradasFiltradas = entradas.filter(entrada => entrada.id !== id);
-        const salvo = await this.salvarEntradas(entradasFiltradas);
-        return salvo && entradas.length !== entradasFiltradas.length;
+        try {
+            await this.apiRequest(`/entradas/${encodeURIComponent(id)}`, 'DELETE');
+            return true;
+        } catch (error) {
+            console.error('❌ Erro ao excluir entrada:', error);
+            return false;
+        }
     }
 
     // Gerar ID único
@@ -298,6 +412,26 @@ class StorageManager {
         }
     }
 
+    // Importar extrato de entradas (CSV ou NDJSON) enviado como veio do arquivo
+    async importarEntradas(arquivo) {
+        const nome = arquivo.name.toLowerCase();
+        const tipo = nome.endsWith('.csv') ? 'text/csv'
+            : (nome.endsWith('.ndjson') || nome.endsWith('.jsonl')) ? 'application/x-ndjson'
+            : 'application/octet-stream';
+        const response = await fetch(`${this.apiBaseUrl}/api/entradas/import`, {
+            method: 'POST',
+            headers: { 'Content-Type': tipo, 'X-Loja': this.loja },
+            body: arquivo
+        });
+        const resultado = await response.json();
+        if (!response.ok) {
+            throw new Error(resultado.error || `Erro HTTP: ${response.status}`);
+        }
+        await this.sincronizar();
+        console.log(`📥 ${resultado.importadas} entradas importadas (${resultado.duplicadas} já existiam)`);
+        return resultado;
+    }
+
     // Verificar status da conexão com API
     async verificarConexaoAPI() {
         try {
@@ -308,16 +442,39 @@ class StorageManager {
         }
     }
 
-    // Obter estatísticas do banco
-    async obterEstatisticasBD() {
+    // Obter estatísticas agregadas pelo servidor (mes no formato AAAA-MM)
+    async obterEstatisticasBD(mes = null) {
         try {
-            return await this.apiRequest('/stats');
+            const hoje = DateUtils.getDataLocal();
+            const params = new URLSearchParams({ hoje, mes: mes || hoje.slice(0, 7) });
+            return await this.apiRequest(`/stats?${params}`);
         } catch (error) {
             console.error('❌ Erro ao obter estatísticas:', error);
             return null;
         }
     }
 
+    // Precificar uma peça no servidor (tipo, peso, preco, media_perdas, media_lucro)
+    async precificar(parametros) {
+        try {
+            return await this.apiRequest('/precificar', 'POST', parametros);
+        } catch (error) {
+            console.error('❌ Erro ao precificar peça:', error);
+            return null;
+        }
+    }
+
+    // Primais disponíveis no catálogo de cortes
+    async obterTiposPeca() {
+        try {
+            const resposta = await this.apiRequest('/precificar/tipos');
+            return resposta.tipos;
+        } catch (error) {
+            console.error('❌ Erro ao obter tipos de peça:', error);
+            return null;
+        }
+    }
+
     // Criar backup do banco
     async criarBackup() {
         try {
@@ -330,73 +487,37 @@ class StorageManager {
 
     // Obter estatísticas (mantido para compatibilidade)
     async obterEstatisticas() {
-        try {
-            const dados = await this.apiRequest('/dados');
-            const contas = dados.contas || [];
-            const entradas = dados.entradas || [];
-            
-            const dataAtual = new Date();
-            const mesAtual = dataAtual.getMonth();
-            const anoAtual = dataAtual.getFullYear();
-
-            // Contas à pagar
-            const contasAPagar = contas.filter(c => c.status === 'à pagar');
-            const contasPagas = contas.filter(c => c.status === 'pago');
-            const contasVencidas = contas.filter(c => {
-                if (c.status === 'pago') return false;
-                if (!DateUtils.isValidDate(c.dataVencimento)) return false;
-                
-                const dataVenc = new Date(c.dataVencimento + 'T00:00:00');
-                return dataVenc < dataAtual;
-            });
-
-            const totalContasAPagar = contasAPagar.reduce((sum, c) => sum + parseFloat(c.valor), 0);
-            const totalContasPagas = contasPagas.reduce((sum, c) => sum + parseFloat(c.valor), 0);
-
-            // Entradas do mês
-            const entradasMes = entradas.filter(e => {
-                if (!DateUtils.isValidDate(e.dataEntrada)) return false;
-                
-                const dataEntrada = new Date(e.dataEntrada + 'T00:00:00');
-                return dataEntrada.getMonth() === mesAtual && dataEntrada.getFullYear() === anoAtual;
-            });
-
-            const totalEntradasMes = entradasMes.reduce((sum, e) => sum + parseFloat(e.valorCalculado || e.valor), 0);
-
-            // Agrupar entradas por tipo
-            const entradasPorTipo = {};
-            entradasMes.forEach(entrada => {
-                if (!entradasPorTipo[entrada.tipoEntrada]) {
-                    entradasPorTipo[entrada.tipoEntrada] = 0;
-                }
-                entradasPorTipo[entrada.tipoEntrada] += parseFloat(entrada.valorCalculado || entrada.valor);
-            });
-
-            return {
-                contas: {
-                    total: contas.length,
-                    aPagar: contasAPagar.length,
-                    pagas: contasPagas.length,
-                    vencidas: contasVencidas.length,
-                    valorAPagar: totalContasAPagar,
-                    valorPago: totalContasPagas
-                },
-                entradas: {
-                    totalMes: entradasMes.length,
-                    valorMes: totalEntradasMes,
-                    mediaDiaria: entradasMes.length > 0 ? totalEntradasMes / 30 : 0,
-                    porTipo: entradasPorTipo
-                },
-                saldo: totalEntradasMes - totalContasAPagar
-            };
-        } catch (error) {
-            console.error('❌ Erro ao obter estatísticas:', error);
+        const stats = await this.obterEstatisticasBD();
+        if (!stats) {
             return {
                 contas: { total: 0, aPagar: 0, pagas: 0, vencidas: 0, valorAPagar: 0, valorPago: 0 },
                 entradas: { totalMes: 0, valorMes: 0, mediaDiaria: 0, porTipo: {} },
                 saldo: 0
             };
         }
+
+        const entradasPorTipo = {};
+        Object.entries(stats.entradas.porTipoMes).forEach(([tipo, grupo]) => {
+            entradasPorTipo[tipo] = grupo.valor;
+        });
+
+        return {
+            contas: {
+                total: stats.contas.total,
+                aPagar: stats.contas.aPagar,
+                pagas: stats.contas.pagas,
+                vencidas: stats.contas.vencidas,
+                valorAPagar: stats.contas.valorAPagar,
+                valorPago: stats.contas.valorPago
+            },
+            entradas: {
+                totalMes: stats.entradas.totalMes,
+                valorMes: stats.entradas.valorMes,
+                mediaDiaria: stats.entradas.mediaDiaria,
+                porTipo: entradasPorTipo
+            },
+            saldo: stats.entradas.valorMes - stats.contas.valorAPagar
+        };
     }
 }
 
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Servidor de teste: servidor_json importado uma vez com data/ em um diretório temporário"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def servidor(tmp_path_factory):
+    # DATA_DIR é relativo ao diretório atual, lido na importação
+    anterior = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('servidor'))
+    os.environ.setdefault('FSYNC_ATIVO', '0')
+    import servidor_json
+    yield servidor_json
+    servidor_json.particoes.fechar()
+    servidor_json.consolidacao.encerrar()
+    os.chdir(anterior)
+
+
+@pytest.fixture
+def cliente(servidor):
+    """Cliente HTTP com contas, entradas e config da loja principal vazios"""
+    deposito = servidor.deposito
+    deposito.contas.salvar([])
+    deposito.entradas.salvar([])
+    deposito.config.salvar({})
+    return servidor.app.test_client()
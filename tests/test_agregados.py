@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Agregados de contas e entradas iguais a um recálculo completo (agregados.py)"""
+
+from agregados import SEM_STATUS, SEM_TIPO, AgregadosContas, AgregadosEntradas
+
+CONTAS = {
+    'c1': {'id': 'c1', 'valor': 100, 'status': 'à pagar', 'dataVencimento': '2026-10-10'},
+    'c2': {'id': 'c2', 'valor': '50.5', 'status': 'à pagar', 'dataVencimento': '2026-10-18'},
+    'c3': {'id': 'c3', 'valor': 30, 'status': 'pago', 'dataVencimento': '2026-10-01'},
+    'c4': {'id': 'c4', 'valor': 20, 'status': 'à pagar', 'dataVencimento': '2026-09-30'},
+    'c5': {'id': 'c5', 'valor': 7, 'status': None, 'dataVencimento': '2026-11-02'},
+    'c6': {'id': 'c6', 'valor': 'abc', 'status': 'à pagar', 'dataVencimento': 'sem data'},
+}
+
+ENTRADAS = {
+    'e1': {'id': 'e1', 'valor': 10, 'tipoEntrada': 'pix', 'dataEntrada': '2026-10-18'},
+    'e2': {'id': 'e2', 'valor': 99, 'valorCalculado': 95.5, 'tipoEntrada': 'credito', 'dataEntrada': '2026-10-12'},
+    'e3': {'id': 'e3', 'valor': 5, 'dataEntrada': '2026-09-01'},
+    'e4': {'id': 'e4', 'valor': 2.25, 'tipoEntrada': 'pix', 'dataEntrada': '2026-10-17'},
+}
+
+
+def contas_agregadas(registros=CONTAS):
+    agregados = AgregadosContas()
+    agregados.reiniciar(registros)
+    return agregados
+
+
+def test_resumo_das_contas():
+    resumo = contas_agregadas().resumo('2026-10', '2026-10-18')
+    assert resumo['total'] == 6
+    assert (resumo['aPagar'], resumo['pagas']) == (4, 1)
+    assert resumo['valorAPagar'] == 170.5
+    assert resumo['valorPago'] == 30
+    assert resumo['porStatus'] == {
+        'à pagar': {'quantidade': 4, 'valor': 170.5},
+        'pago': {'quantidade': 1, 'valor': 30},
+        SEM_STATUS: {'quantidade': 1, 'valor': 7},
+    }
+    assert resumo['mes'] == {'quantidade': 3, 'valor': 180.5, 'aPagar': 2, 'pagas': 1,
+                             'valorAPagar': 150.5, 'valorPago': 30, 'vencidas': 1}
+    assert resumo['porMes'] == {'2026-09': 20, '2026-10': 180.5, '2026-11': 7}
+
+
+def test_conta_que_vence_hoje_ainda_nao_esta_vencida():
+    agregados = contas_agregadas()
+    # c2 vence em 18/10: vencida só a partir do dia seguinte
+    assert agregados.resumo('2026-10', '2026-10-18')['vencidas'] == 2
+    assert agregados.resumo('2026-10', '2026-10-19')['vencidas'] == 3
+    assert agregados.resumo('2026-10', '2026-10-19')['mes']['vencidas'] == 2
+    # A conta sem status também é pendente
+    assert agregados.resumo('2026-11', '2026-11-03')['vencidas'] == 4
+
+
+def test_status_ausente_ou_vazio_fica_em_um_grupo_de_texto():
+    agregados = contas_agregadas({
+        'a': {'id': 'a', 'valor': 1, 'dataVencimento': '2026-10-01'},
+        'b': {'id': 'b', 'valor': 2, 'status': '', 'dataVencimento': '2026-10-01'},
+        'c': {'id': 'c', 'valor': 4, 'status': None},
+    })
+    por_status = agregados.resumo('2026-10', '2026-10-18')['porStatus']
+    assert por_status == {SEM_STATUS: {'quantidade': 3, 'valor': 7}}
+    assert all(isinstance(chave, str) for chave in agregados.parcial()['por_mes']['2026-10'])
+
+
+def test_alteracoes_incrementais_iguais_ao_recalculo():
+    incremental = AgregadosContas()
+    incremental.reiniciar({})
+    atuais = {}
+    for chave, registro in CONTAS.items():
+        incremental.alterar(chave, None, registro)
+        atuais[chave] = registro
+    pago = {**CONTAS['c1'], 'status': 'pago'}
+    incremental.alterar('c1', CONTAS['c1'], pago)
+    atuais['c1'] = pago
+    incremental.alterar('c4', CONTAS['c4'], None)
+    del atuais['c4']
+
+    for hoje in ('2026-10-18', '2026-12-01'):
+        assert incremental.resumo('2026-10', hoje) == contas_agregadas(atuais).resumo('2026-10', hoje)
+    # Datas sem pendências saem da contagem de vencidas
+    assert '2026-09-30' not in incremental.pendentes_por_data
+
+
+def test_mesclar_parciais_de_outra_loja():
+    metade = list(CONTAS.items())
+    primeira = contas_agregadas(dict(metade[:3]))
+    segunda = contas_agregadas(dict(metade[3:]))
+    primeira.mesclar(segunda.parcial())
+    assert primeira.resumo('2026-10', '2026-10-19') == contas_agregadas().resumo('2026-10', '2026-10-19')
+
+
+def test_resumo_das_entradas():
+    agregados = AgregadosEntradas()
+    agregados.reiniciar(ENTRADAS)
+    resumo = agregados.resumo('2026-10', '2026-10-18')
+    assert (resumo['total'], resumo['valorTotal']) == (4, 112.75)
+    assert (resumo['totalMes'], resumo['valorMes']) == (3, 107.75)
+    assert resumo['porTipo'] == {
+        'pix': {'quantidade': 2, 'valor': 12.25},
+        'credito': {'quantidade': 1, 'valor': 95.5},
+        SEM_TIPO: {'quantidade': 1, 'valor': 5},
+    }
+    assert SEM_TIPO not in resumo['porTipoMes']
+    assert resumo['porMes'] == {'2026-09': 5, '2026-10': 107.75}
+    ultimos = resumo['ultimos7Dias']
+    assert [dia['data'] for dia in ultimos][::6] == ['2026-10-12', '2026-10-18']
+    assert [dia['valor'] for dia in ultimos] == [95.5, 0, 0, 0, 0, 2.25, 10]
+
+
+def test_stats_da_api_usam_os_agregados(cliente):
+    for conta in CONTAS.values():
+        assert cliente.post('/api/contas', json=conta).status_code == 201
+    stats = cliente.get('/api/stats?mes=2026-10&hoje=2026-10-18').get_json()
+    assert stats['contas']['vencidas'] == 2
+    assert stats['contas']['mes']['vencidas'] == 1
+
+    cliente.patch('/api/contas/c1', json={'status': 'pago'})
+    stats = cliente.get('/api/stats?mes=2026-10&hoje=2026-10-18').get_json()
+    assert stats['contas']['vencidas'] == 1
+    assert cliente.get('/api/stats?hoje=18/10/2026').status_code == 400
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Depósito SQLite: ida e volta, paridade com os arquivos JSON e leituras concorrentes (armazenamento_sqlite.py)"""
+
+import threading
+
+import pytest
+
+from armazenamento import DepositoDados
+from armazenamento_sqlite import DepositoSQLite, ler_tabelas_somente_leitura, migrar
+
+CONTAS = [
+    {'id': 'c1', 'empresa': 'Frigorífico', 'valor': 150.0, 'status': 'à pagar', 'dataVencimento': '2026-10-20'},
+    {'id': 'c2', 'empresa': 'Embalagens', 'valor': 42, 'status': 'pago', 'dataVencimento': '2026-10-01'},
+    {'id': 3, 'valor': '12,50', 'status': None, 'tags': ['x'], 'extra': {'nota': 'ñ 😀'}},
+    {'valor': 1, 'descricao': 'registro antigo sem id'},
+]
+ENTRADAS = [
+    {'id': 'e1', 'valor': 80.5, 'tipoEntrada': 'pix', 'dataEntrada': '2026-10-18'},
+    {'id': 'e2', 'valor': 10, 'tipoEntrada': 'dinheiro', 'dataEntrada': 'sem data'},
+]
+CONFIG = {'empresa': 'Açougue', 'tema': {'cor': 'azul'}}
+
+
+@pytest.fixture
+def banco(tmp_path):
+    deposito = DepositoSQLite(str(tmp_path / 'dados.db'))
+    yield deposito
+    deposito.fechar()
+
+
+def depositos_json_e_sqlite(tmp_path):
+    json_dir = tmp_path / 'json'
+    json_dir.mkdir()
+    return [
+        DepositoDados(str(json_dir / 'contas.json'), str(json_dir / 'entradas.json'),
+                      str(json_dir / 'config.json'), usar_diario=True),
+        DepositoSQLite(str(tmp_path / 'dados.db')),
+    ]
+
+
+def test_ida_e_volta(tmp_path, banco):
+    assert banco.contas.salvar(CONTAS)
+    assert banco.entradas.salvar(ENTRADAS)
+    assert banco.config.salvar(CONFIG)
+    assert banco.contas.obter() == CONTAS
+
+    # Outra instância (outro processo) lê do banco o mesmo estado e ordem
+    reaberto = DepositoSQLite(banco.banco.arquivo)
+    try:
+        assert reaberto.contas.obter() == CONTAS
+        assert reaberto.entradas.obter() == ENTRADAS
+        assert reaberto.config.obter() == CONFIG
+        assert reaberto.contas.obter_registro('3') == CONTAS[2]
+    finally:
+        reaberto.fechar()
+    assert ler_tabelas_somente_leitura(banco.banco.arquivo, ['contas', 'entradas']) == {
+        'contas': CONTAS, 'entradas': ENTRADAS
+    }
+
+
+def test_alteracoes_de_outro_processo_sao_relidas(banco):
+    banco.contas.salvar(CONTAS[:2])
+    outro = DepositoSQLite(banco.banco.arquivo)
+    try:
+        outro.contas.inserir({'id': 'novo', 'valor': 5})
+        outro.contas.remover('c1')
+        assert [r['id'] for r in banco.contas.obter()] == ['c2', 'novo']
+    finally:
+        outro.fechar()
+
+
+def test_mesmo_resultado_que_os_arquivos_json(tmp_path):
+    depositos = depositos_json_e_sqlite(tmp_path)
+    try:
+        for deposito in depositos:
+            deposito.contas.salvar(CONTAS)
+            deposito.entradas.salvar(ENTRADAS)
+            deposito.config.salvar(CONFIG)
+            deposito.contas.inserir({'id': 'c9', 'valor': 9, 'status': 'à pagar', 'dataVencimento': '2026-10-05',
+                                     'dataCriacao': '2026-10-18T10:00:00'})
+            deposito.contas.atualizar('c2', {'status': 'à pagar'})
+            deposito.contas.remover('3')
+            deposito.entradas.inserir_lote([{'id': 'e1'}, {'id': 'e3', 'valor': 1, 'dataCriacao': ''}, {'id': 'e3'}])
+            deposito.entradas.salvar(deposito.entradas.obter()[1:])
+
+        json_, sqlite = depositos
+        for nome in ('contas', 'entradas', 'config'):
+            assert getattr(sqlite, nome).obter() == getattr(json_, nome).obter(), nome
+
+        filtros = {'status': 'à pagar'}
+        consulta_json = json_.contas.criar_indice('dataVencimento', ['status', 'empresa'])
+        consulta_sqlite = sqlite.contas.criar_indice('dataVencimento', ['status', 'empresa'])
+        for parametros in ({}, {'filtros': filtros}, {'ordem': 'desc', 'limite': 1},
+                           {'de': '2026-10-02', 'ate': '2026-10-31'}):
+            assert consulta_sqlite.consultar(**parametros)['itens'] == consulta_json.consultar(**parametros)['itens']
+    finally:
+        depositos[1].fechar()
+
+
+def test_migrar_dos_arquivos_json(tmp_path):
+    json_, _ = depositos_json_e_sqlite(tmp_path)
+    json_.contas.salvar(CONTAS)
+    json_.entradas.salvar(ENTRADAS)
+    json_.config.salvar(CONFIG)
+    arquivo = str(tmp_path / 'migrado.db')
+    assert migrar(str(tmp_path / 'json'), arquivo) == {'contas': 4, 'entradas': 2, 'config': 2}
+    migrado = DepositoSQLite(arquivo)
+    try:
+        assert migrado.contas.obter() == CONTAS
+        assert migrado.config.obter() == CONFIG
+    finally:
+        migrado.fechar()
+    with pytest.raises(ValueError):
+        migrar(str(tmp_path / 'json'), arquivo)
+
+
+def test_leitores_concorrentes_veem_estado_completo(banco):
+    antigo = [{'id': f'a{i}', 'valor': i} for i in range(2000)]
+    novo = [{'id': f'n{i}', 'valor': -i} for i in range(3000)]
+    banco.contas.salvar(antigo)
+    leitor = DepositoSQLite(banco.banco.arquivo)
+    vistos = set()
+    terminou = threading.Event()
+
+    def ler():
+        while not terminou.is_set():
+            registros = ler_tabelas_somente_leitura(banco.banco.arquivo, ['contas'])['contas']
+            vistos.add((len(registros), registros[0]['id']))
+            registros = leitor.contas.obter()
+            vistos.add((len(registros), registros[0]['id']))
+
+    threads = [threading.Thread(target=ler) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(5):
+            assert banco.contas.salvar(novo)
+            assert banco.contas.salvar(antigo)
+    finally:
+        terminou.set()
+        for thread in threads:
+            thread.join()
+        leitor.fechar()
+    # Cada leitura vê uma transação inteira, nunca metade da reescrita
+    assert vistos <= {(2000, 'a0'), (3000, 'n0')}
+
+
+@pytest.mark.parametrize('dados', [[1, 2, 3], {'id': 'a'}, [{'id': 'a'}, {'id': 'a'}], [{'id': 1.5}]])
+def test_lista_invalida_nao_altera_nada(banco, dados):
+    banco.contas.salvar(CONTAS[:2])
+    revisao = banco.banco.revisao('contas')
+    with pytest.raises(ValueError):
+        banco.contas.salvar(dados)
+    assert banco.contas.obter() == CONTAS[:2]
+    assert banco.banco.revisao('contas') == revisao
+
+
+def test_config_invalida_nao_altera_nada(banco):
+    banco.config.salvar(CONFIG)
+    with pytest.raises(ValueError):
+        banco.config.salvar([CONFIG])
+    assert banco.config.obter() == CONFIG
+
+
+def test_transacao_com_erro_desfaz_a_memoria(banco, monkeypatch):
+    banco.contas.salvar(CONTAS[:2])
+
+    def falhar(conexao, operacao):
+        raise OSError('disco cheio')
+
+    with monkeypatch.context() as m:
+        m.setattr(banco.contas, '_aplicar', falhar)
+        with pytest.raises(OSError):
+            banco.contas.inserir({'id': 'x'})
+    assert banco.contas.obter() == CONTAS[:2]
+    assert banco.contas.obter_registro('x') is None
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Arquivos estáticos em memória: endereços com hash, Cache-Control e releitura do disco (ativos.py)"""
+
+import re
+
+from ativos import CACHE_IMUTAVEL, CACHE_REVALIDAR, AtivosEstaticos, endereco_com_hash
+
+PAGINA = '<link href="css/estilo.css"><script src="./js/app.js"></script><a href="https://x.com/a.js">'
+
+
+def criar_static(tmp_path, app='console.log(1)'):
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'js' / 'app.js').write_text(app)
+    (tmp_path / 'css' / 'estilo.css').write_text('body { margin: 0 }' * 200)
+    (tmp_path / 'index.html').write_text(PAGINA)
+    return tmp_path
+
+
+def test_pagina_aponta_para_enderecos_com_hash(tmp_path):
+    ativos = AtivosEstaticos(str(criar_static(tmp_path)))
+    app = endereco_com_hash('js/app.js', b'console.log(1)')
+    assert re.fullmatch(r'js/app\.[0-9a-f]{10}\.js', app)
+    assert ativos.enderecos['js/app.js'] == app
+
+    pagina, cache = ativos.obter('index.html')
+    assert cache == CACHE_REVALIDAR
+    assert pagina.conteudo.decode() == (f'<link href="{ativos.enderecos["css/estilo.css"]}">'
+                                        f'<script src="./{app}"></script><a href="https://x.com/a.js">')
+
+    # O mesmo conteúdo com hash fica no cache para sempre; sem hash, revalida
+    com_hash, sem_hash = ativos.obter(app), ativos.obter('js/app.js')
+    assert com_hash[0] is sem_hash[0]
+    assert (com_hash[1], sem_hash[1]) == (CACHE_IMUTAVEL, CACHE_REVALIDAR)
+    assert ativos.obter('js/outro.js') is None
+    # Só o que passa do tamanho mínimo e é texto ganha versões comprimidas
+    assert not com_hash[0].comprimidos
+    assert 'gzip' in ativos.obter('css/estilo.css')[0].comprimidos
+
+
+def contar_listagens(ativos, monkeypatch):
+    listagens = []
+    listar = ativos._listar
+    monkeypatch.setattr(ativos, '_listar', lambda: listagens.append(1) or listar())
+    return listagens
+
+
+def test_disco_verificado_no_maximo_a_cada_intervalo(tmp_path, monkeypatch):
+    ativos = AtivosEstaticos(str(criar_static(tmp_path)), intervalo=60)
+    listagens = contar_listagens(ativos, monkeypatch)
+    for _ in range(50):
+        ativos.obter('index.html')
+    assert listagens == []
+
+    (tmp_path / 'js' / 'app.js').write_text('console.log(2)')
+    antigo = ativos.enderecos['js/app.js']
+    ativos._verificado_em -= 60
+    pagina, _ = ativos.obter('index.html')
+    assert len(listagens) == 1
+    novo = endereco_com_hash('js/app.js', b'console.log(2)')
+    assert ativos.enderecos['js/app.js'] == novo != antigo
+    assert novo in pagina.conteudo.decode()
+    assert ativos.obter(antigo) is None
+
+
+def test_intervalo_zero_e_so_na_inicializacao(tmp_path, monkeypatch):
+    sempre = AtivosEstaticos(str(criar_static(tmp_path)), intervalo=0)
+    nunca = AtivosEstaticos(str(tmp_path), intervalo=None)
+    listagens_sempre = contar_listagens(sempre, monkeypatch)
+    listagens_nunca = contar_listagens(nunca, monkeypatch)
+    (tmp_path / 'js' / 'app.js').write_text('console.log(3)')
+    for ativos in (sempre, nunca):
+        ativos.obter('index.html')
+        ativos.obter('index.html')
+    assert (len(listagens_sempre), listagens_nunca) == (2, [])
+    assert sempre.enderecos['js/app.js'] == endereco_com_hash('js/app.js', b'console.log(3)')
+    assert nunca.enderecos['js/app.js'] == endereco_com_hash('js/app.js', b'console.log(1)')
+
+
+def test_cabecalhos_de_cache_das_rotas(cliente, servidor):
+    pagina = cliente.get('/')
+    assert pagina.status_code == 200
+    assert pagina.headers['Cache-Control'] == CACHE_REVALIDAR
+    assert pagina.headers['ETag']
+    endereco = servidor.ativos_estaticos.enderecos['js/app.js']
+    assert endereco in pagina.get_data(as_text=True)
+
+    com_hash = cliente.get(f'/{endereco}')
+    assert com_hash.headers['Cache-Control'] == CACHE_IMUTAVEL
+    assert com_hash.mimetype == 'application/javascript'
+    sem_hash = cliente.get('/js/app.js')
+    assert sem_hash.headers['Cache-Control'] == CACHE_REVALIDAR
+    assert sem_hash.get_data() == com_hash.get_data()
+    assert cliente.get('/js/inexistente.js').status_code == 404
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Retenção de backups e histórico de tarefas (backup.py)"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import backup
+from backup import ORIGEM_AGENDADO, ORIGEM_MANUAL, RepositorioBackup, TrabalhadorBackup
+
+
+class Relogio(datetime):
+    """datetime.now() controlado pelo teste"""
+    agora = datetime(2026, 10, 18, 12, 0, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    monkeypatch.setattr(backup, 'datetime', Relogio)
+    Relogio.agora = datetime(2026, 10, 18, 12, 0, 0)
+    return Relogio
+
+
+def dados(n):
+    return {'contas.json': [{'id': str(i), 'valor': i} for i in range(n)], 'config.json': {}}
+
+
+def ids(repositorio):
+    return [m['id'] for m in repositorio.listar()]
+
+
+def test_manual_nao_apaga_agendado_da_mesma_hora(tmp_path, relogio):
+    repositorio = RepositorioBackup(str(tmp_path), {'recentes': 0})
+    agendado = repositorio.criar(dados(5), ORIGEM_AGENDADO)
+    relogio.agora += timedelta(minutes=5)
+    manual = repositorio.criar(dados(6), ORIGEM_MANUAL)
+
+    assert ids(repositorio) == [manual['id'], agendado['id']]
+    assert repositorio.carregar(agendado['id'])['contas.json'] == dados(5)['contas.json']
+
+
+def test_faixas_mantem_o_ultimo_agendado_de_cada_hora(tmp_path, relogio):
+    repositorio = RepositorioBackup(str(tmp_path), {'horario': 2, 'diario': 0, 'semanal': 0, 'recentes': 0})
+    criados = []
+    for hora in range(3):
+        for minuto in (0, 30):
+            relogio.agora = datetime(2026, 10, 18, 10 + hora, minuto)
+            criados.append(repositorio.criar(dados(hora + 1), ORIGEM_AGENDADO)['id'])
+
+    # Das 10h só sobraria um, mas a faixa horária guarda só as 2 últimas horas
+    assert ids(repositorio) == [criados[5], criados[3]]
+
+
+def test_recentes_sao_mantidos_fora_das_faixas(tmp_path, relogio):
+    repositorio = RepositorioBackup(str(tmp_path), {'horario': 1, 'diario': 0, 'semanal': 0, 'recentes': 3})
+    criados = []
+    for minuto in range(5):
+        relogio.agora = datetime(2026, 10, 18, 12, minuto)
+        criados.append(repositorio.criar(dados(minuto), ORIGEM_AGENDADO)['id'])
+
+    assert ids(repositorio) == criados[:1:-1]
+
+
+def test_manuais_limitados_pela_quantidade(tmp_path, relogio):
+    repositorio = RepositorioBackup(str(tmp_path), {'manual': 2, 'recentes': 0})
+    criados = []
+    for minuto in range(4):
+        relogio.agora = datetime(2026, 10, 18, 12, minuto)
+        criados.append(repositorio.criar(dados(minuto), ORIGEM_MANUAL)['id'])
+
+    assert ids(repositorio) == [criados[3], criados[2]]
+
+
+def test_blocos_sem_uso_sao_apagados(tmp_path, relogio):
+    repositorio = RepositorioBackup(str(tmp_path), {'manual': 1, 'recentes': 0})
+    repositorio.criar({'contas.json': [{'id': 'a' * 40}]})
+    relogio.agora += timedelta(minutes=1)
+    ultimo = repositorio.criar({'contas.json': [{'id': 'b' * 40}]})
+
+    blocos = [p for p in (tmp_path / 'blocos').rglob('*.zz')]
+    assert len(blocos) == 1
+    assert repositorio.carregar(ultimo['id'])['contas.json'] == [{'id': 'b' * 40}]
+
+
+def test_tarefas_concluidas_sao_esquecidas(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, 'LIMITE_TAREFAS', 5)
+    repositorio = RepositorioBackup(str(tmp_path), {'manual': 1})
+    trabalhador = TrabalhadorBackup(repositorio, lambda: dados(3))
+
+    for _ in range(12):
+        trabalhador.agendar()
+        trabalhador._fila.join()
+
+    assert len(trabalhador.tarefas) == 5
+    assert list(trabalhador.tarefas) == [str(n) for n in range(8, 13)]
+    assert all(t['status'] == 'concluido' for t in trabalhador.tarefas.values())
+
+
+def test_tarefas_pendentes_nao_sao_esquecidas(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, 'LIMITE_TAREFAS', 2)
+    liberar = threading.Event()
+
+    def obter_arquivos():
+        liberar.wait(5)
+        return dados(1)
+
+    trabalhador = TrabalhadorBackup(RepositorioBackup(str(tmp_path)), obter_arquivos)
+    agendadas = [trabalhador.agendar() for _ in range(4)]
+    assert list(trabalhador.tarefas) == agendadas
+
+    liberar.set()
+    trabalhador._fila.join()
+    assert [t['status'] for t in trabalhador.tarefas.values()] == ['concluido'] * 4
+    trabalhador.agendar()
+    trabalhador._fila.join()
+    assert len(trabalhador.tarefas) == 2
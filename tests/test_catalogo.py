@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Catálogo de cortes: validação, cortes de venda dos rendimentos e arredondamento igual ao round() (precificacao.py)"""
+
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from precificacao import CatalogoCortes, arredondar_casas, catalogo
+
+PRIMAL = {
+    'chave': 'teste',
+    'nome': 'Teste',
+    'cortes': [{'chave': 'a', 'ajusteLucro': 0.1}, {'chave': 'b_e_c'}],
+    'rendimentos': [
+        {'chave': 'a', 'fracao': 0.2},
+        {'chave': 'b', 'fracao': 0.3, 'corte': 'b_e_c'},
+        {'chave': 'c', 'fracao': 0.1, 'corte': 'b_e_c'},
+        {'chave': 'osso', 'fracao': 0.15},
+    ],
+    'regras': [{'precoAte': 10, 'acrescimo': {'a': 1}}],
+}
+
+
+def catalogo_com(**alteracoes):
+    primal = copy.deepcopy(PRIMAL)
+    primal.update(alteracoes)
+    return CatalogoCortes({'arredondamento': {'casas': 2, 'modo': 'cima'}, 'primais': [primal]})
+
+
+def test_rendimentos_vendidos_pelo_corte_indicado():
+    primal = catalogo_com().primal('Teste')
+    # Sem 'corte', o rendimento é vendido pelo corte de mesma chave; o osso não é vendido
+    assert primal.fracoes_venda.tolist() == pytest.approx([0.2, 0.4])
+
+
+def test_catalogo_distribuido_vende_todos_os_rendimentos():
+    for primal in catalogo.primais.values():
+        assert primal.fracoes_venda.sum() == pytest.approx(primal.fracoes.sum()), primal.chave
+
+
+@pytest.mark.parametrize('alteracoes', [
+    {'rendimentos': [{'chave': 'a', 'fracao': 0.2, 'corte': 'inexistente'}]},
+    {'rendimentos': [{'chave': 'a', 'fracao': 0.7}, {'chave': 'b', 'fracao': 0.4}]},
+    {'rendimentos': [{'chave': 'a', 'fracao': -0.1}]},
+    {'rendimentos': [{'chave': 'a', 'fracao': 0.1}, {'chave': 'a', 'fracao': 0.1}]},
+    {'cortes': [{'chave': 'a'}, {'chave': 'a'}]},
+    {'cortes': []},
+    {'regras': [{'precoAte': 10, 'acrescimo': {'z': 1}}]},
+    {'arredondamento': {'modo': 'para_baixo'}},
+])
+def test_catalogo_invalido(alteracoes):
+    with pytest.raises(ValueError):
+        catalogo_com(**alteracoes)
+
+
+def test_primal_sem_campo_obrigatorio():
+    primal = copy.deepcopy(PRIMAL)
+    del primal['rendimentos']
+    with pytest.raises(ValueError):
+        CatalogoCortes({'primais': [primal]})
+    with pytest.raises(ValueError):
+        CatalogoCortes({'primais': [PRIMAL, PRIMAL]})
+
+
+def test_primal_pela_chave_ou_pelo_nome():
+    assert catalogo.primal('Coxão Bola') is catalogo.primal(' coxao_bola ')
+    assert catalogo.tipos() == ['Coxão Bola', 'Dianteiro', 'Traseiro']
+    with pytest.raises(ValueError):
+        catalogo.primal('Costela')
+
+
+def valores_de_meio(casas, quantidade=20000, semente=9):
+    """Valores como 49.005: o dígito depois das casas é 5 (e vizinhos de um ulp)"""
+    sorteio = random.Random(semente)
+    escala = 10 ** casas
+    meios = [(sorteio.randint(-10 ** 7, 10 ** 7) + 0.5) / escala for _ in range(quantidade)]
+    vizinhos = [float(np.nextafter(v, lado)) for lado in (np.inf, -np.inf) for v in meios[:2000]]
+    inteiros = [float(k) + 0.5 for k in range(-50, 50)]
+    return meios + vizinhos + inteiros + [0.0, -0.0, 0.005, -0.005, 1e16 + 2, 2.0 ** 53 - 1]
+
+
+@pytest.mark.parametrize('casas', [0, 1, 2, 3, 7, 9])
+def test_arredondar_casas_igual_ao_round(casas):
+    valores = valores_de_meio(casas)
+    resultado = arredondar_casas(np.array(valores), casas)
+    esperado = [round(v, casas) for v in valores]
+    # Mesmos bits, inclusive o sinal de -0.0
+    assert resultado.tobytes() == np.array(esperado, dtype=np.float64).tobytes()
+
+
+def test_arredondar_casas_em_matriz():
+    valores = np.array([[49.005, 0.125], [2.675, -1.005]])
+    assert arredondar_casas(valores, 2).tolist() == [[round(v, 2) for v in linha] for linha in valores.tolist()]
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Compressão em fluxo, negociação pelo Accept-Encoding e ETag das respostas da API (compressao.py)"""
+
+import gzip
+import json
+
+import pytest
+
+import compressao
+from compressao import TAMANHO_MINIMO, comprimir_em_fluxo, comprimir_partes, escolher_codificacao
+
+
+def partes_grandes():
+    registros = [{'id': str(i), 'descricao': f'conta {i}', 'valor': i * 1.5} for i in range(20000)]
+    return [b'{"contas":', json.dumps(registros).encode('utf-8'), b',"config":{}}']
+
+
+def test_fluxo_gzip_igual_ao_corpo_inteiro():
+    partes = partes_grandes()
+    fatias = list(comprimir_em_fluxo(partes, 'gzip', tamanho_fatia=16 * 1024))
+
+    # Uma parte de centenas de KB sai em várias fatias, não em um único bloco
+    assert len(fatias) > 2
+    assert max(len(fatia) for fatia in fatias) < len(b''.join(partes)) // 2
+    assert gzip.decompress(b''.join(fatias)) == b''.join(partes)
+    assert gzip.decompress(comprimir_partes(partes, 'gzip')) == b''.join(partes)
+
+
+def test_sem_codificacao_devolve_as_partes():
+    partes = [b'[', b'1', b']']
+    assert list(comprimir_em_fluxo(partes, None)) == partes
+
+
+def test_escolher_codificacao():
+    assert escolher_codificacao('gzip, deflate') == 'gzip'
+    assert escolher_codificacao('gzip;q=0') is None
+    assert escolher_codificacao('identity') is None
+    assert escolher_codificacao('*') == compressao.codificacoes_suportadas()[0]
+    # A preferida do servidor entre as aceitas, não a ordem do cabeçalho
+    assert escolher_codificacao('gzip;q=0.5, br') == compressao.codificacoes_suportadas()[0]
+    assert escolher_codificacao('*;q=0, gzip') == 'gzip'
+    assert escolher_codificacao('deflate, compress') is None
+    assert escolher_codificacao(None) is None
+
+
+def contas_grandes(quantidade=200):
+    return [{'id': f'c{i}', 'empresa': f'Fornecedor {i}', 'valor': i * 1.5, 'status': 'pendente',
+             'dataVencimento': '2026-10-18'} for i in range(quantidade)]
+
+
+@pytest.mark.parametrize('rota', ['/api/contas', '/api/dados'])
+def test_etag_responde_304_ate_os_dados_mudarem(cliente, rota):
+    cliente.post('/api/contas', json=contas_grandes(3))
+    primeira = cliente.get(rota)
+    etag = primeira.headers['ETag']
+    assert primeira.status_code == 200 and primeira.headers['Cache-Control'] == 'no-cache'
+
+    igual = cliente.get(rota, headers={'If-None-Match': etag})
+    assert igual.status_code == 304
+    assert igual.get_data() == b''
+    assert igual.headers['ETag'] == etag
+
+    cliente.post('/api/contas', json={'valor': 1})
+    mudou = cliente.get(rota, headers={'If-None-Match': etag})
+    assert mudou.status_code == 200
+    assert mudou.headers['ETag'] != etag
+    assert len(mudou.get_json()['contas'] if rota == '/api/dados' else mudou.get_json()) == 4
+
+
+@pytest.mark.parametrize('rota', ['/api/contas', '/api/dados'])
+def test_compressao_pelo_accept_encoding(cliente, rota):
+    cliente.post('/api/contas', json=contas_grandes())
+    sem = cliente.get(rota, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in sem.headers
+    assert 'Accept-Encoding' in sem.headers['Vary']
+    assert len(sem.get_data()) >= TAMANHO_MINIMO
+
+    com = cliente.get(rota, headers={'Accept-Encoding': 'gzip'})
+    assert com.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in com.headers['Vary']
+    corpo = com.get_data()
+    assert len(corpo) < len(sem.get_data())
+    assert json.loads(gzip.decompress(corpo)) == sem.get_json()
+
+    # Recusado com q=0: segue sem compressão
+    assert 'Content-Encoding' not in cliente.get(rota, headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+
+@pytest.mark.parametrize('rota', ['/api/contas', '/api/dados'])
+def test_corpo_pequeno_nao_e_comprimido(cliente, rota):
+    cliente.post('/api/contas', json={'valor': 1})
+    resposta = cliente.get(rota, headers={'Accept-Encoding': 'gzip'})
+    assert resposta.status_code == 200
+    assert len(resposta.get_data()) < TAMANHO_MINIMO
+    assert 'Content-Encoding' not in resposta.headers
+    assert resposta.get_json()
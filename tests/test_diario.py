@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Diário de alterações: reaplicação, linhas incompletas e compactação (diario.py)"""
+
+import json
+import os
+
+from armazenamento import ColecaoEmCache
+from diario import Diario, aplicar_operacao, diferencas, indexar_registros
+
+
+def registros(n, valor=1):
+    return [{'id': str(i), 'valor': valor * i} for i in range(n)]
+
+
+def reaplicar(dados, operacoes):
+    indice = indexar_registros(dados)
+    for operacao in operacoes:
+        aplicar_operacao(indice, operacao)
+    return list(indice.values())
+
+
+def ler_json(arquivo):
+    with open(arquivo, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_reaplicacao_chega_ao_mesmo_estado():
+    antes = registros(10)
+    depois = [r for r in registros(10) if r['id'] != '3'] + [{'id': 'novo', 'valor': 99}]
+    depois[0] = {'id': '0', 'valor': -1}
+    operacoes = diferencas(indexar_registros(antes), depois)
+    assert {op['op'] for op in operacoes} == {'put', 'del'}
+    assert sorted(reaplicar(antes, operacoes), key=lambda r: r['id']) == sorted(depois, key=lambda r: r['id'])
+
+
+def test_reaplicar_de_novo_nao_muda_o_resultado():
+    # O snapshot pode já conter parte do diário (compactação interrompida)
+    operacoes = [{'op': 'put', 'registro': {'id': 'a', 'valor': 1}}, {'op': 'del', 'id': '0'}]
+    uma_vez = reaplicar(registros(3), operacoes)
+    assert reaplicar(uma_vez, operacoes) == uma_vez
+
+
+def test_registros_sem_id_viram_set():
+    operacoes = diferencas(indexar_registros(registros(3)), [{'valor': 1}])
+    assert operacoes == [{'op': 'set', 'dados': [{'valor': 1}]}]
+
+
+def test_diario_grava_e_le_as_operacoes(tmp_path):
+    diario = Diario(str(tmp_path / 'contas.json.diario'))
+    operacoes = [
+        {'op': 'put', 'registro': {'id': 'a', 'nome': 'ação'}},
+        {'op': 'set', 'dados': registros(3)},
+        {'op': 'del', 'id': 'a'},
+    ]
+    diario.registrar(operacoes)
+    assert diario.ler() == operacoes
+
+
+def test_linha_incompleta_e_ignorada_e_cortada(tmp_path):
+    arquivo = str(tmp_path / 'contas.json.diario')
+    diario = Diario(arquivo)
+    diario.registrar([{'op': 'put', 'registro': {'id': 'a'}}])
+    with open(arquivo, 'ab') as f:
+        f.write(b'{"op":"put","regis')
+
+    assert diario.ler(reparar=False) == [{'op': 'put', 'registro': {'id': 'a'}}]
+    tamanho = os.path.getsize(arquivo)
+    assert diario.ler() == [{'op': 'put', 'registro': {'id': 'a'}}]
+    assert os.path.getsize(arquivo) < tamanho
+
+    # O próximo acréscimo começa em uma linha nova
+    diario.registrar([{'op': 'del', 'id': 'a'}])
+    assert diario.ler() == [{'op': 'put', 'registro': {'id': 'a'}}, {'op': 'del', 'id': 'a'}]
+
+
+def test_colecao_com_diario_reabre_com_as_alteracoes(tmp_path):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_diario=True)
+    colecao.salvar(registros(5))
+    colecao.compactar()
+    colecao.inserir({'id': 'x', 'valor': 7})
+    colecao.atualizar('1', {'valor': 100})
+    colecao.remover('2')
+
+    # As alterações foram só acrescentadas ao diário
+    assert ler_json(arquivo) == registros(5)
+    assert len(Diario(arquivo + '.diario').ler()) == 3
+
+    reaberta = ColecaoEmCache(arquivo, usar_diario=True)
+    assert reaberta.obter() == colecao.obter()
+    assert reaberta.obter_registro('1')['valor'] == 100
+    assert reaberta.obter_registro('2') is None
+
+
+def test_compactacao_incorpora_o_diario_ao_snapshot(tmp_path):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_diario=True)
+    colecao.salvar(registros(5))
+    colecao.inserir({'id': 'x', 'valor': 7})
+    colecao.remover('0')
+    esperado = colecao.obter()
+
+    assert colecao.compactar()
+    assert os.path.getsize(arquivo + '.diario') == 0
+    assert ler_json(arquivo) == esperado
+    assert ColecaoEmCache(arquivo, usar_diario=True).obter() == esperado
+
+
+def test_compactacao_em_segundo_plano_pelo_limite(tmp_path):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_diario=True, limite_diario=200)
+    for i in range(20):
+        colecao.inserir({'id': str(i), 'valor': i})
+    colecao.fechar()
+
+    # Parte do diário já foi incorporada ao snapshot
+    assert ler_json(arquivo)
+    assert ColecaoEmCache(arquivo, usar_diario=True).obter() == colecao.obter()
+
+
+def test_diario_deixado_e_incorporado_sem_o_modo_ativo(tmp_path):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_diario=True)
+    colecao.salvar(registros(3))
+    colecao.inserir({'id': 'x', 'valor': 7})
+
+    sem_diario = ColecaoEmCache(arquivo)
+    assert sem_diario.obter() == colecao.obter()
+    assert not os.path.exists(arquivo + '.diario')
+    assert ler_json(arquivo) == colecao.obter()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""Simulação em grade e margem mínima iguais à precificação ponto a ponto (precificacao.py)"""
+
+import json
+import math
+
+import numpy as np
+import pytest
+
+import precificacao
+from precificacao import ARQUIVO_CATALOGO, eixo_grade, lucro_minimo, precificar_lote, simular_grade
+
+with open(ARQUIVO_CATALOGO, encoding='utf-8') as f:
+    CATALOGO = {primal['chave']: primal for primal in json.load(f)['primais']}
+
+TIPOS = sorted(CATALOGO)
+
+
+def lucro_venda(tipo, precos_cortes, peso, preco):
+    """Venda de cada rendimento pelo preço do seu corte menos o custo da peça"""
+    primal = CATALOGO[tipo]
+    chaves = [corte['chave'] for corte in primal['cortes']]
+    venda = sum(
+        precos_cortes[chaves.index(r.get('corte', r['chave']))] * r['fracao'] * peso
+        for r in primal['rendimentos'] if r.get('corte', r['chave']) in chaves
+    )
+    return round(venda - peso * preco, 2)
+
+
+@pytest.mark.parametrize('tipo', TIPOS)
+def test_grade_igual_a_precificacao_de_cada_ponto(tipo):
+    peso = 87.3
+    precos, perdas, lucros = [9.99, 12, 12.01, 21.9], [0, 27, 33.3], [0, 25, 40, 55.5]
+    grade = simular_grade(tipo, peso, precos, perdas, lucros)
+    assert grade['precos'].shape[:3] == grade['lucro'].shape == (4, 3, 4)
+
+    pontos = [(p, l, m) for p in precos for l in perdas for m in lucros]
+    preco, perda, lucro = (np.array(coluna, dtype=float) for coluna in zip(*pontos))
+    lote = precificar_lote(tipo, np.full(len(pontos), peso), preco, perda, lucro)
+    for i, (p, l, m) in enumerate(pontos):
+        indice = (precos.index(p), perdas.index(l), lucros.index(m))
+        assert tuple(grade['precos'][indice]) == lote['precos'][i].tolist(), (p, l, m)
+        # A ordem da soma pode mudar o centavo arredondado
+        assert grade['lucro'][indice] == pytest.approx(lucro_venda(tipo, grade['precos'][indice], peso, p), abs=0.0101)
+
+
+def test_grade_em_varios_blocos(monkeypatch):
+    eixos = ({'de': 10, 'ate': 20, 'passo': 0.25}, [20, 27], {'de': 0, 'ate': 60, 'passo': 5})
+    inteira = simular_grade('traseiro', 100, *eixos)
+    monkeypatch.setattr(precificacao, 'PONTOS_POR_BLOCO', 7)
+    em_blocos = simular_grade('traseiro', 100, *eixos)
+    assert np.array_equal(inteira['precos'], em_blocos['precos'])
+    assert np.array_equal(inteira['lucro'], em_blocos['lucro'])
+
+
+def test_eixos_da_grade():
+    assert eixo_grade('preco', 12.5).tolist() == [12.5]
+    assert eixo_grade('preco', [1, 2]).tolist() == [1, 2]
+    # Intervalo inclusivo, sem resíduos de ponto flutuante
+    assert eixo_grade('preco', {'de': 0.1, 'ate': 0.5, 'passo': 0.1}).tolist() == [0.1, 0.2, 0.3, 0.4, 0.5]
+    assert eixo_grade('preco', {'de': 1, 'ate': 1, 'passo': 1}).tolist() == [1]
+
+
+@pytest.mark.parametrize('valor', [[], {'de': 1, 'ate': 2}, {'de': 1, 'ate': 2, 'passo': 0},
+                                   {'de': 2, 'ate': 1, 'passo': 1}, {'de': 0, 'ate': 1e9, 'passo': 1e-3},
+                                   ['a'], {'de': 'x', 'ate': 1, 'passo': 1}])
+def test_eixo_invalido(valor):
+    with pytest.raises(ValueError):
+        eixo_grade('preco', valor)
+
+
+def test_limite_de_pontos(monkeypatch):
+    monkeypatch.setattr(precificacao, 'LIMITE_PONTOS_GRADE', 100)
+    with pytest.raises(ValueError):
+        simular_grade('traseiro', 100, list(range(1, 6)), list(range(5)), list(range(5)))
+    with pytest.raises(ValueError):
+        lucro_minimo('traseiro', 100, list(range(1, 12)), list(range(10)), 50)
+
+
+def lucro_em(tipo, peso, preco, perdas, margem):
+    return simular_grade(tipo, peso, [preco], [perdas], [margem])['lucro'][0, 0, 0]
+
+
+@pytest.mark.parametrize('tipo', TIPOS)
+def test_margem_minima_e_a_menor_que_alcanca_o_alvo(tipo):
+    peso, precos, perdas, alvo = 100, [10, 18.5, 25], [0, 27], 800
+    minimo = lucro_minimo(tipo, peso, precos, perdas, alvo)['lucroMinimo']
+    assert minimo.shape == (3, 2)
+    for i, preco in enumerate(precos):
+        for j, perda in enumerate(perdas):
+            margem = minimo[i, j]
+            assert lucro_em(tipo, peso, preco, perda, margem) >= alvo
+            if margem > 0:
+                assert lucro_em(tipo, peso, preco, perda, round(margem - 0.01, 2)) < alvo
+
+
+def test_alvo_ja_alcancado_sem_margem():
+    lucro_sem_margem = lucro_em('traseiro', 100, 20, 27, 0)
+    minimo = lucro_minimo('traseiro', 100, [20], [27], lucro_sem_margem)['lucroMinimo']
+    assert minimo.tolist() == [[0]]
+    assert lucro_minimo('traseiro', 100, [20], [27], -1e9)['lucroMinimo'].tolist() == [[0]]
+
+
+def test_alvo_igual_ao_lucro_de_uma_margem():
+    # O lucro só muda nos degraus do arredondamento: a margem mínima é o
+    # início do degrau que contém 40%, e o alvo conta como alcançado
+    alvo = lucro_em('dianteiro', 50, 22, 27, 40)
+    margem = lucro_minimo('dianteiro', 50, [22], [27], alvo)['lucroMinimo'][0, 0]
+    assert 0 < margem <= 40
+    assert lucro_em('dianteiro', 50, 22, 27, margem) == alvo
+    assert lucro_em('dianteiro', 50, 22, 27, round(margem - 0.01, 2)) < alvo
+
+
+def test_alvo_impossivel_fica_vazio():
+    lucro_maximo = lucro_em('coxao_bola', 100, 20, 27, precificacao.LUCRO_MAXIMO_BUSCA)
+    minimo = lucro_minimo('coxao_bola', 100, [20, 30], [27], lucro_maximo + 0.01)['lucroMinimo']
+    assert math.isnan(minimo[0, 0])
+    # Com um preço de compra maior o mesmo alvo é alcançável
+    assert minimo[1, 0] <= precificacao.LUCRO_MAXIMO_BUSCA
+
+
+def test_grade_da_api(cliente):
+    corpo = {'tipo': 'Traseiro', 'peso': 100, 'preco': {'de': 20, 'ate': 21, 'passo': 0.5},
+             'media_perdas': [27], 'media_lucro': [30, 40], 'cortes': ['picanha'], 'lucro_alvo': 1e9}
+    resposta = cliente.post('/api/precificar/grade', json=corpo)
+    assert resposta.status_code == 200
+    dados = resposta.get_json()
+    grade = simular_grade('traseiro', 100, [20, 20.5, 21], [27], [30, 40])
+    assert dados['pontos'] == 6
+    assert dados['eixos'] == {'preco': [20, 20.5, 21], 'media_perdas': [27], 'media_lucro': [30, 40]}
+    assert dados['lucroTotal'] == grade['lucro'].tolist()
+    assert list(dados['precos']) == ['picanha']
+    assert dados['lucroMinimo'] == [[None], [None], [None]]
+
+
+@pytest.mark.parametrize('corpo', [
+    {'tipo': 'Traseiro', 'peso': 100},
+    {'tipo': 'Costela', 'peso': 100, 'preco': 20},
+    {'tipo': 'Traseiro', 'peso': 100, 'preco': 20, 'cortes': ['inexistente']},
+    {'tipo': 'Traseiro', 'peso': 100, 'preco': {'de': 1, 'ate': 0, 'passo': 1}},
+    {'tipo': 'Traseiro', 'peso': 'muito', 'preco': 20},
+])
+def test_grade_invalida_responde_400(cliente, corpo):
+    resposta = cliente.post('/api/precificar/grade', json=corpo)
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Gravação em grupo: escritores simultâneos, ordem, durabilidade e desfazer em falhas (gravacao.py)"""
+
+import threading
+import time
+
+import pytest
+
+import armazenamento
+from agregados import AgregadosContas
+from armazenamento import ColecaoEmCache
+from gravacao import FilaGravacao
+
+
+def escrever_em_paralelo(quantidade, escrever):
+    inicio = threading.Barrier(quantidade)
+    erros = []
+
+    def executar(i):
+        inicio.wait()
+        try:
+            escrever(i)
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=executar, args=(i,)) for i in range(quantidade)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return erros
+
+
+def test_escritores_simultaneos_compartilham_grupos():
+    grupos = []
+
+    def gravar(operacoes):
+        grupos.append(list(operacoes))
+        # Enquanto um grupo grava, os demais escritores se acumulam na fila
+        time.sleep(0.005)
+
+    fila = FilaGravacao(gravar)
+    assert escrever_em_paralelo(32, lambda i: fila.aguardar(fila.enfileirar([i, -i]))) == []
+
+    gravadas = [operacao for grupo in grupos for operacao in grupo]
+    assert sorted(gravadas) == sorted([i for i in range(32)] + [-i for i in range(32)])
+    # As operações de um pedido ficam juntas e na ordem enfileirada
+    for grupo in grupos:
+        assert all(grupo[j] == -grupo[j + 1] for j in range(0, len(grupo), 2))
+    assert fila.pedidos == 32
+    assert fila.grupos == len(grupos) < 32
+    assert not fila.ocupada()
+
+
+def test_ordem_da_fila_e_a_ordem_de_gravacao():
+    gravadas = []
+    fila = FilaGravacao(gravadas.extend)
+    pedidos = [fila.enfileirar([i]) for i in range(5)]
+    assert fila.pendentes() == [0, 1, 2, 3, 4]
+    # Quem chega primeiro ao aguardar leva o grupo inteiro
+    fila.aguardar(pedidos[3])
+    assert gravadas == [0, 1, 2, 3, 4]
+    assert all(pedido.concluido for pedido in pedidos)
+    assert (fila.pedidos, fila.grupos) == (5, 1)
+    fila.aguardar(pedidos[0])
+
+
+def test_erro_chega_a_todos_os_pedidos_do_grupo():
+    falhar = [True]
+
+    def gravar(operacoes):
+        if falhar[0]:
+            raise OSError('disco cheio')
+
+    fila = FilaGravacao(gravar)
+    primeiro, segundo = fila.enfileirar(['a']), fila.enfileirar(['b'])
+    with pytest.raises(OSError):
+        fila.aguardar(primeiro)
+    with pytest.raises(OSError):
+        fila.aguardar(segundo)
+
+    falhar[0] = False
+    fila.aguardar(fila.enfileirar(['c']))
+    assert (fila.pedidos, fila.grupos) == (3, 2)
+
+
+@pytest.mark.parametrize('usar_diario', [True, False])
+def test_insercoes_simultaneas_persistem_na_ordem(tmp_path, usar_diario):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_diario=usar_diario)
+    colecao.salvar([])
+    erros = escrever_em_paralelo(24, lambda i: colecao.inserir({'id': f'r{i}', 'valor': i}))
+    assert erros == []
+    assert colecao.fila.grupos <= colecao.fila.pedidos
+
+    # Depois da gravação, outra instância lê do disco o mesmo estado e ordem
+    reaberta = ColecaoEmCache(arquivo, usar_diario=usar_diario)
+    assert reaberta.obter() == colecao.obter()
+    assert len(reaberta.obter()) == 24
+
+
+def falhar_gravacao(monkeypatch, colecao):
+    def falhar(*args, **kwargs):
+        raise OSError('disco cheio')
+    if colecao.diario is not None:
+        monkeypatch.setattr(colecao.diario, 'registrar', falhar)
+    else:
+        monkeypatch.setattr(armazenamento, 'substituir_arquivo_atomicamente', falhar)
+
+
+@pytest.mark.parametrize('usar_diario', [True, False])
+def test_gravacao_falha_desfaz_a_alteracao_em_memoria(tmp_path, monkeypatch, usar_diario):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_diario=usar_diario)
+    agregados = AgregadosContas()
+    colecao.adicionar_ouvinte(agregados)
+    inicial = [{'id': 'a', 'valor': 10, 'status': 'pago'}]
+    assert colecao.salvar(inicial)
+    versao = colecao.versao
+
+    with monkeypatch.context() as m:
+        falhar_gravacao(m, colecao)
+        with pytest.raises(OSError):
+            colecao.inserir({'id': 'b', 'valor': 5, 'status': 'à pagar'})
+        with pytest.raises(OSError):
+            colecao.atualizar('a', {'valor': 99})
+        with pytest.raises(OSError):
+            colecao.remover('a')
+        assert colecao.salvar([{'id': 'c'}]) is False
+
+    assert colecao.obter() == inicial
+    assert colecao.obter_registro('b') is None
+    assert colecao.versao > versao
+    assert agregados.resumo('2026-10', '2026-10-18')['porStatus'] == {'pago': {'quantidade': 1, 'valor': 10}}
+
+    # Uma gravação que funciona depois da falha não traz de volta o que falhou
+    colecao.inserir({'id': 'd', 'valor': 1})
+    assert [r['id'] for r in ColecaoEmCache(arquivo, usar_diario=usar_diario).obter()] == ['a', 'd']
+
+
+def test_falha_mantem_as_operacoes_ainda_na_fila(tmp_path, monkeypatch):
+    colecao = ColecaoEmCache(str(tmp_path / 'contas.json'), usar_diario=True)
+    colecao.salvar([{'id': 'a'}])
+    registrar = colecao.diario.registrar
+    chamadas = []
+    seguinte = []
+
+    def registrar_uma_falha(operacoes):
+        chamadas.append(operacoes)
+        if len(chamadas) == 1:
+            # Outro escritor enfileira enquanto este grupo é gravado
+            seguinte.append(colecao.fila.enfileirar([{'op': 'put', 'registro': {'id': 'b'}}]))
+            with colecao._lock:
+                colecao._indice['b'] = {'id': 'b'}
+                colecao._alterado()
+            raise OSError('disco cheio')
+        registrar(operacoes)
+
+    monkeypatch.setattr(colecao.diario, 'registrar', registrar_uma_falha)
+    with pytest.raises(OSError):
+        colecao.inserir({'id': 'x'})
+    # 'x' falhou; 'b' ainda está na fila e continua visível
+    assert [r['id'] for r in colecao.obter()] == ['a', 'b']
+    colecao.fila.aguardar(seguinte[0])
+    assert [r['id'] for r in ColecaoEmCache(colecao.arquivo, usar_diario=True).obter()] == ['a', 'b']
+
+
+def test_ouvinte_com_erro_desfaz_a_alteracao(tmp_path):
+    class OuvinteFalho:
+        def reiniciar(self, indice):
+            pass
+
+        def alterar(self, chave, anterior, novo):
+            if novo and novo.get('quebrar'):
+                raise ValueError('registro inválido')
+
+    colecao = ColecaoEmCache(str(tmp_path / 'contas.json'), usar_diario=True)
+    colecao.salvar([{'id': 'a'}])
+    colecao.adicionar_ouvinte(OuvinteFalho())
+    with pytest.raises(ValueError):
+        colecao.inserir({'id': 'b', 'quebrar': True})
+    with pytest.raises(ValueError):
+        colecao.atualizar('a', {'quebrar': True})
+    assert colecao.obter() == [{'id': 'a'}]
+    assert not colecao.fila.ocupada()
+    assert colecao.inserir({'id': 'c'})['id'] == 'c'
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Importação de extratos CSV/NDJSON (importacao.py)"""
+
+import io
+
+import pytest
+
+import importacao
+from importacao import ImportacaoEntradas, ler_tipo, ler_valor
+
+
+def test_csv_com_taxas_e_rejeitados():
+    csv = ('data;valor;forma de pagamento\n'
+           '18/10/2026;1.234,56;Crédito\n'
+           '2026-10-18;10;PIX\n'
+           '2026-10-18;abc;Pix\n'
+           '2026-10-18;5;Cheque\n').encode('utf-8')
+    importacao_ = ImportacaoEntradas()
+    entradas = importacao_.ler(io.BytesIO(csv))
+
+    assert [(e['dataEntrada'], e['valorBruto'], e['tipoEntrada']) for e in entradas] == [
+        ('2026-10-18', 1234.56, 'Crédito'), ('2026-10-18', 10.0, 'Pix')]
+    assert entradas[0]['valorCalculado'] == pytest.approx(1234.56 * 0.965)
+    assert importacao_.total_rejeitados == 2
+
+
+def test_ndjson_ids_de_transacoes_iguais_sao_distintos():
+    ndjson = b'{"data": "2026-10-18", "valor": 10, "tipo": "pix"}\n' * 2
+    entradas = ImportacaoEntradas().ler(io.BytesIO(ndjson))
+    assert len({e['id'] for e in entradas}) == 2
+
+
+@pytest.mark.parametrize('texto, numero', [
+    ('1.234,56', 1234.56), ('1,234.56', 1234.56), ('R$ 10,5', 10.5), ('7', 7.0)])
+def test_ler_valor(texto, numero):
+    assert ler_valor(texto) == numero
+
+
+def test_formas_vistas_ficam_na_importacao():
+    tabela = dict(importacao._CODIGOS_TIPO)
+    vistos = {}
+    assert ler_tipo('  CRÉDITO ', vistos) == ler_tipo('credito')
+    assert '  CRÉDITO ' in vistos
+    with pytest.raises(ValueError):
+        ler_tipo('lixo', vistos)
+
+    assert 'lixo' not in vistos
+    assert dict(importacao._CODIGOS_TIPO) == tabela
+    with pytest.raises(TypeError):
+        importacao._CODIGOS_TIPO['novo'] = 0
+
+
+def test_importacoes_nao_compartilham_formas_vistas():
+    primeira, segunda = ImportacaoEntradas(), ImportacaoEntradas()
+    primeira.ler(io.BytesIO(b'data,valor,tipo\n2026-10-18,1,DINHEIRO\n'))
+    assert 'DINHEIRO' in primeira._tipos_vistos
+    assert segunda._tipos_vistos == {}
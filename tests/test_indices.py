@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Índices de consulta: caminho escolhido e resultados iguais a um filtro linear (indices.py)"""
+
+import random
+
+from agregados import data_valida
+from armazenamento import ColecaoEmCache
+from indices import IndiceColecao
+
+
+class IndiceContado(IndiceColecao):
+    """Conta as posições calculadas: o caminho pelo conjunto do filtro calcula uma por candidato"""
+
+    calculadas = 0
+
+    def _posicao(self, chave, registro):
+        self.calculadas += 1
+        return super()._posicao(chave, registro)
+
+
+def indice_com_status(quantidade, status):
+    indice = IndiceContado('dataVencimento', ['status'])
+    indice.reiniciar({
+        str(i): {'id': str(i), 'status': status(i), 'dataVencimento': f'2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}'}
+        for i in range(quantidade)
+    })
+    indice.calculadas = 0
+    return indice
+
+
+def test_filtro_amplo_percorre_a_ordem_por_data():
+    # 30% dos registros casam: a página sai das primeiras posições por data,
+    # sem montar e ordenar todo o conjunto do filtro
+    indice = indice_com_status(2000, lambda i: 'pago' if i % 10 < 3 else 'à pagar')
+    pagina = indice.consultar({'status': 'pago'}, limite=10)
+    assert len(pagina['itens']) == 10
+    assert indice.calculadas == 0
+
+
+def test_filtro_seletivo_parte_do_conjunto():
+    indice = indice_com_status(2000, lambda i: 'cancelado' if i % 400 == 0 else 'pago')
+    pagina = indice.consultar({'status': 'cancelado'}, limite=10)
+    assert sorted(int(r['id']) for r in pagina['itens']) == [0, 400, 800, 1200, 1600]
+    assert indice.calculadas == 5
+
+
+def filtro_linear(registros, filtros, de, ate, ordem):
+    """Mesma consulta percorrendo todos os registros"""
+    posicoes = []
+    for chave, registro in registros.items():
+        data = data_valida(registro.get('dataVencimento')) or ''
+        if all(registro.get(campo) == valor for campo, valor in filtros.items()) \
+                and (not de or data >= de) and (not ate or data <= ate):
+            posicoes.append(((data, chave), registro))
+    posicoes.sort(key=lambda item: item[0], reverse=ordem == 'desc')
+    return [registro for _, registro in posicoes]
+
+
+def paginar(indice, limite, **parametros):
+    """Todos os registros da consulta seguindo proximoCursor"""
+    itens, cursor = [], None
+    while True:
+        pagina = indice.consultar(limite=limite, cursor=cursor, **parametros)
+        itens.extend(pagina['itens'])
+        cursor = pagina['proximoCursor']
+        if cursor is None:
+            return itens
+
+
+CONSULTAS = [
+    {},
+    {'filtros': {'status': 'pago'}},
+    {'filtros': {'status': 'à pagar', 'empresa': 'E1'}},
+    {'filtros': {'empresa': 'E3'}, 'ordem': 'desc'},
+    {'de': '2026-03-01', 'ate': '2026-06-15'},
+    {'filtros': {'status': 'cancelado'}, 'de': '2026-02-01', 'ordem': 'desc'},
+    {'filtros': {'status': 'inexistente'}},
+    {'de': '2027-01-01'},
+]
+
+
+def conferir(colecao, indice):
+    for consulta in CONSULTAS:
+        esperado = filtro_linear(colecao._indice, consulta.get('filtros', {}), consulta.get('de'),
+                                 consulta.get('ate'), consulta.get('ordem', 'asc'))
+        for limite in (1, 7, 1000):
+            assert paginar(indice, limite, **consulta) == esperado, (consulta, limite)
+
+
+def test_consultas_iguais_ao_filtro_linear_apos_alteracoes(tmp_path):
+    sorteio = random.Random(5)
+
+    def registro(i):
+        return {
+            'id': f'r{i}',
+            'status': sorteio.choice(['pago', 'à pagar', 'à pagar', 'cancelado', None]),
+            'empresa': sorteio.choice(['E1', 'E2', 'E3']),
+            # Datas repetidas, ausentes e inválidas ficam no início da ordem
+            'dataVencimento': sorteio.choice([f'2026-{sorteio.randint(1, 12):02d}-{sorteio.randint(1, 28):02d}',
+                                              '2026-05-05', None, '05/05/2026']),
+        }
+
+    colecao = ColecaoEmCache(str(tmp_path / 'contas.json'), usar_diario=True)
+    indice = colecao.criar_indice('dataVencimento', ['status', 'empresa'])
+    colecao.salvar([registro(i) for i in range(300)])
+    conferir(colecao, indice)
+
+    for i in range(300, 400):
+        colecao.inserir(registro(i))
+    for i in sorteio.sample(range(400), 80):
+        colecao.atualizar(f'r{i}', {k: v for k, v in registro(i).items() if k != 'id'})
+    for i in sorteio.sample(range(400), 60):
+        colecao.remover(f'r{i}')
+    conferir(colecao, indice)
+
+    # Lista inteira gravada de novo: índices reconstruídos
+    colecao.salvar([registro(i) for i in range(500, 650)] + list(colecao.obter())[:50])
+    conferir(colecao, indice)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Instantâneo binário: ida e volta dos registros e recarga da coleção (instantaneo.py)"""
+
+import json
+import os
+
+from armazenamento import ColecaoEmCache, assinatura_arquivo
+from instantaneo import abrir_instantaneo, gravar_instantaneo
+
+REGISTROS = [
+    {'id': 'a1', 'valor': 10, 'status': 'pago', 'dataVencimento': '2026-10-01'},
+    {'id': 'a2', 'valor': 12.5, 'status': 'à pagar', 'dataVencimento': '2026-10-02'},
+    {'id': 'a3', 'valor': 2 ** 70, 'status': 'pago', 'dataVencimento': None},
+    {'id': 'b1', 'valorCalculado': 3.25, 'tags': ['x', 'y'], 'extra': {'nota': 'com\x00nulo'}},
+    {'id': 'b2', 'valorCalculado': -1, 'tags': [], 'extra': {}},
+    {},
+]
+
+
+def gravar_e_abrir(tmp_path, registros, origem=('snap', 1)):
+    arquivo = str(tmp_path / 'contas.json.instantaneo')
+    corpo = json.dumps(registros, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    gravar_instantaneo(arquivo, registros, origem, corpo)
+    return abrir_instantaneo(arquivo, origem), corpo
+
+
+def test_ida_e_volta_dos_registros(tmp_path):
+    instantaneo, corpo = gravar_e_abrir(tmp_path, REGISTROS)
+    try:
+        assert instantaneo.contagem == len(REGISTROS)
+        assert instantaneo.corpo_json() == corpo
+        registros = instantaneo.registros()
+        assert registros == REGISTROS
+        # Inteiros e reais continuam com o mesmo tipo
+        assert [type(r.get('valor')) for r in registros[:3]] == [int, float, int]
+        assert type(registros[4]['valorCalculado']) is int
+    finally:
+        instantaneo.fechar()
+
+
+def test_listas_e_objetos_nao_sao_compartilhados(tmp_path):
+    registros = [{'id': str(i), 'tags': ['x']} for i in range(3)]
+    instantaneo, _ = gravar_e_abrir(tmp_path, registros)
+    try:
+        montados = instantaneo.registros()
+    finally:
+        instantaneo.fechar()
+    montados[0]['tags'].append('y')
+    assert montados[1]['tags'] == ['x']
+
+
+def test_lista_vazia(tmp_path):
+    instantaneo, _ = gravar_e_abrir(tmp_path, [])
+    try:
+        assert instantaneo.contagem == 0
+        assert instantaneo.registros() == []
+    finally:
+        instantaneo.fechar()
+
+
+def test_origem_diferente_e_ignorada(tmp_path):
+    gravar_e_abrir(tmp_path, REGISTROS, origem=('snap', 1))
+    assert abrir_instantaneo(str(tmp_path / 'contas.json.instantaneo'), ('snap', 2)) is None
+    assert abrir_instantaneo(str(tmp_path / 'inexistente.instantaneo'), ('snap', 1)) is None
+
+
+def test_colecao_recarrega_do_instantaneo(tmp_path):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_diario=True, usar_instantaneo=True)
+    colecao.salvar(REGISTROS[:3])
+    colecao.inserir({'id': 'x', 'valor': 7})
+    colecao.fechar()
+    assert os.path.exists(arquivo + '.instantaneo')
+
+    reaberta = ColecaoEmCache(arquivo, usar_diario=True, usar_instantaneo=True)
+    assert reaberta.contagem() == 4
+    # Aberta do instantâneo: os registros ainda não foram montados
+    assert reaberta._pendente is not None
+    assert json.loads(reaberta.obter_bytes()) == colecao.obter()
+    assert reaberta.obter() == colecao.obter()
+    reaberta.fechar()
+
+
+def test_json_alterado_invalida_o_instantaneo(tmp_path):
+    arquivo = str(tmp_path / 'contas.json')
+    colecao = ColecaoEmCache(arquivo, usar_instantaneo=True)
+    colecao.salvar(REGISTROS[:2])
+    colecao.fechar()
+    instantaneo = abrir_instantaneo(arquivo + '.instantaneo', assinatura_arquivo(arquivo))
+    assert instantaneo is not None
+    instantaneo.fechar()
+
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        json.dump([{'id': 'novo'}], f)
+    reaberta = ColecaoEmCache(arquivo, usar_instantaneo=True)
+    assert reaberta.obter() == [{'id': 'novo'}]
+    reaberta.fechar()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Leitura e escrita de JSON em blocos iguais às do módulo json (json_em_blocos.py)"""
+
+import io
+import json
+
+import pytest
+
+from json_em_blocos import carregar, serializar
+
+DOCUMENTOS = [
+    [],
+    {},
+    0,
+    -12.5e-3,
+    'texto',
+    None,
+    [1, 22, 333, 4444.5, -0.25, 1e21, 12345678901234567890],
+    [{'id': 'a1', 'valor': 1234.56, 'descrição': 'maçã "verde" \\ ñ 😀', 'ok': True, 'nada': None},
+     {'id': 'a2', 'valor': -7, 'tags': ['x', [], [1, [2, [3]]]], 'extra': {'aninhado': {'n': 10}}}],
+    {'contas': [{'id': str(i), 'valor': i * 1.5} for i in range(50)], 'config': {'empresa': 'Açougue'},
+     'total': 75, 'vazio': [], 'listas': [[1, 2], [3]]},
+]
+
+
+def texto_espacado(documento):
+    # Espaços e quebras em todo lugar permitido, como em arquivos editados à mão
+    return json.dumps(documento, ensure_ascii=False, indent=3).replace(': ', ' :\n ').replace(',\n', ' \n,\t')
+
+
+@pytest.mark.parametrize('tamanho_bloco', [1, 2, 3, 5, 7, 64, 65536])
+@pytest.mark.parametrize('documento', DOCUMENTOS)
+def test_carregar_igual_a_json_loads(documento, tamanho_bloco):
+    for texto in (json.dumps(documento), json.dumps(documento, ensure_ascii=False), texto_espacado(documento)):
+        corpo = texto.encode('utf-8')
+        assert carregar(io.BytesIO(corpo), tamanho_bloco) == json.loads(corpo)
+
+
+@pytest.mark.parametrize('tamanho_bloco', range(1, 12))
+def test_numero_cortado_entre_blocos(tamanho_bloco):
+    corpo = b'[123456789, 0.000123, -98765.4321e2, 7]'
+    resultado = carregar(io.BytesIO(corpo), tamanho_bloco)
+    assert resultado == json.loads(corpo)
+    assert [type(valor) for valor in resultado] == [int, float, float, int]
+
+
+def test_registros_compartilham_as_chaves():
+    corpo = json.dumps([{'valor': i} for i in range(3)]).encode('utf-8')
+    registros = carregar(io.BytesIO(corpo), 4)
+    assert len({id(next(iter(registro))) for registro in registros}) == 1
+
+
+@pytest.mark.parametrize('corpo', [b'', b'   ', b'[1, 2', b'[1 2]', b'{"a": 1,}', b'[1]]', b'{"a" 1}', b'{1: 2}'])
+def test_json_invalido_como_json_loads(corpo):
+    with pytest.raises(ValueError):
+        json.loads(corpo)
+    with pytest.raises(ValueError):
+        carregar(io.BytesIO(corpo), 2)
+
+
+@pytest.mark.parametrize('registros_por_bloco', [1, 2, 3, 500])
+@pytest.mark.parametrize('documento', DOCUMENTOS)
+def test_serializar_igual_a_json_dumps(documento, registros_por_bloco):
+    compacto = b''.join(serializar(documento, registros_por_bloco=registros_por_bloco))
+    assert compacto == json.dumps(documento, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    indentado = b''.join(serializar(documento, indent=2, registros_por_bloco=registros_por_bloco))
+    assert indentado == json.dumps(documento, ensure_ascii=False, indent=2).encode('utf-8')
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Partições por loja: descarregamento, reabertura e consolidação (lojas.py)"""
+
+import os
+import threading
+
+import armazenamento
+from armazenamento import ler_colecao_somente_leitura
+from lojas import (
+    LOJA_PRINCIPAL, ConsolidacaoLojas, Loja, ParticoesLojas, abrir_deposito, parciais_do_disco
+)
+
+OPCOES = dict(usar_diario=True, limite_diario=1024 * 1024, usar_instantaneo=True)
+
+
+def montar(tmp_path, limite_abertas=1, **opcoes):
+    opcoes = dict(OPCOES, **opcoes)
+    principal_dir = tmp_path / 'principal'
+    principal_dir.mkdir()
+    principal = Loja(LOJA_PRINCIPAL, str(principal_dir), abrir_deposito(str(principal_dir), **opcoes), 100)
+
+    def abrir(id_loja, diretorio):
+        return Loja(id_loja, diretorio, abrir_deposito(diretorio, **opcoes), 100)
+
+    return ParticoesLojas(str(tmp_path / 'lojas'), abrir, principal, limite_abertas=limite_abertas)
+
+
+def conta(id_conta, valor=10.0, status='pendente'):
+    return {'id': id_conta, 'valor': valor, 'status': status, 'dataVencimento': '2026-10-18'}
+
+
+def ids_no_disco(particoes, id_loja):
+    arquivo = os.path.join(particoes.diretorio(id_loja), 'contas.json')
+    return sorted(r['id'] for r in ler_colecao_somente_leitura(arquivo, usar_diario=True))
+
+
+def test_loja_descarregada_reabre_com_os_dados(tmp_path):
+    particoes = montar(tmp_path)
+    particoes.criar('norte')
+    loja = particoes.emprestar('norte')
+    loja.deposito.contas.inserir(conta('a'))
+    particoes.devolver(loja)
+    assert particoes.abertas() == [LOJA_PRINCIPAL]
+    assert particoes.descarregamentos == 1
+
+    loja = particoes.emprestar('norte')
+    try:
+        assert loja.deposito.contas.obter_registro('a')['valor'] == 10.0
+    finally:
+        particoes.devolver(loja)
+
+
+def test_loja_em_uso_nao_e_descarregada(tmp_path):
+    particoes = montar(tmp_path)
+    for id_loja in ('norte', 'sul'):
+        particoes.criar(id_loja)
+    norte = particoes.emprestar('norte')
+    sul = particoes.emprestar('sul')
+    assert set(particoes.abertas()) == {LOJA_PRINCIPAL, 'norte', 'sul'}
+    particoes.devolver(sul)
+    assert set(particoes.abertas()) == {LOJA_PRINCIPAL, 'norte'}
+    particoes.devolver(norte)
+    assert particoes.abertas() == [LOJA_PRINCIPAL]
+
+
+def test_reabertura_espera_a_compactacao_da_loja_descarregada(tmp_path, monkeypatch):
+    particoes = montar(tmp_path, limite_diario=1)
+    particoes.criar('norte')
+    contas_norte = os.path.join(particoes.diretorio('norte'), 'contas.json')
+
+    # Segura a primeira compactação do contas.json da loja no meio da escrita
+    comecou, liberar = threading.Event(), threading.Event()
+    original = armazenamento.substituir_arquivo_atomicamente
+
+    def substituir(arquivo, conteudo, fsync=True):
+        compactando = threading.current_thread().name.startswith('compactar-')
+        if arquivo == contas_norte and compactando and not comecou.is_set():
+            comecou.set()
+            liberar.wait(5)
+        return original(arquivo, conteudo, fsync=fsync)
+
+    monkeypatch.setattr(armazenamento, 'substituir_arquivo_atomicamente', substituir)
+
+    loja = particoes.emprestar('norte')
+    loja.deposito.contas.inserir(conta('a'))
+    assert comecou.wait(5)
+
+    descarregar = threading.Thread(target=particoes.devolver, args=(loja,))
+    descarregar.start()
+
+    reaberta = []
+    reabrir = threading.Thread(target=lambda: reaberta.append(particoes.emprestar('norte')))
+    reabrir.start()
+
+    # Enquanto a compactação não termina a loja segue fechando e não reabre
+    reabrir.join(0.3)
+    assert reabrir.is_alive()
+    assert not reaberta
+
+    liberar.set()
+    descarregar.join(5)
+    reabrir.join(5)
+    assert reaberta and reaberta[0] is not loja
+
+    nova = reaberta[0]
+    for i in range(20):
+        nova.deposito.contas.inserir(conta(f'b{i}'))
+    particoes.devolver(nova)
+
+    assert ids_no_disco(particoes, 'norte') == sorted(['a'] + [f'b{i}' for i in range(20)])
+
+
+def test_colecao_fechada_nao_inicia_compactacao(tmp_path):
+    colecao = armazenamento.ColecaoEmCache(str(tmp_path / 'contas.json'), usar_diario=True, limite_diario=1)
+    colecao.fechar()
+    colecao.compactar_em_segundo_plano()
+    assert colecao._compactacao is None
+
+
+def test_consolidacao_le_lojas_fechadas_sem_gravar(tmp_path):
+    particoes = montar(tmp_path)
+    particoes.criar('norte')
+    particoes.criar('vazia')
+    loja = particoes.emprestar('norte')
+    loja.deposito.contas.inserir(conta('a', 10.0))
+    loja.deposito.contas.inserir(conta('b', 5.0, 'pago'))
+    particoes.devolver(loja)
+
+    norte = particoes.diretorio('norte')
+    arquivos = {nome: os.stat(os.path.join(norte, nome)).st_mtime_ns for nome in os.listdir(norte)}
+
+    consolidacao = ConsolidacaoLojas(particoes, 'json', OPCOES)
+    try:
+        resultados = consolidacao.parciais(['norte', 'vazia'])
+    finally:
+        consolidacao.encerrar()
+
+    contas, _ = resultados['norte']
+    assert contas['total'] == 2
+    assert contas['por_status']['pendente'] == (1, 10.0)
+    assert contas['por_status']['pago'] == (1, 5.0)
+    assert resultados['vazia'][0]['total'] == 0
+
+    # Nada criado na loja vazia e nada regravado na loja lida
+    assert os.listdir(particoes.diretorio('vazia')) == []
+    assert {nome: os.stat(os.path.join(norte, nome)).st_mtime_ns for nome in os.listdir(norte)} == arquivos
+    assert particoes.abertas() == [LOJA_PRINCIPAL]
+
+
+def test_parciais_do_disco_iguais_aos_da_loja_aberta(tmp_path):
+    particoes = montar(tmp_path, limite_abertas=4)
+    particoes.criar('norte')
+    loja = particoes.emprestar('norte')
+    for i in range(10):
+        loja.deposito.contas.inserir(conta(str(i), float(i), 'pago' if i % 3 == 0 else 'pendente'))
+    loja.deposito.contas.remover('4')
+    loja.deposito.entradas.inserir({'id': 'e1', 'valor': 7.5, 'tipoEntrada': 'pix', 'dataEntrada': '2026-10-18'})
+    try:
+        assert parciais_do_disco(loja.diretorio, 'json', OPCOES) == loja.parciais()
+    finally:
+        particoes.devolver(loja)
+
+
+def test_poucas_lojas_fechadas_nao_iniciam_processos(tmp_path):
+    particoes = montar(tmp_path)
+    particoes.criar('norte')
+    consolidacao = ConsolidacaoLojas(particoes, 'json', OPCOES, processos=2, minimo_processos=2)
+    try:
+        consolidacao.parciais(['norte'])
+        assert consolidacao._processos is None
+        assert consolidacao._threads is not None
+    finally:
+        consolidacao.encerrar()
+
+
+def test_processos_e_threads_somam_o_mesmo(tmp_path):
+    particoes = montar(tmp_path)
+    ids = [f'loja{i}' for i in range(5)]
+    for n, id_loja in enumerate(ids):
+        particoes.criar(id_loja)
+        loja = particoes.emprestar(id_loja)
+        for i in range(n * 3):
+            loja.deposito.contas.inserir(conta(f'c{i}', float(i), 'pago' if i % 2 else 'pendente'))
+        loja.deposito.entradas.inserir({'id': 'e', 'valor': n + 0.5, 'tipoEntrada': 'pix', 'dataEntrada': '2026-10-18'})
+        particoes.devolver(loja)
+
+    em_threads = ConsolidacaoLojas(particoes, 'json', OPCOES, processos=0)
+    em_processos = ConsolidacaoLojas(particoes, 'json', OPCOES, processos=2, minimo_processos=len(ids))
+    try:
+        esperado = em_threads.parciais(ids)
+        assert em_threads._processos is None
+        assert em_processos.parciais(ids) == esperado
+        assert em_processos._processos is not None
+    finally:
+        em_threads.encerrar()
+        em_processos.encerrar()
+    assert esperado['loja4'][0]['total'] == 12
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Métricas no formato texto do Prometheus e a coleta de /api/metrics (metricas.py)"""
+
+import re
+
+import pytest
+
+from metricas import TIPO_CONTEUDO, Metricas
+
+AMOSTRA = re.compile(r'^([a-z_]+)(?:\{(.*)\})? (\S+)$')
+ROTULO = re.compile(r'([a-z_]+)="((?:[^"\\]|\\.)*)"')
+
+
+def amostras(texto):
+    """{(nome, frozenset dos rótulos): valor} e {nome: tipo} de uma coleta"""
+    valores, tipos = {}, {}
+    for linha in texto.splitlines():
+        if linha.startswith('# TYPE '):
+            _, _, nome, tipo = linha.split(' ')
+            tipos[nome] = tipo
+        elif linha and not linha.startswith('#'):
+            nome, rotulos, valor = AMOSTRA.match(linha).groups()
+            valores[(nome, frozenset(ROTULO.findall(rotulos or '')))] = float(valor)
+    return valores, tipos
+
+
+def serie(nome, **rotulos):
+    return (nome, frozenset(rotulos.items()))
+
+
+def test_formato_de_exportacao():
+    metricas = Metricas()
+    contador = metricas.contador('pedidos_total', 'Pedidos', ('rota',))
+    contador.incrementar('/a"b\\')
+    contador.incrementar('/a"b\\', valor=2)
+    histograma = metricas.histograma('duracao_segundos', 'Duração', limites=(0.1, 1))
+    for valor in (0.05, 0.1, 0.5, 3):
+        histograma.observar(valor)
+    metricas.medidor('registros', 'Registros').definir(lambda: 7)
+    # O mesmo nome devolve a mesma métrica; com outro tipo é erro
+    assert metricas.contador('pedidos_total', 'Pedidos', ('rota',)) is contador
+    with pytest.raises(ValueError):
+        metricas.medidor('pedidos_total', 'Pedidos', ('rota',))
+
+    # Na ordem de registro
+    assert metricas.exportar() == '\n'.join([
+        '# HELP pedidos_total Pedidos',
+        '# TYPE pedidos_total counter',
+        'pedidos_total{rota="/a\\"b\\\\"} 3',
+        '# HELP duracao_segundos Duração',
+        '# TYPE duracao_segundos histogram',
+        'duracao_segundos_bucket{le="0.1"} 2',
+        'duracao_segundos_bucket{le="1"} 3',
+        'duracao_segundos_bucket{le="+Inf"} 4',
+        'duracao_segundos_sum 3.65',
+        'duracao_segundos_count 4',
+        '# HELP registros Registros',
+        '# TYPE registros gauge',
+        'registros 7',
+    ]) + '\n'
+    valores, _ = amostras(metricas.exportar())
+    assert valores[serie('pedidos_total', rota='/a\\"b\\\\')] == 3
+
+
+def test_coleta_depois_de_requisicoes(cliente, servidor, monkeypatch):
+    antes, _ = amostras(cliente.get('/api/metrics').get_data(as_text=True))
+
+    for _ in range(3):
+        assert cliente.get('/api/contas').status_code == 200
+    assert cliente.post('/api/contas', json={'valor': 1}).status_code == 201
+    assert cliente.post('/api/contas', json=[1]).status_code == 400
+    with monkeypatch.context() as m:
+        m.setattr(servidor.deposito.contas, 'obter_bytes', lambda: 1 / 0)
+        assert cliente.get('/api/contas?loja=principal').status_code == 500
+
+    resposta = cliente.get('/api/metrics')
+    assert resposta.status_code == 200
+    assert resposta.headers['Content-Type'] == TIPO_CONTEUDO
+    depois, tipos = amostras(resposta.get_data(as_text=True))
+
+    def aumento(chave):
+        return depois.get(chave, 0) - antes.get(chave, 0)
+
+    requisicoes = {'rota': '/api/contas'}
+    assert aumento(serie('http_requisicoes_total', metodo='GET', status='200', **requisicoes)) == 3
+    assert aumento(serie('http_requisicoes_total', metodo='GET', status='500', **requisicoes)) == 1
+    assert aumento(serie('http_requisicoes_total', metodo='POST', status='201', **requisicoes)) == 1
+    assert aumento(serie('http_requisicoes_total', metodo='POST', status='400', **requisicoes)) == 1
+    assert aumento(serie('http_erros_total', metodo='GET', **requisicoes)) == 1
+    assert aumento(serie('http_erros_total', metodo='POST', **requisicoes)) == 0
+
+    # Histograma: uma observação por requisição, faixas cumulativas até +Inf
+    duracao = dict(metodo='GET', **requisicoes)
+    assert aumento(serie('http_requisicao_duracao_segundos_count', **duracao)) == 4
+    faixas = sorted((float(dict(rotulos)['le']), valor) for (nome, rotulos), valor in depois.items()
+                    if nome == 'http_requisicao_duracao_segundos_bucket'
+                    and rotulos >= serie('', **duracao)[1])
+    assert [valor for _, valor in faixas] == sorted(valor for _, valor in faixas)
+    assert faixas[-1] == (float('inf'), depois[serie('http_requisicao_duracao_segundos_count', **duracao)])
+    assert depois[serie('http_requisicao_duracao_segundos_sum', **duracao)] > 0
+
+    assert depois[serie('colecao_registros', colecao='contas')] == 1
+    assert depois[serie('lojas_abertas')] >= 1
+    assert aumento(serie('json_decodificacao_duracao_segundos_count', origem='requisicao')) == 2
+    assert {nome: tipos[nome] for nome in ('http_requisicoes_total', 'http_erros_total',
+                                           'http_requisicao_duracao_segundos', 'colecao_registros')} == {
+        'http_requisicoes_total': 'counter', 'http_erros_total': 'counter',
+        'http_requisicao_duracao_segundos': 'histogram', 'colecao_registros': 'gauge'}
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Precificação pelo catálogo igual às fórmulas originais da calculadora (precificacao.py)
+
+As funções calcular_* abaixo são as da calculadora Tkinter original
+(Calcdesossa.py), reduzidas a (preços, pesos, lucro) na ordem do catálogo
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+import precificacao
+from precificacao import precificar, precificar_itens, precificar_lote
+
+
+def calcular_coxao_bola(peso, preco, media_perdas, media_lucro):
+    valortotal = peso * preco
+
+    patinho_e_coxao_mole = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.09)
+    coxao_duro_e_lagarto = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.05)
+    musculo = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 - 0.10)
+
+    lpatinho = preco * (peso * 0.13)
+    lcoxaomole = preco * (peso * 0.27)
+    lcoxaoduro = preco * (peso * 0.15)
+    llagarto = preco * (peso * 0.08)
+    lmusculo = preco * (peso * 0.13)
+
+    lucro = valortotal - (lpatinho + lcoxaomole + lcoxaoduro + llagarto + lmusculo)
+    primeiro = math.ceil(round(patinho_e_coxao_mole, 2) + 1) if preco <= 12 else math.ceil(round(patinho_e_coxao_mole, 2))
+    return (
+        [primeiro, math.ceil(round(coxao_duro_e_lagarto, 2)), math.ceil(round(musculo, 2))],
+        [peso * 0.13, peso * 0.27, peso * 0.15, peso * 0.08, peso * 0.13],
+        math.ceil(round(lucro, 2)),
+    )
+
+
+def calcular_dianteiro(peso, preco, media_perdas, media_lucro):
+    valortotal = peso * preco
+
+    paleta = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.05)
+    peixinho = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.10)
+    musculo = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 - 0.06)
+    costela_gaucha = (preco * (media_lucro / 100 + 1 + 0.10))
+    acem = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1)
+
+    lpaleta = preco * (peso * 0.2422)
+    lpeixinho = preco * (peso * 0.03)
+    lmusculo = preco * (peso * 0.0571)
+    lcostela = preco * (peso * 0.1982)
+    lacem = preco * (peso * 0.2963)
+
+    lucro = valortotal - (lpaleta + lpeixinho + lmusculo + lcostela + lacem)
+    return (
+        [math.ceil(round(valor, 2)) for valor in (paleta, peixinho, musculo, costela_gaucha, acem)],
+        [peso * 0.2422, peso * 0.03, peso * 0.0571, peso * 0.1982, peso * 0.2963],
+        math.ceil(round(lucro, 2)),
+    )
+
+
+def calcular_traseiro(peso, preco, media_perdas, media_lucro):
+    valortotal = peso * preco
+
+    contra_file = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.10)
+    picanha = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.4)
+    mignon = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.35)
+    musculo = (preco * (media_perdas / 100 + 1 + 0.10))
+    coxao_duro_e_lagarto = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 - 0.05)
+    maminha = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1)
+    alcatra = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 + 0.0655)
+    patinho_e_coxao_mole = (preco * (media_perdas / 100 + 1)) * (media_lucro / 100 + 1 - 0.02)
+
+    lcontra = preco * (peso * 0.17)
+    lpicanha = preco * (peso * 0.0178)
+    lmignon = preco * (peso * 0.0454)
+    lmusculo = preco * (peso * 0.069)
+    lcoxao = preco * (peso * 0.1014)
+    llagarto = preco * (peso * 0.0487)
+    lmaminha = preco * (peso * 0.025)
+    lalcatra = preco * (peso * 0.0595)
+    lpatinho = preco * (peso * 0.0923)
+    lmole = preco * (peso * 0.1544)
+
+    lucro = valortotal - (lcontra + lpicanha + lmignon + lmusculo + lcoxao + llagarto + lmaminha + lalcatra + lpatinho + lmole)
+    return (
+        [math.ceil(round(valor, 2)) for valor in (contra_file, picanha, mignon, musculo, coxao_duro_e_lagarto,
+                                                  maminha, alcatra, patinho_e_coxao_mole)],
+        [peso * 0.17, peso * 0.0178, peso * 0.0454, peso * 0.069, peso * 0.1014,
+         peso * 0.0487, peso * 0.025, peso * 0.0595, peso * 0.0923, peso * 0.1544],
+        math.ceil(round(lucro, 2)),
+    )
+
+
+ORIGINAIS = {
+    'coxao_bola': calcular_coxao_bola,
+    'dianteiro': calcular_dianteiro,
+    'traseiro': calcular_traseiro,
+}
+
+
+def pecas(quantidade, semente=2026):
+    sorteio = random.Random(semente)
+    fixas = [(100, 12, 27, 40), (100, 12.01, 27, 40), (87.3, 21.9, 27, 40), (0.5, 0.99, 0, 0), (250, 35.55, 12.5, 65)]
+    return fixas + [
+        (round(sorteio.uniform(1, 400), 3), round(sorteio.uniform(5, 60), 2),
+         sorteio.choice([0, 10, 27, 33.3]), sorteio.choice([0, 25, 40, 55.5]))
+        for _ in range(quantidade)
+    ]
+
+
+@pytest.mark.parametrize('tipo', sorted(ORIGINAIS))
+def test_precificar_igual_a_calculadora_original(tipo):
+    for peso, preco, perdas, lucro in pecas(300):
+        precos, pesos, lucro_peca = ORIGINAIS[tipo](peso, preco, perdas, lucro)
+        resultado = precificar(tipo, peso, preco, perdas, lucro)
+        assert list(resultado['precos'].values()) == precos, (peso, preco, perdas, lucro)
+        assert list(resultado['pesos'].values()) == pytest.approx(pesos, rel=1e-12)
+        assert resultado['lucro'] == lucro_peca, (peso, preco, perdas, lucro)
+
+
+@pytest.mark.parametrize('tipo', sorted(ORIGINAIS))
+def test_lote_igual_a_calculadora_original(tipo):
+    lista = pecas(1000, semente=7)
+    peso, preco, perdas, lucro = (np.array(coluna, dtype=float) for coluna in zip(*lista))
+    lote = precificar_lote(tipo, peso, preco, perdas, lucro)
+    for i, peca in enumerate(lista):
+        precos, pesos, lucro_peca = ORIGINAIS[tipo](*peca)
+        assert lote['precos'][i].tolist() == tuple(precos), peca
+        assert lote['pesos'][i].tolist() == pytest.approx(tuple(pesos), rel=1e-12)
+        assert lote['lucro'][i] == lucro_peca, peca
+
+
+def test_itens_de_primais_variados_na_ordem():
+    tipos = ['traseiro', 'coxao_bola', 'dianteiro', 'coxao_bola']
+    itens = [{'tipo': tipo, 'peso': 50 + i, 'preco': 11 + i} for i, tipo in enumerate(tipos)]
+    for item, resultado in zip(itens, precificar_itens(itens)):
+        precos, _, lucro = ORIGINAIS[item['tipo']](item['peso'], item['preco'], 27, 40)
+        assert list(resultado['precos'].values()) == precos
+        assert resultado['lucro'] == lucro
+
+
+def test_mesma_combinacao_vem_do_cache():
+    precificacao._precificar_peca.cache_clear()
+    primeira = precificar('Traseiro', 100, 12, 27, 40)
+    # Mesma peça com outros tipos numéricos e o nome de exibição do primal
+    assert precificar('traseiro', '100', 12.0, '27', 40) == primeira
+    info = precificacao._precificar_peca.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    precificar('traseiro', 100, 12, 27, 41)
+    assert precificacao._precificar_peca.cache_info().misses == 2
+
+
+def test_api_get_post_e_calcular_iguais(cliente):
+    esperado = precificar('dianteiro', 87.3, 21.9, 27, 40)
+    consulta = 'tipo=Dianteiro&peso=87.3&preco=21.9'
+    por_get = cliente.get(f'/api/precificar?{consulta}')
+    assert por_get.status_code == 200
+    dados = por_get.get_json()
+    # Perdas e lucro ausentes usam as médias padrão da calculadora
+    assert {campo: dados[campo] for campo in esperado} == esperado
+    assert set(dados['nomes']['precos']) == set(esperado['precos'])
+    assert set(dados['nomes']['pesos']) == set(esperado['pesos'])
+
+    por_post = cliente.post('/api/precificar', json={'tipo': 'dianteiro', 'peso': 87.3, 'preco': 21.9,
+                                                     'media_perdas': 27, 'media_lucro': 40})
+    assert por_post.get_json() == dados
+    assert cliente.get(f'/calcular?{consulta}').get_json() == dados
+
+
+def test_api_tipos(cliente):
+    assert cliente.get('/api/precificar/tipos').get_json() == {'tipos': ['Coxão Bola', 'Dianteiro', 'Traseiro']}
+
+
+@pytest.mark.parametrize('consulta', ['tipo=Traseiro&peso=100', 'tipo=Costela&peso=100&preco=12',
+                                      'tipo=Traseiro&peso=cem&preco=12', 'tipo=Traseiro&peso=100&preco=nan',
+                                      'peso=100&preco=12&media_lucro=x'])
+def test_api_parametros_invalidos_respondem_400(cliente, consulta):
+    resposta = cliente.get(f'/api/precificar?{consulta}')
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+
+
+@pytest.mark.parametrize('corpo', [[{'tipo': 'Traseiro'}], 'Traseiro', {'tipo': 'Traseiro', 'peso': True, 'preco': 12}])
+def test_api_corpo_invalido_responde_400(cliente, corpo):
+    resposta = cliente.post('/api/precificar', json=corpo)
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
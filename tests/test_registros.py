@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Gravação de contas e entradas pela API: por registro e pela lista completa (servidor_json.py)"""
+
+import pytest
+
+COLECOES = [('contas', {'empresa': 'Frigorífico', 'valor': 150.0, 'status': 'pendente',
+                        'dataVencimento': '2026-10-20'}),
+            ('entradas', {'valor': 80.5, 'tipoEntrada': 'pix', 'dataEntrada': '2026-10-18'})]
+
+
+@pytest.fixture(params=COLECOES, ids=[nome for nome, _ in COLECOES])
+def colecao(request):
+    return request.param
+
+
+def test_criar_obter_atualizar_excluir(cliente, colecao):
+    nome, registro = colecao
+    resposta = cliente.post(f'/api/{nome}', json=registro)
+    assert resposta.status_code == 201
+    criado = resposta.get_json()
+    assert criado['id'] and criado['dataCriacao']
+    assert criado['valor'] == registro['valor']
+
+    assert cliente.get(f"/api/{nome}/{criado['id']}").get_json() == criado
+    assert cliente.get(f'/api/{nome}').get_json() == [criado]
+
+    resposta = cliente.patch(f"/api/{nome}/{criado['id']}", json={'valor': 99.9, 'id': 'outro'})
+    assert resposta.status_code == 200
+    atualizado = resposta.get_json()
+    # O id não muda e os demais campos são mantidos
+    assert atualizado == {**criado, 'valor': 99.9}
+    assert cliente.get(f"/api/{nome}/{criado['id']}").get_json() == atualizado
+
+    resposta = cliente.delete(f"/api/{nome}/{criado['id']}")
+    assert resposta.status_code == 200
+    assert resposta.get_json()['id'] == criado['id']
+    assert cliente.get(f'/api/{nome}').get_json() == []
+
+
+def test_id_repetido_responde_409(cliente, colecao):
+    nome, registro = colecao
+    assert cliente.post(f'/api/{nome}', json={**registro, 'id': 'r1'}).status_code == 201
+    assert cliente.post(f'/api/{nome}', json={**registro, 'id': 'r1'}).status_code == 409
+    assert len(cliente.get(f'/api/{nome}').get_json()) == 1
+
+
+def test_id_desconhecido_responde_404(cliente, colecao):
+    nome, _ = colecao
+    assert cliente.get(f'/api/{nome}/nao-existe').status_code == 404
+    assert cliente.patch(f'/api/{nome}/nao-existe', json={'valor': 1}).status_code == 404
+    assert cliente.delete(f'/api/{nome}/nao-existe').status_code == 404
+
+
+@pytest.mark.parametrize('corpo', [
+    {'data': 'valor=1', 'content_type': 'application/x-www-form-urlencoded'},
+    {'data': '{"valor": ', 'content_type': 'application/json'},
+    {'data': '[1, 2]', 'content_type': 'application/json'},
+    {},
+])
+def test_corpo_invalido_no_patch_responde_400(cliente, colecao, corpo):
+    nome, registro = colecao
+    criado = cliente.post(f'/api/{nome}', json=registro).get_json()
+    resposta = cliente.patch(f"/api/{nome}/{criado['id']}", **corpo)
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+    assert cliente.get(f"/api/{nome}/{criado['id']}").get_json() == criado
+
+
+@pytest.mark.parametrize('corpo', [
+    {'data': 'valor=1', 'content_type': 'text/plain'},
+    {'data': '{"valor": ', 'content_type': 'application/json'},
+    {},
+])
+def test_corpo_invalido_no_post_responde_400(cliente, colecao, corpo):
+    nome, _ = colecao
+    resposta = cliente.post(f'/api/{nome}', **corpo)
+    assert resposta.status_code == 400
+    assert cliente.get(f'/api/{nome}').get_json() == []
+
+
+@pytest.mark.parametrize('lista', [
+    [1, 2, 3],
+    [{'id': 'a'}, 'texto'],
+    [{'id': 'a'}, {'id': 'a'}],
+    [{'id': ['lista']}],
+    [{'id': True}],
+])
+def test_lista_invalida_responde_400_sem_alterar_nada(cliente, colecao, lista):
+    nome, registro = colecao
+    criado = cliente.post(f'/api/{nome}', json=registro).get_json()
+    resposta = cliente.post(f'/api/{nome}', json=lista)
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+    assert cliente.get(f'/api/{nome}').get_json() == [criado]
+
+
+def test_lista_completa_substitui_a_colecao(cliente, colecao):
+    nome, registro = colecao
+    lista = [{**registro, 'id': 'x1'}, {**registro, 'id': 2}, {**registro, 'valor': 1}]
+    resposta = cliente.post(f'/api/{nome}', json=lista)
+    assert resposta.status_code == 200
+    assert resposta.get_json()['total'] == 3
+    assert cliente.get(f'/api/{nome}').get_json() == lista
+
+
+@pytest.mark.parametrize('corpo', [
+    [1, 2, 3],
+    {'contas': [], 'entradas': [1]},
+    {'contas': {'id': 'a'}},
+    {'config': []},
+])
+def test_dados_invalidos_nao_gravam_nenhuma_parte(cliente, servidor, corpo):
+    conta = cliente.post('/api/contas', json=COLECOES[0][1]).get_json()
+    resposta = cliente.post('/api/dados', json=corpo)
+    assert resposta.status_code == 400
+    assert cliente.get('/api/contas').get_json() == [conta]
+    assert servidor.deposito.config.obter() == {}
+
+
+def test_restaurar_backup_invalido_responde_400(cliente, servidor):
+    conta = cliente.post('/api/contas', json=COLECOES[0][1]).get_json()
+    manifesto = servidor.loja_principal.repositorio_backup.criar({
+        'contas.json': [{'id': 'b1'}], 'entradas.json': [1, 2, 3], 'config.json': {}
+    })
+    resposta = cliente.post(f"/api/backup/{manifesto['id']}/restaurar")
+    assert resposta.status_code == 400
+    assert 'Backup inválido' in resposta.get_json()['error']
+    assert cliente.get('/api/contas').get_json() == [conta]
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Revisões para a sincronização incremental: contadores, lápides e since= (revisoes.py)"""
+
+import threading
+
+import pytest
+
+from armazenamento import ColecaoEmCache
+from revisoes import Revisoes
+
+
+def colecoes_com_revisoes(tmp_path, limite_lapides=100):
+    revisoes = Revisoes(limite_lapides=limite_lapides)
+    contas = ColecaoEmCache(str(tmp_path / 'contas.json'), usar_diario=True)
+    entradas = ColecaoEmCache(str(tmp_path / 'entradas.json'), usar_diario=True)
+    contas.adicionar_ouvinte(revisoes.historico('contas'))
+    entradas.adicionar_ouvinte(revisoes.historico('entradas'))
+    return revisoes, contas, entradas
+
+
+def test_cada_alteracao_ganha_uma_revisao(tmp_path):
+    revisoes, contas, entradas = colecoes_com_revisoes(tmp_path)
+    inicio = revisoes.atual
+    contas.inserir({'id': 'a', 'valor': 1})
+    entradas.inserir({'id': 'e', 'valor': 2})
+    contas.atualizar('a', {'valor': 3})
+    # O contador é compartilhado pelas coleções e nunca volta
+    assert revisoes.atual == inicio + 3
+
+    resposta = revisoes.alteracoes_desde(inicio + 1)
+    assert resposta['revisao'] == inicio + 3 and not resposta['completo']
+    assert resposta['contas']['alterados'] == [contas.obter_registro('a')]
+    assert resposta['entradas']['alterados'] == [entradas.obter_registro('e')]
+    assert revisoes.alteracoes_desde(revisoes.atual)['contas'] == {'alterados': [], 'removidos': []}
+
+
+def test_exclusao_deixa_lapide(tmp_path):
+    revisoes, contas, _ = colecoes_com_revisoes(tmp_path)
+    contas.inserir({'id': 'a'})
+    contas.inserir({'id': 'b'})
+    antes = revisoes.atual
+    contas.remover('a')
+    assert revisoes.alteracoes_desde(antes)['contas'] == {'alterados': [], 'removidos': ['a']}
+    # Recriado depois da exclusão: volta como alterado, não como removido
+    contas.inserir({'id': 'a', 'valor': 9})
+    assert revisoes.alteracoes_desde(antes)['contas'] == {'alterados': [{'id': 'a', 'valor': 9,
+                                                                        'dataCriacao': contas.obter_registro('a')['dataCriacao']}],
+                                                          'removidos': []}
+
+
+def test_lista_completa_gera_so_as_diferencas(tmp_path):
+    revisoes, contas, _ = colecoes_com_revisoes(tmp_path)
+    contas.salvar([{'id': 'a', 'valor': 1}, {'id': 'b', 'valor': 2}, {'id': 'c', 'valor': 3}])
+    antes = revisoes.atual
+    # Gravar a lista inteira passa por reiniciar(): uma revisão para a gravação toda
+    contas.salvar([{'id': 'a', 'valor': 1}, {'id': 'b', 'valor': 20}, {'id': 'd', 'valor': 4}])
+    assert revisoes.atual == antes + 1
+    delta = revisoes.alteracoes_desde(antes)
+    assert not delta['completo']
+    assert delta['contas'] == {'alterados': [{'id': 'b', 'valor': 20}, {'id': 'd', 'valor': 4}], 'removidos': ['c']}
+
+    # A mesma lista de novo não muda a revisão
+    contas.salvar(list(contas.obter()))
+    assert revisoes.atual == antes + 1
+
+
+def test_cliente_replica_o_estado_pelas_alteracoes(tmp_path):
+    revisoes, contas, _ = colecoes_com_revisoes(tmp_path)
+    copia = {}
+    desde = 0
+
+    def sincronizar():
+        nonlocal desde
+        resposta = revisoes.alteracoes_desde(desde)
+        if resposta['completo']:
+            copia.clear()
+        for registro in resposta['contas']['alterados']:
+            copia[registro['id']] = registro
+        for chave in resposta['contas']['removidos']:
+            copia.pop(chave, None)
+        desde = resposta['revisao']
+
+    contas.salvar([{'id': str(i), 'valor': i} for i in range(5)])
+    sincronizar()
+    contas.remover('1')
+    contas.atualizar('2', {'valor': 22})
+    contas.salvar([r for r in contas.obter() if r['id'] != '3'] + [{'id': 'x'}])
+    contas.inserir_lote([{'id': 'y'}, {'id': 'z'}])
+    sincronizar()
+    assert list(copia.values()) == contas.obter()
+
+
+def test_gravacao_desfeita_aparece_como_alteracao(tmp_path, monkeypatch):
+    revisoes, contas, _ = colecoes_com_revisoes(tmp_path)
+    contas.salvar([{'id': 'a'}])
+    antes = revisoes.atual
+
+    def falhar(operacoes):
+        raise OSError('disco cheio')
+
+    monkeypatch.setattr(contas.diario, 'registrar', falhar)
+    with pytest.raises(OSError):
+        contas.inserir({'id': 'b'})
+    # Um cliente que já recebeu 'b' o vê removido no próximo delta
+    assert revisoes.alteracoes_desde(antes + 1)['contas'] == {'alterados': [], 'removidos': ['b']}
+
+
+def test_recarga_de_outro_processo_entra_nas_alteracoes(tmp_path):
+    revisoes, contas, _ = colecoes_com_revisoes(tmp_path)
+    contas.salvar([{'id': 'a'}, {'id': 'b'}])
+    antes = revisoes.atual
+    outro = ColecaoEmCache(contas.arquivo, usar_diario=True)
+    outro.remover('a')
+    outro.inserir({'id': 'c', 'dataCriacao': 'ontem'})
+    contas.verificar()
+    assert revisoes.alteracoes_desde(antes)['contas'] == {'alterados': [{'id': 'c', 'dataCriacao': 'ontem'}],
+                                                          'removidos': ['a']}
+
+
+def test_resposta_completa_quando_o_cliente_nao_pode_usar_o_delta(tmp_path):
+    revisoes, contas, _ = colecoes_com_revisoes(tmp_path, limite_lapides=2)
+    contas.salvar([{'id': str(i)} for i in range(5)])
+    desatualizado = revisoes.atual
+    for chave in ('0', '1', '2'):
+        contas.remover(chave)
+    # A lápide da primeira exclusão foi descartada: o cliente recebe tudo
+    assert revisoes.minima > desatualizado
+    for desde in (0, desatualizado, revisoes.atual + 5):
+        resposta = revisoes.alteracoes_desde(desde)
+        assert resposta['completo']
+        assert resposta['contas'] == {'alterados': contas.obter(), 'removidos': []}
+    assert not revisoes.alteracoes_desde(revisoes.minima)['completo']
+
+
+def test_aguardar_volta_na_proxima_alteracao(tmp_path):
+    revisoes, contas, _ = colecoes_com_revisoes(tmp_path)
+    atual = revisoes.atual
+    threading.Timer(0.05, lambda: contas.inserir({'id': 'a'})).start()
+    revisoes.aguardar(atual, 5)
+    assert revisoes.atual == atual + 1
+
+
+def test_sync_da_api(cliente):
+    inicial = cliente.post('/api/contas', json={'valor': 0}).get_json()
+    inicio = cliente.get('/api/sync').get_json()
+    assert inicio['completo'] and inicio['contas'] == {'alterados': [inicial], 'removidos': []}
+    desde, instancia = inicio['revisao'], inicio['instancia']
+
+    conta = cliente.post('/api/contas', json={'valor': 1}).get_json()
+    entrada = cliente.post('/api/entradas', json={'valor': 2}).get_json()
+    cliente.delete(f"/api/contas/{conta['id']}")
+    delta = cliente.get(f'/api/sync?since={desde}&instancia={instancia}').get_json()
+    assert delta['revisao'] == desde + 3 and not delta['completo']
+    assert delta['contas'] == {'alterados': [], 'removidos': [conta['id']]}
+    assert cliente.get(f"/api/sync?since={delta['revisao']}&instancia={instancia}").get_json()['contas'] == {
+        'alterados': [], 'removidos': []}
+    assert delta['entradas'] == {'alterados': [entrada], 'removidos': []}
+
+    # Lista inteira gravada pelo POST: o delta tem as diferenças
+    desde = delta['revisao']
+    cliente.post('/api/entradas', json=[{'id': 'n1', 'valor': 5}])
+    delta = cliente.get(f'/api/sync?since={desde}&instancia={instancia}').get_json()
+    assert delta['entradas'] == {'alterados': [{'id': 'n1', 'valor': 5}], 'removidos': [entrada['id']]}
+
+    # Outra execução do servidor: as revisões recomeçaram, resposta completa
+    outra = cliente.get(f'/api/sync?since={desde}&instancia=outra').get_json()
+    assert outra['completo'] and outra['entradas']['alterados'] == [{'id': 'n1', 'valor': 5}]
+    assert cliente.get('/api/sync?since=abc').status_code == 400